@@ -4,9 +4,28 @@ CREATE TABLE IF NOT EXISTS event_log
     `event_date_time` DateTime64(6),
     `environment` String,
     `event_context` String,
-    `metadata_version` Int32 DEFAULT 1
+    `metadata_version` Int32 DEFAULT 1,
+    `trace_id` String DEFAULT '',
+    `committed_at` DateTime64(6) ALIAS event_date_time,
+    `claimed_at` DateTime64(6) DEFAULT event_date_time,
+    `inserted_at` DateTime64(6) DEFAULT now64(6),
+    -- OutboxEvent.user_id; the zero UUID for events without a user.
+    `user_id` UUID DEFAULT toUUID('00000000-0000-0000-0000-000000000000'),
+    -- Lets "all events of a user" skip the granules without them instead of scanning the table.
+    INDEX user_id_idx user_id TYPE bloom_filter(0.01) GRANULARITY 1
 )
 ENGINE = MergeTree()
 PARTITION BY toYYYYMM(event_date_time)
 ORDER BY (event_date_time, event_type)
-SETTINGS index_granularity = 8192;
\ No newline at end of file
+SETTINGS index_granularity = 8192;
+
+-- Tables created before the trace columns existed.
+ALTER TABLE event_log ADD COLUMN IF NOT EXISTS `trace_id` String DEFAULT '';
+ALTER TABLE event_log ADD COLUMN IF NOT EXISTS `committed_at` DateTime64(6) ALIAS event_date_time;
+ALTER TABLE event_log ADD COLUMN IF NOT EXISTS `claimed_at` DateTime64(6) DEFAULT event_date_time;
+ALTER TABLE event_log ADD COLUMN IF NOT EXISTS `inserted_at` DateTime64(6) DEFAULT now64(6);
+
+-- Tables created before the user_id column existed. Events inserted before it carry the zero UUID, and parts written
+-- before the index existed are only indexed once it's materialized: ALTER TABLE event_log MATERIALIZE INDEX user_id_idx;
+ALTER TABLE event_log ADD COLUMN IF NOT EXISTS `user_id` UUID DEFAULT toUUID('00000000-0000-0000-0000-000000000000');
+ALTER TABLE event_log ADD INDEX IF NOT EXISTS user_id_idx user_id TYPE bloom_filter(0.01) GRANULARITY 1;
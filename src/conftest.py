@@ -1,5 +1,15 @@
+import threading
+from collections.abc import Callable
+from typing import NamedTuple
+
 import pytest
 from clickhouse_driver import Client
+from clickhouse_driver.errors import NetworkError
+
+from core.adaptive_batch import AdaptiveBatchSizer
+from core.circuit_breaker import CircuitBreaker
+from core.clickhouse_replicas import ReplicatedClient
+from core.event_log_client import EventLogClient
 
 
 @pytest.fixture(scope='module')
@@ -46,3 +56,105 @@ def create_clickhouse_database():
 def setup_clickhouse():
     """Fixture to create the ClickHouse database before tests run."""
     create_clickhouse_database()
+
+
+class ExecutedQuery(NamedTuple):
+    query: str
+    params: dict | list | None
+    settings: dict
+    columnar: bool
+
+
+class StandInClickHouse:
+    """
+    Stand-in ClickHouse client that answers without a server and keeps what it was sent.
+
+    Every call is kept in `attempts`, and the ones that went through in `queries`. The next `failures` calls raise
+    `error` (a network error by default). INSERTs that go through add their rows, or columns, to `inserts` and call
+    `on_insert` with them, e.g. to spend time on a simulated clock. `inserted` is set once one has. Other queries are
+    answered with `rows`.
+    """
+
+    def __init__(
+        self,
+        rows: list[tuple] | None = None,
+        failures: int = 0,
+        error: Exception | None = None,
+        on_insert: Callable[[list], None] | None = None,
+    ) -> None:
+        self.rows = rows or []
+        self.failures = failures
+        self.error = error or NetworkError("ClickHouse is down")
+        self.on_insert = on_insert
+        self.attempts: list[ExecutedQuery] = []
+        self.queries: list[ExecutedQuery] = []
+        self.inserts: list[list] = []
+        self.inserted = threading.Event()
+
+    def execute(
+        self,
+        query: str,
+        params: dict | list | None = None,
+        columnar: bool = False,
+        settings: dict | None = None,
+        **kwargs: object,  # noqa: ARG002
+    ) -> list[tuple] | None:
+        executed = ExecutedQuery(query, params, settings or {}, columnar)
+        self.attempts.append(executed)
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.queries.append(executed)
+        if not query.lstrip().upper().startswith("INSERT"):
+            return self.rows
+        if self.on_insert is not None:
+            self.on_insert(params)
+        self.inserts.append(params)
+        self.inserted.set()
+        return None
+
+    def disconnect(self) -> None:
+        pass
+
+
+@pytest.fixture
+def f_clickhouse() -> StandInClickHouse:
+    return StandInClickHouse()
+
+
+@pytest.fixture
+def f_make_clickhouse() -> type[StandInClickHouse]:
+    """The stand-in ClickHouse client class, for tests that need several clients or a configured one."""
+    return StandInClickHouse
+
+
+@pytest.fixture
+def f_breaker() -> CircuitBreaker:
+    """A breaker of the test's own, so failures don't leave the process-wide ClickHouse breaker open."""
+    return CircuitBreaker("test")
+
+
+@pytest.fixture
+def f_batch_sizer() -> AdaptiveBatchSizer:
+    return AdaptiveBatchSizer()
+
+
+EventLogClientFactory = Callable[[StandInClickHouse | ReplicatedClient], EventLogClient]
+
+
+@pytest.fixture
+def f_make_event_log_client(f_breaker: CircuitBreaker, f_batch_sizer: AdaptiveBatchSizer) -> EventLogClientFactory:
+    """Makes event log clients over a given ClickHouse client, sharing the test's breaker and batch sizer."""
+    def make(clickhouse: StandInClickHouse | ReplicatedClient) -> EventLogClient:
+        return EventLogClient(
+            clickhouse, schema="default", table="event_log", environment="test",
+            breaker=f_breaker, batch_sizer=f_batch_sizer,
+        )
+    return make
+
+
+@pytest.fixture
+def f_event_log_client(
+    f_make_event_log_client: EventLogClientFactory, f_clickhouse: StandInClickHouse,
+) -> EventLogClient:
+    return f_make_event_log_client(f_clickhouse)
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class AdaptiveBatchSizer:
+    """
+    Chooses the ClickHouse insert batch size and how long writers should pause between batches.
+
+    The size grows by `growth` while full batches stay under `target_latency` and is halved when any batch goes
+    above, so it settles around the largest batch ClickHouse absorbs within the target; a fast batch smaller than the
+    size says nothing about the size and leaves it as is. Slow batches and "too many parts"
+    errors also raise `backoff`, the pause the outbox relay takes before claiming the next batch; fast batches
+    decay it back to zero. On "too many parts" the size is held rather than shrunk: smaller batches would only
+    create more parts.
+    """
+
+    def __init__(
+        self,
+        initial: int = 1000,
+        minimum: int = 100,
+        maximum: int = 50_000,
+        target_latency: float = 0.5,
+        growth: float = 1.25,
+        shrink: float = 0.5,
+        max_backoff: float = 30.0,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.growth = growth
+        self.shrink = shrink
+        self.max_backoff = max_backoff
+        self.backoff = 0.0
+        self._size = max(minimum, min(initial, maximum))
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @contextmanager
+    def timed(self, rows: int) -> Generator[None, None, None]:
+        """Times one batch insert of `rows` rows and adjusts the size once it succeeds."""
+        started = self._clock()
+        yield
+        self.record_latency(self._clock() - started, rows)
+
+    def record_latency(self, latency: float, rows: int) -> None:
+        with self._lock:
+            if latency > self.target_latency:
+                self._resize(self._size * self.shrink)
+                self._increase_backoff(latency)
+                return
+            if rows >= self._size:
+                self._resize(self._size * self.growth)
+            self.backoff = self.backoff / 2 if self.backoff > self.target_latency / 10 else 0.0
+
+    def record_overload(self) -> None:
+        """Called when ClickHouse rejects a batch because it is behind on merges."""
+        with self._lock:
+            self._increase_backoff(self.target_latency)
+            logger.warning("ClickHouse is overloaded, backing off", batch_size=self._size, backoff=self.backoff)
+
+    def wait(self) -> None:
+        """Sleeps for the current backoff, if any."""
+        if self.backoff:
+            self._sleep(self.backoff)
+
+    def _resize(self, size: float) -> None:
+        self._size = max(self.minimum, min(int(size), self.maximum))
+
+    def _increase_backoff(self, base: float) -> None:
+        self.backoff = min(self.max_backoff, max(base, self.backoff * 2))
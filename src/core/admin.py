@@ -0,0 +1,161 @@
+import json
+from functools import cached_property
+
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, OrderBy, Q, QuerySet
+from django.http import HttpRequest
+
+# Query string parameter holding the primary key of the last row of the previous page.
+CURSOR_VAR = "after"
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes the planner's row estimate as the count of large unfiltered PostgreSQL querysets.
+
+    Counting millions of rows exactly scans the whole table or index on every page load. Below
+    `exact_count_limit` estimated rows the count is cheap, so it is exact; above, it is the estimate. Filtered and
+    searched querysets are counted exactly up to `exact_count_limit` instead, as the planner's estimates of their
+    conditions, trigram LIKEs above all, can be off by orders of magnitude; a longer list counts as about that many.
+    """
+    exact_count_limit = 10_000
+    count_is_estimated = False
+
+    @cached_property
+    def count(self) -> int:
+        if self.object_list.query.where:
+            count = self.object_list[:self.exact_count_limit + 1].count()
+            if count <= self.exact_count_limit:
+                return count
+            self.count_is_estimated = True
+            return self.exact_count_limit
+
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_count_limit:
+            return super().count
+        self.count_is_estimated = True
+        return estimate
+
+
+def estimate_count(queryset: QuerySet) -> int | None:
+    """Returns the planner's row estimate for the queryset on PostgreSQL and None on other databases."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        [plan] = cursor.fetchone()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Change list that pages by the last row seen instead of by offset.
+
+    `?after=<pk>` lists the rows that follow that row in the change list ordering, so a deep page costs an index
+    seek rather than skipping every row before it; a cursor that isn't a row's primary key lists the first page. The
+    next page's URL is `next_page_url`. Page numbers keep working; keyset paging needs the ordering to be made of the
+    model's own fields only and falls back to offsets otherwise.
+    """
+
+    def __init__(self, request: HttpRequest, *args: object, **kwargs: object) -> None:
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.next_page_url = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params: dict | None = None) -> dict:
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params: dict | None = None, remove: list | None = None) -> str:
+        # Sorting, filtering and page links start over from the first row.
+        return super().get_query_string(new_params, [*(remove or []), CURSOR_VAR])
+
+    def get_results(self, request: HttpRequest) -> None:
+        super().get_results(request)
+        ordering = self._keyset_ordering()
+        if ordering is None or (self.show_all and self.can_show_all):
+            return
+
+        last = self._cursor_row(ordering) if self.cursor else None
+        if last is not None:
+            self.result_list = self.queryset.filter(self._after(ordering, last))[:self.list_per_page]
+
+        rows = list(self.result_list)
+        if len(rows) == self.list_per_page:
+            self.next_page_url = self.get_query_string({CURSOR_VAR: rows[-1].pk})
+
+    def _cursor_row(self, ordering: list[tuple[str, OrderBy]]) -> dict | None:
+        """Returns the ordering columns of the cursor's row; None, listing the first page, if the cursor is invalid."""
+        try:
+            pk = self.lookup_opts.pk.to_python(self.cursor)
+        except ValidationError:
+            return None
+        return self.queryset.filter(pk=pk).values(*(name for name, _ in ordering)).first()
+
+    def _keyset_ordering(self) -> list[tuple[str, OrderBy]] | None:
+        """Returns the ordering as (field name, OrderBy) pairs, or None if it can't be paged by keyset."""
+        fields = {field.name: field for field in self.lookup_opts.concrete_fields}
+        ordering = []
+        for part in self.queryset.query.order_by:
+            if isinstance(part, str):
+                part = F(part.removeprefix("-")).desc() if part.startswith("-") else F(part).asc()
+            if not isinstance(part, OrderBy) or not isinstance(part.expression, F):
+                return None
+            name = self.lookup_opts.pk.name if part.expression.name == "pk" else part.expression.name
+            if name not in fields:
+                return None
+            ordering.append((name, part))
+            # A unique column tells every row apart; the columns ordered by after it never matter.
+            if fields[name].unique and not fields[name].null:
+                return ordering
+        return None
+
+    def _after(self, ordering: list[tuple[str, OrderBy]], last: dict) -> Q:
+        """
+        Builds the filter for the rows ordered after `last`: past it in the first column that differs, the columns
+        before it being equal. NULLs are placed where the ordering, or else the database, sorts them.
+        """
+        nulls_order_largest = connections[self.queryset.db].features.nulls_order_largest
+        after, equal = Q(pk__in=[]), Q()
+        for name, order in ordering:
+            value = last[name]
+            # Rows past `value` in this column are the greater ones ascending and the smaller ones descending.
+            past_nulls = _nulls_largest(order, nulls_order_largest) != order.descending
+            if value is None:
+                past = Q(**{f"{name}__isnull": False}) if not past_nulls else None
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                past = Q(**{f"{name}__{'lt' if order.descending else 'gt'}": value})
+                if past_nulls:
+                    past |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            if past is not None:
+                after |= equal & past
+            equal &= same
+        return after
+
+
+def _nulls_largest(order: OrderBy, default: bool) -> bool:
+    """Whether NULLs sort as the largest values under `order`; `default` is what the database does unless told."""
+    if order.nulls_first:
+        return order.descending
+    if order.nulls_last:
+        return not order.descending
+    return default
+
+
+class KeysetPaginationMixin:
+    """ModelAdmin mixin for large tables: estimated counts, no full table count and keyset paging."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request: HttpRequest, **kwargs: object) -> type[ChangeList]:  # noqa: ARG002
+        return KeysetChangeList
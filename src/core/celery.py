@@ -1,25 +1,50 @@
+import os
+
 from celery import Celery
-from celery.signals import task_prerun, task_postrun
+from celery.signals import (
+    before_task_publish, task_prerun, task_postrun, worker_process_init, worker_process_shutdown, worker_shutdown,
+)
 from django.conf import settings
 import structlog
 from structlog.contextvars import bind_contextvars, clear_contextvars
-import uuid
+
+from core.db_router import unpin_primary
+from core.profiling import install_memory_snapshot_signal
+from core.tracing import TRACE_ID_KEY, current_trace_id, new_trace_id
 
 logger = structlog.get_logger(__name__)
 
+# Set before the app is created so Celery installs its Django fixup, which closes the database connections that are
+# past CONN_MAX_AGE or broken around every task and keeps the others, and has every prefork child drop the
+# connections it inherited without touching the parent's sessions.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
 app = Celery('core')
 app.config_from_object(settings, namespace='CELERY')
 app.autodiscover_tasks()
 
 
+@before_task_publish.connect
+def propagate_trace(headers=None, **kwargs):
+    """Send the publisher's trace ID along with the task."""
+    if headers is not None and (trace_id := current_trace_id()):
+        headers.setdefault(TRACE_ID_KEY, trace_id)
+
+
 @task_prerun.connect
 def setup_structlog(sender=None, task_id=None, **kwargs):
-    """Log the start of a task and bind a trace ID for tracing."""
-    trace_id = str(uuid.uuid4())
+    """Log the start of a task and bind the trace ID it was published with, or a new one."""
+    trace_id = getattr(sender.request, TRACE_ID_KEY, None) or current_trace_id() or new_trace_id()
     bind_contextvars(task_name=sender.name, task_id=task_id, trace_id=trace_id)
     logger.info("Task started", task_name=sender.name, task_id=task_id, trace_id=trace_id)
 
 
+@task_prerun.connect
+def reset_replica_reads(**kwargs):
+    """Start every task reading from the replica again, as every request does."""
+    unpin_primary()
+
+
 @task_postrun.connect
 def teardown_structlog(sender=None, task_id=None, state=None, exception=None, **kwargs):
     """Log the completion of a task, including errors if they occurred."""
@@ -33,3 +58,19 @@ def teardown_structlog(sender=None, task_id=None, state=None, exception=None, **
             "Task completed successfully", task_name=sender.name, task_id=task_id, trace_id=trace_id, )
 
     clear_contextvars()
+
+
+@worker_process_init.connect
+def setup_profiling(**kwargs):
+    """Let every worker process dump a memory snapshot on SIGUSR2 when profiling is enabled."""
+    install_memory_snapshot_signal()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_published_events(**kwargs):
+    """Flush the events a worker published but hasn't sent; prefork children exit without running atexit."""
+    # Imported here: at the top it would read the ClickHouse settings before DJANGO_SETTINGS_MODULE is set.
+    from core.event_publisher import close_publisher
+
+    close_publisher()
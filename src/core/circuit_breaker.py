@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from enum import StrEnum
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Process-wide circuit breaker shared by every caller of one dependency.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls are rejected without touching the
+    dependency. Once `reset_timeout` seconds have passed it goes half-open and lets a single trial call through:
+    success closes the circuit, failure opens it again, and `release` lets the next call try instead. State changes
+    are logged and counted in `metrics`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.metrics: Counter[str] = Counter()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == CircuitState.OPEN
+
+    def allow_request(self) -> bool:
+        """Returns whether a call may go through; in half-open state only one trial call at a time is allowed."""
+        with self._lock:
+            state = self._current_state()
+            if state == CircuitState.CLOSED:
+                return True
+            if state == CircuitState.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.metrics["rejected"] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.metrics["successes"] += 1
+            self._failures = 0
+            self._trial_in_flight = False
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.metrics["failures"] += 1
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._current_state() == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def release(self) -> None:
+        """Gives back the trial slot of a call whose failure says nothing about the dependency's health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def trip(self) -> None:
+        """Opens the circuit right away, e.g. when a health probe finds the dependency down."""
+        with self._lock:
+            self._trial_in_flight = False
+            self._open()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._transition(CircuitState.CLOSED)
+            self.metrics.clear()
+
+    def _current_state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == self._state:
+            return
+        logger.warning("Circuit breaker state changed", breaker=self.name, from_state=self._state, to_state=state)
+        self.metrics[f"transitions_to_{state}"] += 1
+        self._state = state
+
+
+class HealthProbe:
+    """
+    Checks a dependency every `interval` seconds on a daemon thread and feeds the result to its breaker.
+
+    A failed check trips the breaker; a successful one closes it again. Callers then read the cached state
+    instead of probing the dependency themselves. `start` is idempotent and restarts the thread in forked children.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, check: Callable[[], bool], interval: float) -> None:
+        self._breaker = breaker
+        self._check = check
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._interval <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopped = threading.Event()
+            self._thread = threading.Thread(target=self._run, name=f"{self._breaker.name}-health-probe", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            try:
+                healthy = self._check()
+            except Exception as e:
+                logger.warning("Health probe failed", breaker=self._breaker.name, error=str(e))
+                healthy = False
+
+            if not healthy:
+                self._breaker.trip()
+            elif self._breaker.state != CircuitState.CLOSED:
+                self._breaker.record_success()
@@ -0,0 +1,163 @@
+import itertools
+import threading
+import time
+import uuid
+from collections.abc import Sequence
+from enum import StrEnum
+from typing import Any
+
+import structlog
+from clickhouse_driver import Client
+from clickhouse_driver.errors import Error, ErrorCodes, NetworkError, ServerException, SocketTimeoutError
+
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+logger = structlog.get_logger(__name__)
+
+# Server errors that are about the node rather than the query, so the query may succeed on another replica.
+FAILOVER_ERROR_CODES = frozenset({
+    ErrorCodes.TABLE_IS_READ_ONLY,
+    ErrorCodes.TIMEOUT_EXCEEDED,
+    ErrorCodes.TOO_MANY_SIMULTANEOUS_QUERIES,
+    ErrorCodes.KEEPER_EXCEPTION,
+    ErrorCodes.NO_ZOOKEEPER,
+    ErrorCodes.REPLICA_IS_NOT_IN_QUORUM,
+    ErrorCodes.NETWORK_ERROR,
+    ErrorCodes.SOCKET_TIMEOUT,
+})
+
+
+class LoadBalancing(StrEnum):
+    """How `ReplicatedClient` orders the healthy replicas it sends a query to (CLICKHOUSE_LOAD_BALANCING)."""
+    # Each query starts at the next replica.
+    ROUND_ROBIN = "round_robin"
+    # Each query starts at the replica with the lowest recent latency; replicas not timed yet go first.
+    LEAST_LATENCY = "least_latency"
+
+
+class Replica:
+    """
+    One ClickHouse endpoint and its health, shared by every client of the process.
+
+    Its breaker ejects the replica after consecutive failures and re-admits it through a trial query once its reset
+    timeout has passed. `latency` is an exponentially weighted average of its successful queries, in seconds.
+    """
+    smoothing = 0.2
+
+    def __init__(self, host: str, port: int, breaker: CircuitBreaker) -> None:
+        self.host = host
+        self.port = port
+        self.breaker = breaker
+        self.latency: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def record_latency(self, latency: float) -> None:
+        with self._lock:
+            self.latency = latency if self.latency is None else (
+                self.smoothing * latency + (1 - self.smoothing) * self.latency
+            )
+
+
+class ReplicatedClient:
+    """
+    Stand-in for a clickhouse_driver Client that spreads queries over the replicas of a replicated cluster.
+
+    Every query goes to one healthy replica in `balancing` order. When it fails with a network error or a server
+    error about the node (FAILOVER_ERROR_CODES) the replica's failure is recorded and the query is retried on the
+    next one; errors about the query itself are raised right away. INSERTs carry an `insert_deduplication_token`,
+    the same on every replica they are retried on, so a batch a failed replica did write is not stored twice. Raises
+    CircuitOpenError when every replica is ejected.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[tuple[Replica, Client]],
+        balancing: LoadBalancing = LoadBalancing.ROUND_ROBIN,
+    ) -> None:
+        self._replicas = list(replicas)
+        self._balancing = LoadBalancing(balancing)
+
+    def execute(self, query: str, params: dict | list | None = None, **kwargs: object) -> list | int:
+        kwargs = _with_deduplication_token(query, kwargs)
+        last_error: Error | None = None
+        for replica, client in self._ordered():
+            if not replica.breaker.allow_request():
+                continue
+            started = time.perf_counter()
+            try:
+                result = client.execute(query, params, **kwargs)
+            except BaseException as e:
+                if not is_node_failure(e):
+                    _record_query_failure(replica, e)
+                    raise
+                replica.breaker.record_failure()
+                logger.warning("ClickHouse replica failed, trying the next one", replica=replica.name, error=str(e))
+                last_error = e
+                continue
+            replica.breaker.record_success()
+            replica.record_latency(time.perf_counter() - started)
+            return result
+
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError("Every ClickHouse replica is ejected")
+
+    def disconnect(self) -> None:
+        for _, client in self._replicas:
+            client.disconnect()
+
+    def _ordered(self) -> list[tuple[Replica, Client]]:
+        if self._balancing == LoadBalancing.LEAST_LATENCY:
+            return sorted(self._replicas, key=lambda pair: pair[0].latency or 0.0)
+        start = next(_round_robin) % len(self._replicas)
+        return self._replicas[start:] + self._replicas[:start]
+
+
+def _with_deduplication_token(query: str, kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Gives an INSERT one deduplication token for every replica it is tried on."""
+    if not query.lstrip().upper().startswith("INSERT"):
+        return kwargs
+    return {**kwargs, "settings": {"insert_deduplication_token": uuid.uuid4().hex, **(kwargs.get("settings") or {})}}
+
+
+def _record_query_failure(replica: Replica, error: BaseException) -> None:
+    """Ends a replica's call that failed through no fault of the replica, giving back its half-open trial slot."""
+    if isinstance(error, Error):
+        # The replica answered; the query is at fault and would fail on any of them.
+        replica.breaker.record_success()
+    else:
+        # The call failed before an answer, e.g. encoding the data: nothing is known about the replica.
+        replica.breaker.release()
+
+
+def is_node_failure(error: BaseException) -> bool:
+    """Whether an error is about the node rather than the query, so the query may succeed on another replica."""
+    if isinstance(error, ServerException):
+        return error.code in FAILOVER_ERROR_CODES
+    return isinstance(error, NetworkError | SocketTimeoutError | CircuitOpenError)
+
+
+_round_robin = itertools.count()
+_replicas: dict[tuple[str, int], Replica] = {}
+_replicas_lock = threading.Lock()
+
+
+def get_replica(host: str, port: int, failure_threshold: int, eject_timeout: float) -> Replica:
+    """Returns the process-wide health of an endpoint, so ejections outlive the clients that saw them."""
+    with _replicas_lock:
+        if (host, port) not in _replicas:
+            breaker = CircuitBreaker(
+                f"clickhouse:{host}:{port}", failure_threshold=failure_threshold, reset_timeout=eject_timeout,
+            )
+            _replicas[(host, port)] = Replica(host, port, breaker)
+        return _replicas[(host, port)]
+
+
+def parse_endpoint(endpoint: str, default_port: int) -> tuple[str, int]:
+    """Splits `host[:port]`."""
+    host, _, port = endpoint.partition(":")
+    return host, int(port) if port else default_port
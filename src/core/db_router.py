@@ -0,0 +1,89 @@
+import time
+from contextvars import ContextVar
+
+import structlog
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Model
+
+logger = structlog.get_logger(__name__)
+
+REPLICA_DB_ALIAS = "replica"
+
+# Seconds the replica has yet to replay; 0 when it has replayed everything it received, or isn't a standby at all.
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# Set once the current request or task has written to the primary; from then on it reads from the primary too.
+_wrote_to_primary: ContextVar[bool] = ContextVar("wrote_to_primary", default=False)
+
+
+def unpin_primary(**kwargs: object) -> None:  # noqa: ARG001
+    """Starts a request or task reading from the replica again."""
+    _wrote_to_primary.set(False)
+
+
+request_started.connect(unpin_primary, dispatch_uid="core.db_router.unpin_primary")
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends writes to the primary and reads to the replica.
+
+    A request or task reads its own writes: once it has written, or locked rows with `select_for_update`, its reads
+    go to the primary until the next request or task starts. Reads also go to the primary while the replica is more
+    than DATABASE_REPLICA_MAX_LAG seconds behind or can't be reached; each process checks the lag at most every
+    DATABASE_REPLICA_LAG_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self) -> None:
+        self._lag_checked_at = float("-inf")
+        self._replica_fresh = True
+
+    def db_for_read(self, model: type[Model], **hints: object) -> str:  # noqa: ARG002
+        if _wrote_to_primary.get() or not self._replica_is_fresh():
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model: type[Model], **hints: object) -> str:  # noqa: ARG002
+        _wrote_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints: object) -> bool:  # noqa: ARG002
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name: str | None = None, **hints: object) -> bool:  # noqa: ARG002
+        return db != REPLICA_DB_ALIAS
+
+    def _replica_is_fresh(self) -> bool:
+        now = time.monotonic()
+        if now - self._lag_checked_at >= settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+            self._lag_checked_at = now
+            lag = self._replica_lag()
+            fresh = lag <= settings.DATABASE_REPLICA_MAX_LAG
+            if fresh != self._replica_fresh:
+                log = logger.info if fresh else logger.warning
+                log("Replica reads switched", to=REPLICA_DB_ALIAS if fresh else DEFAULT_DB_ALIAS, lag=lag)
+            self._replica_fresh = fresh
+        return self._replica_fresh
+
+    @staticmethod
+    def _replica_lag() -> float:
+        """Returns the replica's replay lag in seconds; infinite when it can't be reached."""
+        replica = connections[REPLICA_DB_ALIAS]
+        if replica.vendor != "postgresql":
+            return 0.0
+        try:
+            with replica.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                [lag] = cursor.fetchone()
+        except DatabaseError as e:
+            logger.warning("Replica lag check failed", error=str(e))
+            return float("inf")
+        return float(lag)
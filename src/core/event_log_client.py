@@ -1,44 +1,122 @@
+import datetime as dt
+import itertools
 import uuid
+from collections import defaultdict
 from collections.abc import Generator
 from contextlib import contextmanager
+from enum import StrEnum
 from typing import Any
 
 import structlog
 from clickhouse_driver import Client
-from clickhouse_driver.errors import Error
+from clickhouse_driver.errors import Error, ErrorCodes, ServerException
 from django.conf import settings
+from django.utils import timezone
 
+from core.adaptive_batch import AdaptiveBatchSizer
 from core.base_model import Model
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError, HealthProbe
+from core.clickhouse_replicas import ReplicatedClient, get_replica, is_node_failure, parse_endpoint
+from core.event_schema import EventSchema
+from core.profiling import profile_call
+from core.tracing import current_trace_id, new_trace_id
 
 logger = structlog.get_logger(__name__)
 
-EVENT_LOG_COLUMNS = ["event_type", "event_date_time", "environment", "event_context" ]
+EVENT_LOG_COLUMNS = [
+    "event_type", "event_date_time", "environment", "event_context", "trace_id", "claimed_at", "inserted_at", "user_id",
+]
+
+# The event log's user_id of events without a user: the UUID column's default.
+NO_USER_ID = uuid.UUID(int=0)
+
+# A user ID as the outbox backends carry it; see `event_log_user_id`.
+UserId = uuid.UUID | int | str
+
+
+class EventLogRecord(Model):
+    """
+    A single event log row; `event_context` is already JSON-encoded.
+
+    For events relayed from the outbox `event_date_time` is the commit time and `claimed_at` the time the relay
+    claimed the event; events inserted directly count as claimed when they happened. `inserted_at` is set by
+    `EventLogClient.insert`.
+    """
+    event_type: str
+    event_date_time: dt.datetime
+    event_context: str | bytes
+    trace_id: str = ""
+    claimed_at: dt.datetime | None = None
+    user_id: Any = None
+
+
+# Records built by the pipeline from outbox data skip validation through `event_log_record_schema.construct`.
+event_log_record_schema = EventSchema(EventLogRecord)
+
+
+class InsertMode(StrEnum):
+    """How `EventLogClient.insert` writes an event type, and what its return promises (CLICKHOUSE_INSERT_MODES)."""
+    # Client-side batches of the adaptive batch size. The call returns once every batch is written as a part.
+    BATCHED = "batched"
+    # One INSERT the server buffers (async_insert) with other small inserts until a flush threshold is reached. The
+    # call returns once that buffer is written, so the rows are stored and errors are raised, after waiting up to
+    # CLICKHOUSE_ASYNC_INSERT_BUSY_TIMEOUT_MS.
+    ASYNC_WAIT = "async_wait"
+    # Fire and forget: the server buffers the INSERT as above, but the call returns as soon as the rows are in the
+    # buffer. Rows still in the buffer are lost if the server stops, and flush errors only reach the server's log.
+    ASYNC = "async"
+
+
+class EventLogPage(Model):
+    """A page of `EventLogClient.user_events`, newest event first."""
+    events: list[EventLogRecord]
+    # Pass as `before` to get the next page; None on the last one.
+    next_cursor: tuple[dt.datetime, int] | None = None
+
+
+def event_log_user_id(user_id: UserId | None) -> uuid.UUID:
+    """
+    Converts a user ID the way OutboxEvent.user_id stores it: UUIDs and their strings as is, integers (and strings of
+    digits, as the Redis stream carries them) as UUID(int=...), and no user as NO_USER_ID.
+    """
+    if isinstance(user_id, uuid.UUID):
+        return user_id
+    if user_id is None or user_id == "":
+        return NO_USER_ID
+    if isinstance(user_id, int) or str(user_id).isdigit():
+        return uuid.UUID(int=int(user_id))
+    return uuid.UUID(str(user_id))
+
+
+def insert_mode_for(event_type: str) -> InsertMode:
+    return InsertMode(settings.CLICKHOUSE_INSERT_MODES.get(event_type, settings.CLICKHOUSE_DEFAULT_INSERT_MODE))
 
 
 class EventLogClient:
-    def __init__(self, client: Client, schema: str, table: str, environment: str, trace_id: str = None) -> None:
+    # How many times a batch rejected with "too many parts" is retried after backing off.
+    overload_retries = 3
+
+    def __init__(
+        self, client: Client, schema: str, table: str, environment: str, trace_id: str = None,
+        breaker: CircuitBreaker | None = None, batch_sizer: AdaptiveBatchSizer | None = None,
+    ) -> None:
         self._client = client
         self._schema = schema
         self._table = table
         self._environment = environment
-        self._trace_id = trace_id or str(uuid.uuid4())  # Если trace_id не передан, создаем новый
+        self._trace_id = trace_id or current_trace_id() or new_trace_id()
+        self._breaker = breaker or clickhouse_breaker
+        self._batch_sizer = batch_sizer or clickhouse_batch_sizer
 
     @classmethod
     @contextmanager
     def init(cls) -> Generator["EventLogClient", None, None]:
         """Client initialization for ClickHouse."""
-        logger.info("Connecting to ClickHouse", host=settings.CLICKHOUSE_HOST, port=settings.CLICKHOUSE_PORT)
-
-        trace_id = str(uuid.uuid4())
-        client = Client(
-            host=settings.CLICKHOUSE_HOST,
-            port=settings.CLICKHOUSE_PORT,
-            user=settings.CLICKHOUSE_USER,
-            password=settings.CLICKHOUSE_PASSWORD,
-            database=settings.CLICKHOUSE_SCHEMA,
-            connect_timeout=30,
-            send_receive_timeout=10,
-        )
+        logger.info("Connecting to ClickHouse", hosts=settings.CLICKHOUSE_HOSTS, port=settings.CLICKHOUSE_PORT)
+        clickhouse_health_probe.start()
+
+        trace_id = current_trace_id() or new_trace_id()
+        client = create_clickhouse_client()
         try:
             yield cls(
                 client=client,
@@ -53,31 +131,172 @@ class EventLogClient:
         finally:
             client.disconnect()
 
-    def insert(self, data: list[Model], batch_size: int = 100) -> None:
-        """Inserts events into ClickHouse with batching support."""
-        if not self.is_connected():
-            raise Error("ClickHouse is not available")
+    @profile_call("event_log.insert")
+    def insert(
+        self, data: list[Model], batch_size: int | None = None, mode: InsertMode | None = None, columnar: bool = False,
+    ) -> None:
+        """
+        Inserts events into ClickHouse, each event type with its insert mode unless `mode` is given.
+
+        Batched inserts without an explicit `batch_size` take the size the adaptive batch sizer currently allows.
+        With `columnar` the rows are sent as one list per column, which the driver writes without transposing them.
+        Fails fast with CircuitOpenError while the ClickHouse circuit is open instead of waiting for a timeout.
+        """
+        if not self._breaker.allow_request():
+            raise CircuitOpenError("ClickHouse circuit is open")
 
         logger.info("Inserting events into ClickHouse", data_count=len(data), trace_id=self._trace_id)
+        insert_query = f"""
+        INSERT INTO {self._schema}.{self._table} ({', '.join(EVENT_LOG_COLUMNS)})
+        VALUES
+        """
         try:
-            for i in range(0, len(data), batch_size):
-                batch = data[i:i + batch_size]
-                logger.info(
-                    "Attempting batch insert", batch_size=len(batch), columns=EVENT_LOG_COLUMNS, trace_id=self._trace_id,
-                )
+            for insert_mode, events in self._group_by_insert_mode(data, mode).items():
+                if insert_mode == InsertMode.BATCHED:
+                    self._insert_batched(insert_query, events, batch_size, columnar)
+                else:
+                    wait = insert_mode == InsertMode.ASYNC_WAIT
+                    self._insert_async(insert_query, events, wait=wait, columnar=columnar)
+
+        except BaseException as e:
+            self._record_failure(e)
+            logger.error("Failed to insert batch into ClickHouse", error=str(e), trace_id=self._trace_id)
+            raise
+        self._breaker.record_success()
 
-                insert_query = f"""
-                INSERT INTO {self._schema}.{self._table} ({', '.join(EVENT_LOG_COLUMNS)})
-                VALUES
-                """
-                formatted_data = self._convert_data(batch)
+    def _record_failure(self, error: BaseException) -> None:
+        """
+        Counts a failed insert against the breaker when ClickHouse is at fault. A bad batch or an interrupted call says
+        nothing about ClickHouse, but still gives back a half-open breaker's trial slot, or it would stay taken.
+        """
+        if is_node_failure(error):
+            self._breaker.record_failure()
+        else:
+            self._breaker.release()
 
-                self._client.execute(insert_query, formatted_data)
-                logger.info("Batch inserted successfully", batch_size=len(batch), trace_id=self._trace_id)
+    @staticmethod
+    def _group_by_insert_mode(data: list[Model], mode: InsertMode | None) -> dict[InsertMode, list[Model]]:
+        if mode is None and not settings.CLICKHOUSE_INSERT_MODES:
+            mode = settings.CLICKHOUSE_DEFAULT_INSERT_MODE
+        if mode is not None:
+            return {InsertMode(mode): data}
+        grouped: dict[InsertMode, list[Model]] = defaultdict(list)
+        for event in data:
+            grouped[insert_mode_for(event.event_type)].append(event)
+        return grouped
 
-        except Error as e:
+    def _insert_batched(self, insert_query: str, data: list[Model], batch_size: int | None, columnar: bool) -> None:
+        offset = 0
+        while offset < len(data):
+            batch = data[offset:offset + (batch_size or self._batch_sizer.size)]
+            logger.info(
+                "Attempting batch insert", batch_size=len(batch), columns=EVENT_LOG_COLUMNS, trace_id=self._trace_id,
+            )
+
+            self._insert_batch(insert_query, self._convert_data(batch, columnar), len(batch), columnar)
+            logger.info("Batch inserted successfully", batch_size=len(batch), trace_id=self._trace_id)
+            offset += len(batch)
+
+    def _insert_async(self, insert_query: str, data: list[Model], wait: bool, columnar: bool) -> None:
+        """Sends all events in one INSERT for the server to buffer; its flush thresholds decide when parts are made."""
+        log = logger.bind(insert_mode="async", wait=wait, trace_id=self._trace_id)
+        log.info("Attempting batch insert", batch_size=len(data))
+        self._client.execute(insert_query, self._convert_data(data, columnar), columnar=columnar, settings={
+            "async_insert": 1,
+            "wait_for_async_insert": int(wait),
+            "async_insert_max_data_size": settings.CLICKHOUSE_ASYNC_INSERT_MAX_DATA_SIZE,
+            "async_insert_busy_timeout_ms": settings.CLICKHOUSE_ASYNC_INSERT_BUSY_TIMEOUT_MS,
+        })
+        log.info("Batch inserted successfully", batch_size=len(data))
+
+    def _insert_batch(
+        self, insert_query: str, formatted_data: list[tuple] | list[list], rows: int, columnar: bool,
+    ) -> None:
+        """Executes one batch insert, feeding its latency to the batch sizer and backing off on "too many parts"."""
+        for attempt in itertools.count():
+            try:
+                with self._batch_sizer.timed(rows):
+                    self._client.execute(insert_query, formatted_data, columnar=columnar)
+                return
+            except ServerException as e:
+                if e.code != ErrorCodes.TOO_MANY_PARTS or attempt >= self.overload_retries:
+                    raise
+                self._batch_sizer.record_overload()
+                self._batch_sizer.wait()
+
+    def encode_columns(self, data: list[Model]) -> list[list]:
+        """Converts events into the columns `insert_encoded` takes, e.g. to keep them for a later insert."""
+        return self._convert_data(data, columnar=True)
+
+    def insert_encoded(self, columns: list[list]) -> None:
+        """
+        Inserts columns made by `encode_columns`, however many rows they hold, as one columnar INSERT.
+
+        Their inserted_at is stamped anew. Insert modes and the adaptive batch size don't apply: the caller has
+        already sized the insert.
+        """
+        if not self._breaker.allow_request():
+            raise CircuitOpenError("ClickHouse circuit is open")
+
+        rows = len(columns[0])
+        columns[EVENT_LOG_COLUMNS.index("inserted_at")] = [timezone.now()] * rows
+        logger.info("Attempting batch insert", batch_size=rows, encoded=True, trace_id=self._trace_id)
+        try:
+            self._client.execute(
+                f"INSERT INTO {self._schema}.{self._table} ({', '.join(EVENT_LOG_COLUMNS)}) VALUES",
+                columns,
+                columnar=True,
+            )
+        except BaseException as e:
+            self._record_failure(e)
             logger.error("Failed to insert batch into ClickHouse", error=str(e), trace_id=self._trace_id)
             raise
+        self._breaker.record_success()
+        logger.info("Batch inserted successfully", batch_size=rows, encoded=True, trace_id=self._trace_id)
+
+    def user_events(
+        self, user_id: UserId, limit: int = 100, before: tuple[dt.datetime, int] | None = None,
+    ) -> EventLogPage:
+        """
+        Returns a page of a user's events, newest first, starting after the `before` cursor of the previous page.
+
+        The user_id bloom filter index skips the granules without the user's events, and the cursor bounds
+        event_date_time, the sorting key's first column, so a deep page reads no more than the first one. Events of
+        the same microsecond are told apart by a hash of the row.
+        """
+        conditions = ["user_id = %(user_id)s"]
+        params: dict[str, Any] = {"user_id": event_log_user_id(user_id), "limit": limit + 1}
+        if before is not None:
+            # The driver drops the microseconds of datetime parameters, so the cursor is sent as text.
+            params["before_time"], params["before_key"] = before[0].strftime("%Y-%m-%d %H:%M:%S.%f"), before[1]
+            conditions += [
+                "event_date_time <= toDateTime64(%(before_time)s, 6)",
+                "(event_date_time, row_key) < (toDateTime64(%(before_time)s, 6), %(before_key)s)",
+            ]
+        query = f"""
+        SELECT event_type, event_date_time, event_context, trace_id, claimed_at,
+               cityHash64(event_type, event_context, trace_id) AS row_key
+        FROM {self._schema}.{self._table}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY event_date_time DESC, row_key DESC
+        LIMIT %(limit)s
+        """
+        logger.debug("Reading user events", user_id=str(user_id), before=before, trace_id=self._trace_id)
+        try:
+            rows = self._client.execute(query, params)
+        except Error as e:
+            logger.error("Failed to read user events", error=str(e), user_id=str(user_id), trace_id=self._trace_id)
+            raise
+
+        events = [
+            event_log_record_schema.construct(
+                event_type=event_type, event_date_time=event_date_time, event_context=event_context,
+                trace_id=trace_id, claimed_at=claimed_at, user_id=params["user_id"],
+            )
+            for event_type, event_date_time, event_context, trace_id, claimed_at, _ in rows[:limit]
+        ]
+        next_cursor = (rows[limit - 1][1], rows[limit - 1][5]) if len(rows) > limit else None
+        return EventLogPage(events=events, next_cursor=next_cursor)
 
     def execute_query(self, query: str) -> list[tuple[Any]]:
         """Execute a request to ClickHouse using execute."""
@@ -104,6 +323,87 @@ class EventLogClient:
             logger.error("ClickHouse connection failed", error=str(e), trace_id=self._trace_id)
             return False
 
-    def _convert_data(self, data: list[Model]) -> list[tuple]:
+    def _convert_data(self, data: list[Model], columnar: bool = False) -> list[tuple] | list[list]:
         """Converts a list of Model instances into the format suitable for insertion into ClickHouse."""
-        return [(event.event_type, event.event_date_time, self._environment, event.event_context) for event in data]
+        inserted_at = timezone.now()
+        if columnar:
+            return [
+                [event.event_type for event in data],
+                [event.event_date_time for event in data],
+                [self._environment] * len(data),
+                [event.event_context for event in data],
+                [event.trace_id for event in data],
+                [event.claimed_at or event.event_date_time for event in data],
+                [inserted_at] * len(data),
+                [event_log_user_id(event.user_id) for event in data],
+            ]
+        return [
+            (
+                event.event_type, event.event_date_time, self._environment, event.event_context, event.trace_id,
+                event.claimed_at or event.event_date_time, inserted_at, event_log_user_id(event.user_id),
+            )
+            for event in data
+        ]
+
+
+def create_clickhouse_client(**overrides: object) -> Client | ReplicatedClient:
+    """
+    Creates a ClickHouse client from settings; it connects lazily on the first query.
+
+    With several CLICKHOUSE_HOSTS it is a ReplicatedClient, which spreads queries over them and fails over between
+    them.
+    """
+    options = {
+        "user": settings.CLICKHOUSE_USER,
+        "password": settings.CLICKHOUSE_PASSWORD,
+        "database": settings.CLICKHOUSE_SCHEMA,
+        "connect_timeout": settings.CLICKHOUSE_CONNECT_TIMEOUT,
+        "send_receive_timeout": settings.CLICKHOUSE_SEND_RECEIVE_TIMEOUT,
+    }
+    endpoints = [parse_endpoint(endpoint, settings.CLICKHOUSE_PORT) for endpoint in settings.CLICKHOUSE_HOSTS]
+    if len(endpoints) == 1:
+        [(host, port)] = endpoints
+        return Client(**(options | {"host": host, "port": port} | overrides))
+
+    return ReplicatedClient(
+        [
+            (
+                get_replica(
+                    host, port,
+                    failure_threshold=settings.CLICKHOUSE_REPLICA_FAILURE_THRESHOLD,
+                    eject_timeout=settings.CLICKHOUSE_REPLICA_EJECT_TIMEOUT,
+                ),
+                Client(**(options | {"host": host, "port": port} | overrides)),
+            )
+            for host, port in endpoints
+        ],
+        balancing=settings.CLICKHOUSE_LOAD_BALANCING,
+    )
+
+
+def _probe_clickhouse() -> bool:
+    client = create_clickhouse_client(connect_timeout=settings.CLICKHOUSE_HEALTH_CHECK_TIMEOUT)
+    try:
+        client.execute("SELECT 1")
+        return True
+    except Error as e:
+        logger.warning("ClickHouse health check failed", error=str(e))
+        return False
+    finally:
+        client.disconnect()
+
+
+clickhouse_breaker = CircuitBreaker(
+    "clickhouse",
+    failure_threshold=settings.CLICKHOUSE_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.CLICKHOUSE_BREAKER_RESET_TIMEOUT,
+)
+clickhouse_batch_sizer = AdaptiveBatchSizer(
+    initial=settings.CLICKHOUSE_BATCH_SIZE_INITIAL,
+    minimum=settings.CLICKHOUSE_BATCH_SIZE_MIN,
+    maximum=settings.CLICKHOUSE_BATCH_SIZE_MAX,
+    target_latency=settings.CLICKHOUSE_BATCH_TARGET_LATENCY,
+)
+clickhouse_health_probe = HealthProbe(
+    clickhouse_breaker, _probe_clickhouse, interval=settings.CLICKHOUSE_HEALTH_CHECK_INTERVAL,
+)
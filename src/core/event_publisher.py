@@ -0,0 +1,246 @@
+import atexit
+import os
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Callable
+from enum import StrEnum
+from typing import Any
+
+import structlog
+from clickhouse_driver import Client
+from clickhouse_driver.errors import Error as ClickHouseError
+from django.conf import settings
+from django.utils import timezone
+
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.event_log_client import (
+    EventLogClient,
+    UserId,
+    clickhouse_health_probe,
+    create_clickhouse_client,
+    event_log_record_schema,
+)
+from core.event_schema import encode_context
+from core.tracing import current_trace_id
+
+logger = structlog.get_logger(__name__)
+
+# Events handled by the publishers of this process since it started: `published`, `dropped` (the buffer was full or
+# the publisher was closed), `flushed` (inserted into ClickHouse) and `failed` (lost to an insert that failed).
+publisher_metrics: Counter[str] = Counter()
+
+
+class OverflowPolicy(StrEnum):
+    """What `EventPublisher.publish` does with an event while the buffer is full (EVENT_PUBLISHER_OVERFLOW)."""
+    # The new event is dropped; the caller never waits.
+    DROP_NEWEST = "drop_newest"
+    # The oldest buffered event is dropped to make room; the caller never waits.
+    DROP_OLDEST = "drop_oldest"
+    # The caller waits up to `block_timeout` seconds for the flusher to make room, then drops the event.
+    BLOCK = "block"
+
+
+class EventPublisher:
+    """
+    Buffers events in memory and inserts them into the event log from a background thread.
+
+    For events that don't need to be atomic with a database transaction, such as audits and analytics: `publish`
+    only appends to a bounded deque, and the flusher thread sends what has accumulated as one columnar insert once
+    `batch_size` events are buffered or `flush_interval` seconds have passed. Delivery is best effort: events are
+    lost when the buffer overflows, when an insert fails (including while the ClickHouse circuit is open) and when
+    the process dies without closing the publisher.
+
+    The flusher thread is started by the first `publish` in each process, so a publisher created before a fork works
+    in the children; events buffered before the fork are flushed by the parent only. `close` flushes what is left.
+    Inserts go through `breaker`, the process's ClickHouse circuit breaker unless given.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10_000,
+        batch_size: int = 1_000,
+        flush_interval: float = 1.0,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_NEWEST,
+        block_timeout: float = 0.1,
+        connect: Callable[[], Client] = create_clickhouse_client,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self._capacity = capacity
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._overflow = OverflowPolicy(overflow)
+        self._block_timeout = block_timeout
+        self._connect = connect
+        self._breaker = breaker
+        self._buffer: deque[tuple] = deque()
+        self._flush_requested = threading.Event()
+        self._room = threading.Event()
+        self._closed = False
+        self._client: Client | None = None
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+
+    def publish(
+        self, event_type: str, context: dict[str, Any], user_id: UserId | None = None, trace_id: str | None = None,
+    ) -> bool:
+        """
+        Buffers an event for the next flush; returns False when it was dropped instead.
+
+        The context is encoded right away, so the caller may change it afterwards.
+        """
+        if self._pid != os.getpid():
+            self._start()
+        if self._closed:
+            publisher_metrics["dropped"] += 1
+            return False
+
+        event = (event_type, timezone.now(), encode_context(context), trace_id or current_trace_id() or "", user_id)
+        # deque appends and pops are atomic, so publishers never take a lock; a full check may race with another
+        # publisher, which lets the buffer run over its capacity by at most one event per publishing thread.
+        if len(self._buffer) >= self._capacity and not self._make_room():
+            publisher_metrics["dropped"] += 1
+            return False
+        self._buffer.append(event)
+        publisher_metrics["published"] += 1
+        if len(self._buffer) >= self._batch_size:
+            self._flush_requested.set()
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stops accepting events, flushes the buffer and disconnects; a no-op in processes the flusher isn't in."""
+        with self._start_lock:
+            if self._closed or self._pid != os.getpid():
+                return
+            self._closed = True
+        self._flush_requested.set()
+        self._thread.join(timeout)
+
+    def _make_room(self) -> bool:
+        self._flush_requested.set()
+        if self._overflow == OverflowPolicy.DROP_OLDEST:
+            try:
+                self._buffer.popleft()
+            except IndexError:
+                pass
+            else:
+                publisher_metrics["dropped"] += 1
+            return True
+        if self._overflow == OverflowPolicy.BLOCK:
+            return self._wait_for_room()
+        return False
+
+    def _wait_for_room(self) -> bool:
+        """Waits up to `block_timeout` seconds for the flusher to take events off the full buffer."""
+        deadline = time.monotonic() + self._block_timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            self._room.clear()
+            if len(self._buffer) < self._capacity:
+                return True
+            self._room.wait(remaining)
+        return len(self._buffer) < self._capacity
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A forked child inherits the buffer but not the flusher thread or a usable connection.
+            self._buffer = deque()
+            self._client = None
+            self._closed = False
+            self._thread = threading.Thread(target=self._run, name="event-publisher", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._flush_requested.wait(self._flush_interval)
+            self._flush_requested.clear()
+            self._flush()
+        self._flush()
+        if self._client is not None:
+            self._client.disconnect()
+
+    def _flush(self) -> None:
+        while self._buffer:
+            batch = []
+            try:
+                while len(batch) < self._batch_size:
+                    batch.append(self._buffer.popleft())
+            except IndexError:
+                pass
+            self._room.set()
+            self._send(batch)
+
+    def _send(self, batch: list[tuple]) -> None:
+        records = [
+            event_log_record_schema.construct(
+                event_type=event_type, event_date_time=event_date_time, event_context=context, trace_id=trace_id,
+                user_id=user_id,
+            )
+            for event_type, event_date_time, context, trace_id, user_id in batch
+        ]
+        try:
+            self._event_log_client().insert(records, columnar=True)
+        except (CircuitOpenError, ClickHouseError) as e:
+            publisher_metrics["failed"] += len(batch)
+            logger.warning("Published events lost", error=str(e), count=len(batch))
+        except Exception as e:
+            # Anything else would kill the flusher and leave every later event to overflow the buffer.
+            publisher_metrics["failed"] += len(batch)
+            logger.exception("Published events lost", error=str(e), count=len(batch))
+        else:
+            publisher_metrics["flushed"] += len(batch)
+
+    def _event_log_client(self) -> EventLogClient:
+        clickhouse_health_probe.start()
+        if self._client is None:
+            self._client = self._connect()
+        return EventLogClient(
+            client=self._client,
+            schema=settings.CLICKHOUSE_SCHEMA,
+            table=settings.CLICKHOUSE_EVENT_LOG_TABLE_NAME,
+            environment=settings.ENVIRONMENT,
+            breaker=self._breaker,
+        )
+
+
+_publisher: EventPublisher | None = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher() -> EventPublisher:
+    """Returns the process's publisher, configured from settings and closed at interpreter exit."""
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                publisher = EventPublisher(
+                    capacity=settings.EVENT_PUBLISHER_CAPACITY,
+                    batch_size=settings.EVENT_PUBLISHER_BATCH_SIZE,
+                    flush_interval=settings.EVENT_PUBLISHER_FLUSH_INTERVAL,
+                    overflow=settings.EVENT_PUBLISHER_OVERFLOW,
+                    block_timeout=settings.EVENT_PUBLISHER_BLOCK_TIMEOUT,
+                )
+                atexit.register(publisher.close)
+                _publisher = publisher
+    return _publisher
+
+
+def publish(
+    event_type: str, context: dict[str, Any], user_id: UserId | None = None, trace_id: str | None = None,
+) -> bool:
+    """
+    Publishes an event to the event log without a database transaction or outbox row.
+
+    Returns as soon as the event is buffered; see `EventPublisher` for what can get it lost. Events that must not be
+    lost go through the transactional outbox instead.
+    """
+    return get_publisher().publish(event_type, context, user_id, trace_id)
+
+
+def close_publisher(**kwargs: object) -> None:  # noqa: ARG001
+    """Closes the process's publisher, flushing its buffer; for shutdown hooks of processes that skip atexit."""
+    if _publisher is not None:
+        _publisher.close()
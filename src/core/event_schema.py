@@ -0,0 +1,57 @@
+from typing import Any, Generic, TypeVar
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from core.base_model import Model
+
+M = TypeVar("M", bound=Model)
+
+
+class EventSchema(Generic[M]):
+    """
+    Precompiled schema of an event model with two ways in.
+
+    `validate` / `validate_json` run strict validation and are meant for untrusted input. `construct` skips
+    validation entirely and is meant for events the application builds itself from data it already trusts, such as
+    outbox rows. `dump_json` serializes through the compiled serializer straight to bytes.
+    """
+
+    def __init__(self, model: type[M]) -> None:
+        self.model = model
+        self._adapter = TypeAdapter(model)
+        self._fields_set = frozenset(model.model_fields)
+        self._defaults = {
+            name: field.default for name, field in model.model_fields.items()
+            if not field.is_required() and field.default_factory is None
+        }
+
+    def validate(self, data: object) -> M:
+        return self._adapter.validate_python(data, strict=True)
+
+    def validate_json(self, data: str | bytes) -> M:
+        return self._adapter.validate_json(data, strict=True)
+
+    def construct(self, **fields: object) -> M:
+        """
+        Builds an event from its fields without validating them; fields left out take their static defaults.
+
+        Unlike `model_construct`, default factories are not run and aliases are not resolved, which makes this
+        roughly twice as cheap as validation instead of slower than it.
+        """
+        event = self.model.__new__(self.model)
+        object.__setattr__(event, "__dict__", {**self._defaults, **fields})
+        object.__setattr__(event, "__pydantic_fields_set__", self._fields_set)
+        object.__setattr__(event, "__pydantic_extra__", None)
+        object.__setattr__(event, "__pydantic_private__", None)
+        return event
+
+    def dump_json(self, event: M) -> bytes:
+        return self._adapter.dump_json(event)
+
+
+def encode_context(context: dict[str, Any] | str | bytes) -> str | bytes:
+    """JSON-encodes an event context to bytes; contexts that are already encoded are passed through as they are."""
+    if isinstance(context, str | bytes):
+        return context
+    return to_json(context)
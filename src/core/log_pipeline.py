@@ -0,0 +1,103 @@
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from collections import Counter
+from collections.abc import Mapping
+from typing import TextIO
+
+import structlog
+from structlog.typing import EventDict, WrappedLogger
+
+# Log lines dropped on the high-volume path since the process started: `sampled_out:<message>` per sampled message
+# and `queue_full` for records the background handler had no room for.
+logging_metrics: Counter[str] = Counter()
+
+
+class LogSampler:
+    """
+    structlog processor that keeps one in every `rate` debug or info lines of each listed message.
+
+    Meant for messages logged once per batch or event on the event path. Kept lines carry `sampled=<rate>`, so every
+    line stands for `rate` of them; dropped ones are only counted in `logging_metrics`. Warnings and errors are never
+    sampled.
+    """
+
+    def __init__(self, rates: Mapping[str, int]) -> None:
+        self._rates = {message: rate for message, rate in rates.items() if rate > 1}
+        self._seen: Counter[str] = Counter()
+
+    def __call__(self, logger: WrappedLogger, method_name: str, event_dict: EventDict) -> EventDict:  # noqa: ARG002
+        message = event_dict.get("event")
+        rate = self._rates.get(message)
+        if rate is None or method_name not in ("debug", "info"):
+            return event_dict
+
+        seen = self._seen[message]
+        self._seen[message] = seen + 1
+        if seen % rate:
+            logging_metrics[f"sampled_out:{message}"] += 1
+            raise structlog.DropEvent
+        event_dict["sampled"] = rate
+        return event_dict
+
+
+class _DrainingQueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The queue is bounded: wait for room instead of failing to stop while it is full.
+        self.queue.put(self._sentinel)
+
+
+class BackgroundLogHandler(logging.handlers.QueueHandler):
+    """
+    Handler that renders and writes records on a background thread.
+
+    The logging thread only puts the record on a bounded queue; the formatter set on this handler runs in a
+    QueueListener thread that writes to `stream`. When the queue is full the record is dropped and counted as
+    `queue_full` instead of blocking the caller. The listener is restarted in forked children, and `close` drains
+    the queue, which `logging.shutdown` does at exit.
+    """
+
+    def __init__(self, stream: TextIO | None = None, maxsize: int = 10_000) -> None:
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream)
+        self._listener: _DrainingQueueListener | None = None
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+        self._start()
+
+    def setFormatter(self, fmt: logging.Formatter | None) -> None:  # noqa: N802
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the listener; structlog has already rendered the exception into the event dict.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logging_metrics["queue_full"] += 1
+
+    def close(self) -> None:
+        with self._start_lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+        self.target.close()
+        super().close()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A forked child inherits the queue but not the listener thread; records queued before the fork are
+            # written by the parent.
+            self.queue = queue.Queue(self.queue.maxsize)
+            self._listener = _DrainingQueueListener(self.queue, self.target)
+            self._listener.start()
+            self._pid = os.getpid()
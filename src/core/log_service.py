@@ -1,17 +1,37 @@
 import structlog
+from django.utils import timezone
 
-from core.event_log_client import EventLogClient
+from core.circuit_breaker import CircuitOpenError
+from core.event_log_client import EventLogClient, event_log_record_schema
+from core.event_schema import encode_context
+from core.tracing import current_trace_id
+from outbox.backends import write_events
 
 logger = structlog.get_logger(__name__)
 
 
 def log_user_creation_event(user_id: int, event_data: dict) -> None:
-    """Logs user creation event in ClickHouse."""
+    """
+    Logs user creation event in ClickHouse.
+
+    While the ClickHouse circuit is open the event is written to the outbox instead, to be relayed once ClickHouse
+    is back; when called inside a transaction the outbox row joins it.
+    """
     try:
         logger.info("Attempting to log event in ClickHouse", user_id=user_id)
+        record = event_log_record_schema.construct(
+            event_type="user_created",
+            event_date_time=timezone.now(),
+            event_context=encode_context(event_data),
+            trace_id=current_trace_id() or "",
+            user_id=user_id,
+        )
         with EventLogClient.init() as client:
-            client.insert([event_data])
+            client.insert([record])
         logger.info("Event logged successfully", user_id=user_id)
+    except CircuitOpenError:
+        logger.warning("ClickHouse circuit is open, diverting event to the outbox", user_id=user_id)
+        write_events([{"event_type": "user_created", "event_context": event_data, "user_id": user_id}])
     except Exception as e:
         logger.error("Error logging event in ClickHouse", user_id=user_id, error=str(e))
         raise
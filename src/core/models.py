@@ -1,12 +1,53 @@
+from collections.abc import Iterable, Sequence
 
 from django.db import models
 from django.utils import timezone
 
 
+class TimeStampedQuerySet(models.QuerySet):
+    """
+    QuerySet whose bulk operations keep `created_at` and `updated_at` current, as `save()` does.
+
+    `update()` and `bulk_update()` bypass `save()` and `auto_now`, so without this the rows they touch keep their
+    old `updated_at`. A caller passing `updated_at` explicitly to `update()` keeps its value.
+    """
+
+    def update(self, **kwargs: object) -> int:
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs: Iterable[models.Model], fields: Sequence[str], batch_size: int | None = None) -> int:
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        return super().bulk_update(objs, _with_updated_at(fields), batch_size=batch_size)
+
+    def bulk_create(
+        self, objs: Iterable[models.Model], batch_size: int | None = None, ignore_conflicts: bool = False,
+        update_conflicts: bool = False, update_fields: Sequence[str] | None = None,
+        unique_fields: Sequence[str] | None = None,
+    ) -> list[models.Model]:
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.created_at = obj.created_at or now
+            obj.updated_at = now
+        if update_conflicts and update_fields:
+            # Rows updated on conflict keep their created_at and get the new updated_at.
+            update_fields = _with_updated_at(update_fields)
+        return super().bulk_create(
+            objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts, update_conflicts=update_conflicts,
+            update_fields=update_fields, unique_fields=unique_fields,
+        )
+
+
 class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(default=timezone.now, db_index=True)
     updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
+    objects = TimeStampedQuerySet.as_manager()
+
     class Meta:
         abstract = True
 
@@ -22,14 +63,16 @@ class TimeStampedModel(models.Model):
         force_insert: If True, the object will be inserted as new (default is False).
         force_update: If True, the object will be updated (defaults to False).
         using: The database that will be used for saving (default None).
-        update_fields: A list or set of fields to be updated.
+        update_fields: An iterable of fields to be updated; 'updated_at' is added to a copy of it.
         """
         self.updated_at = timezone.now()
 
         if update_fields is not None:
-            if isinstance(update_fields, list):
-                update_fields.append('updated_at')
-            elif isinstance(update_fields, set):
-                update_fields.add('updated_at')
+            update_fields = _with_updated_at(update_fields)
 
         super().save(force_insert, force_update, using, update_fields)
+
+
+def _with_updated_at(fields: Iterable[str]) -> list[str]:
+    fields = list(fields)
+    return fields if 'updated_at' in fields else [*fields, 'updated_at']
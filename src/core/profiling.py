@@ -0,0 +1,218 @@
+import cProfile
+import datetime as dt
+import itertools
+import os
+import random
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable, Generator
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from enum import StrEnum
+from functools import partial
+from pathlib import Path
+from types import FrameType
+
+import structlog
+from django.conf import settings
+from django.db import connections, transaction
+
+from core.tracing import current_trace_id
+
+logger = structlog.get_logger(__name__)
+
+# Set while a call of this context is being profiled; nested profiled calls are covered by the outer profile.
+_active_profile: ContextVar[str | None] = ContextVar("active_profile", default=None)
+_dump_counter = itertools.count()
+
+
+class ProfilerMode(StrEnum):
+    # Deterministic cProfile of the call, dumped as pstats.
+    CPROFILE = "cprofile"
+    # Wall-clock stack sampling of the calling thread, dumped as collapsed stacks.
+    STACK = "stack"
+
+
+class QueryStats:
+    """Counts the SQL statements a call issues on any database alias and the time they take."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute: Callable, sql: str, params: object, many: bool, context: dict) -> object:  # noqa: ARG002
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class CProfiler:
+    """Deterministic profile of the calling thread, dumped as pstats."""
+    suffix = "pstats"
+
+    def __init__(self) -> None:
+        self._profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+
+    def dump(self, path: Path) -> None:
+        self._profile.dump_stats(path)
+
+
+class StackSampler:
+    """Samples the stack of one thread every `interval` seconds from a daemon thread and counts collapsed stacks."""
+    suffix = "collapsed"
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.stacks: Counter[str] = Counter()
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def dump(self, path: Path) -> None:
+        """Writes the samples in the collapsed format flame graph tools read: `frame;frame;frame count`."""
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()))
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)  # noqa: SLF001
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame: FrameType | None) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+@contextmanager
+def profile_call(name: str) -> Generator[None, None, None]:
+    """
+    Profiles a sample of the calls made within the block, usable as a context manager or a decorator.
+
+    Off unless PROFILING_ENABLED; then one in every 1/PROFILING_SAMPLE_RATE calls is profiled with the
+    PROFILING_MODE profiler, and the SQL statements it issues are counted and timed. The profile is dumped to
+    PROFILING_DIR, the summary is logged as "Call profiled" and, with PROFILING_CLICKHOUSE_SUMMARY, written to the
+    event log as a `profile_summary` event once the surrounding transaction commits. Calls made within a profiled
+    call are covered by its profile and are not profiled on their own.
+    """
+    if not _sampled():
+        yield
+        return
+
+    queries = QueryStats()
+    profiler = _profiler(ProfilerMode(settings.PROFILING_MODE))
+
+    token = _active_profile.set(name)
+    started_at = dt.datetime.now(dt.UTC)
+    started = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            # Routed reads go to the replica alias, so every alias is counted, not only the default one.
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(queries))
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+    finally:
+        duration = time.perf_counter() - started
+        _active_profile.reset(token)
+        path = None
+        try:
+            path = _dump_path(name, profiler.suffix)
+            profiler.dump(path)
+        except OSError as e:
+            logger.warning("Failed to dump profile", name=name, error=str(e))
+        _report(name, started_at, duration, queries, path)
+
+
+def _sampled() -> bool:
+    """Whether to profile this call: profiling is on, no outer call is being profiled and the call is sampled."""
+    return (
+        settings.PROFILING_ENABLED
+        and not _active_profile.get()
+        and random.random() < settings.PROFILING_SAMPLE_RATE  # noqa: S311
+    )
+
+
+def _profiler(mode: ProfilerMode) -> CProfiler | StackSampler:
+    if mode == ProfilerMode.CPROFILE:
+        return CProfiler()
+    return StackSampler(threading.get_ident(), settings.PROFILING_STACK_INTERVAL)
+
+
+def install_memory_snapshot_signal(signum: int = signal.SIGUSR2) -> None:
+    """
+    Starts tracemalloc and dumps a snapshot to PROFILING_DIR whenever the process receives `signum`.
+
+    Off unless PROFILING_ENABLED, and only possible from the main thread. Load snapshots with
+    `tracemalloc.Snapshot.load` and compare two of them to see what grew.
+    """
+    if not settings.PROFILING_ENABLED:
+        return
+    if threading.current_thread() is not threading.main_thread():
+        logger.warning("Memory snapshot signal can only be installed from the main thread")
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.PROFILING_TRACEMALLOC_FRAMES)
+    signal.signal(signum, lambda *_: dump_memory_snapshot())
+
+
+def dump_memory_snapshot() -> Path | None:
+    """Dumps a tracemalloc snapshot to PROFILING_DIR and returns its path; None while tracemalloc is not tracing."""
+    if not tracemalloc.is_tracing():
+        return None
+    path = _dump_path("memory", "tracemalloc")
+    tracemalloc.take_snapshot().dump(path)
+    logger.info("Memory snapshot dumped", path=str(path))
+    return path
+
+
+def _dump_path(name: str, suffix: str) -> Path:
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = dt.datetime.now(dt.UTC).strftime("%Y%m%dT%H%M%S")
+    return directory / f"{name}.{stamp}.{os.getpid()}.{next(_dump_counter)}.{suffix}"
+
+
+def _report(name: str, started_at: dt.datetime, duration: float, queries: QueryStats, path: Path | None) -> None:
+    summary = {
+        "name": name,
+        "started_at": started_at.isoformat(),
+        "duration": round(duration, 6),
+        "sql_count": queries.count,
+        "sql_duration": round(queries.duration, 6),
+        "profile": str(path) if path else "",
+        "trace_id": current_trace_id() or "",
+    }
+    logger.info("Call profiled", **summary)
+    if settings.PROFILING_CLICKHOUSE_SUMMARY:
+        # Imported here: the outbox imports the event log client, which is itself profiled.
+        from outbox.backends import write_events
+
+        transaction.on_commit(partial(write_events, [{"event_type": "profile_summary", "event_context": summary}]))
@@ -1,10 +1,13 @@
+import logging
 import os
+import tempfile
 from pathlib import Path
 
 import environ
-import sentry_sdk
 import structlog
 
+from core.log_pipeline import BackgroundLogHandler, LogSampler
+
 env = environ.Env(
     DEBUG=(bool, False),
     TIME_ZONE=(str, "Europe/Moscow"),
@@ -65,7 +68,26 @@ TEMPLATES = [
     },
 ]
 
-DATABASES = {"default": env.db("DATABASE_URL")}
+# Web threads and Celery prefork children each keep their connection for DATABASE_CONN_MAX_AGE seconds (0: one
+# connection per request or task) and check it is still alive before reusing it after an error. Behind a
+# transaction-pooling PgBouncer, set DATABASE_BEHIND_POOLER: server-side cursors don't survive it.
+DATABASE_CONNECTION_SETTINGS = {
+    "CONN_MAX_AGE": env.int("DATABASE_CONN_MAX_AGE", default=60),
+    "CONN_HEALTH_CHECKS": env.bool("DATABASE_CONN_HEALTH_CHECKS", default=True),
+    "DISABLE_SERVER_SIDE_CURSORS": env.bool("DATABASE_BEHIND_POOLER", default=False),
+}
+DATABASES = {"default": {**env.db("DATABASE_URL"), **DATABASE_CONNECTION_SETTINGS}}
+
+# Optional read replica. With DATABASE_REPLICA_URL set, reads go to it unless the request or task has already
+# written, or the replica is more than DATABASE_REPLICA_MAX_LAG seconds behind (see core.db_router). Tests read the
+# test database through it.
+DATABASE_REPLICA_MAX_LAG = env.float("DATABASE_REPLICA_MAX_LAG", default=5.0)
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = env.float("DATABASE_REPLICA_LAG_CHECK_INTERVAL", default=1.0)
+if env("DATABASE_REPLICA_URL", default=""):
+    DATABASES["replica"] = {
+        **env.db("DATABASE_REPLICA_URL"), **DATABASE_CONNECTION_SETTINGS, "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
 
 CLICKHOUSE_DATABASE = 'test_database'
 CLICKHOUSE_HOST = env("CLICKHOUSE_HOST", default="clickhouse")
@@ -79,6 +101,43 @@ CLICKHOUSE_URI = (
     f"{CLICKHOUSE_PROTOCOL}"
 )
 CLICKHOUSE_EVENT_LOG_TABLE_NAME = "event_log"
+# Replicas of a replicated cluster as host[:port], e.g. CLICKHOUSE_HOSTS=ch1,ch2:9440; CLICKHOUSE_HOST when unset.
+# Queries are spread over them (CLICKHOUSE_LOAD_BALANCING=round_robin or least_latency) and fail over between them.
+# A replica failing CLICKHOUSE_REPLICA_FAILURE_THRESHOLD times in a row is ejected for CLICKHOUSE_REPLICA_EJECT_TIMEOUT
+# seconds, then re-admitted through a trial query.
+CLICKHOUSE_HOSTS: list[str] = env.list("CLICKHOUSE_HOSTS", default=[CLICKHOUSE_HOST])
+CLICKHOUSE_LOAD_BALANCING = env("CLICKHOUSE_LOAD_BALANCING", default="round_robin")
+CLICKHOUSE_REPLICA_FAILURE_THRESHOLD = env.int("CLICKHOUSE_REPLICA_FAILURE_THRESHOLD", default=3)
+CLICKHOUSE_REPLICA_EJECT_TIMEOUT = env.float("CLICKHOUSE_REPLICA_EJECT_TIMEOUT", default=30)
+CLICKHOUSE_CONNECT_TIMEOUT = env.float("CLICKHOUSE_CONNECT_TIMEOUT", default=30)
+CLICKHOUSE_SEND_RECEIVE_TIMEOUT = env.float("CLICKHOUSE_SEND_RECEIVE_TIMEOUT", default=10)
+# Circuit breaker shared by all ClickHouse writers of a process, fed by a background health check
+# (CLICKHOUSE_HEALTH_CHECK_INTERVAL=0 disables the check).
+CLICKHOUSE_BREAKER_FAILURE_THRESHOLD = env.int("CLICKHOUSE_BREAKER_FAILURE_THRESHOLD", default=3)
+CLICKHOUSE_BREAKER_RESET_TIMEOUT = env.float("CLICKHOUSE_BREAKER_RESET_TIMEOUT", default=30)
+CLICKHOUSE_HEALTH_CHECK_INTERVAL = env.float("CLICKHOUSE_HEALTH_CHECK_INTERVAL", default=5)
+CLICKHOUSE_HEALTH_CHECK_TIMEOUT = env.float("CLICKHOUSE_HEALTH_CHECK_TIMEOUT", default=2)
+# Insert batches grow while they take less than the target latency (seconds) and shrink when they take longer.
+CLICKHOUSE_BATCH_SIZE_INITIAL = env.int("CLICKHOUSE_BATCH_SIZE_INITIAL", default=1000)
+CLICKHOUSE_BATCH_SIZE_MIN = env.int("CLICKHOUSE_BATCH_SIZE_MIN", default=100)
+CLICKHOUSE_BATCH_SIZE_MAX = env.int("CLICKHOUSE_BATCH_SIZE_MAX", default=50_000)
+CLICKHOUSE_BATCH_TARGET_LATENCY = env.float("CLICKHOUSE_BATCH_TARGET_LATENCY", default=0.5)
+# How each event type is inserted (core.event_log_client.InsertMode): "batched" client-side batches, or server-side
+# buffering with async_insert, "async_wait" acknowledged once flushed or "async" fire and forget, e.g.
+# CLICKHOUSE_INSERT_MODES=user_created=async_wait. The server flushes its buffer once it holds
+# CLICKHOUSE_ASYNC_INSERT_MAX_DATA_SIZE bytes or CLICKHOUSE_ASYNC_INSERT_BUSY_TIMEOUT_MS after the first insert.
+CLICKHOUSE_DEFAULT_INSERT_MODE = env("CLICKHOUSE_DEFAULT_INSERT_MODE", default="batched")
+CLICKHOUSE_INSERT_MODES: dict[str, str] = env.dict("CLICKHOUSE_INSERT_MODES", default={})
+CLICKHOUSE_ASYNC_INSERT_MAX_DATA_SIZE = env.int("CLICKHOUSE_ASYNC_INSERT_MAX_DATA_SIZE", default=1_000_000)
+CLICKHOUSE_ASYNC_INSERT_BUSY_TIMEOUT_MS = env.int("CLICKHOUSE_ASYNC_INSERT_BUSY_TIMEOUT_MS", default=200)
+# In-process publisher for events that skip the outbox (core.event_publisher): flushes once EVENT_PUBLISHER_BATCH_SIZE
+# events are buffered or every EVENT_PUBLISHER_FLUSH_INTERVAL seconds. EVENT_PUBLISHER_OVERFLOW is drop_newest,
+# drop_oldest or block (for up to EVENT_PUBLISHER_BLOCK_TIMEOUT seconds) once EVENT_PUBLISHER_CAPACITY are buffered.
+EVENT_PUBLISHER_CAPACITY = env.int("EVENT_PUBLISHER_CAPACITY", default=10_000)
+EVENT_PUBLISHER_BATCH_SIZE = env.int("EVENT_PUBLISHER_BATCH_SIZE", default=1_000)
+EVENT_PUBLISHER_FLUSH_INTERVAL = env.float("EVENT_PUBLISHER_FLUSH_INTERVAL", default=1.0)
+EVENT_PUBLISHER_OVERFLOW = env("EVENT_PUBLISHER_OVERFLOW", default="drop_newest")
+EVENT_PUBLISHER_BLOCK_TIMEOUT = env.float("EVENT_PUBLISHER_BLOCK_TIMEOUT", default=0.1)
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -114,8 +173,74 @@ CELERY_ENABLE_UTC = True
 CELERY_TASK_ALWAYS_EAGER = DEBUG
 CELERY_RESULT_EXPIRES = 3600
 
+# Event pipeline tasks get a queue of their own so that long-running batch relays never sit behind
+# (or in front of) regular tasks. They are fire-and-forget: their results are never stored.
+CELERY_TASK_DEFAULT_QUEUE = env("CELERY_DEFAULT_QUEUE", default="default")
+CELERY_EVENT_PIPELINE_QUEUE = env("CELERY_EVENT_PIPELINE_QUEUE", default="event_pipeline")
+CELERY_TASK_ROUTES = {
+    "users.tasks.tasks.log_user_creation": {"queue": CELERY_EVENT_PIPELINE_QUEUE},
+    "outbox.tasks.*": {"queue": CELERY_EVENT_PIPELINE_QUEUE},
+}
+CELERY_EVENT_PIPELINE_TASK_OPTIONS = {
+    "ignore_result": True,
+    "acks_late": True,
+    "reject_on_worker_lost": True,
+}
+# With acks_late a message is redelivered once the visibility timeout passes, so it must outlive the longest batch.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": env.int("CELERY_VISIBILITY_TIMEOUT", default=3600),
+}
+
+# Transactional outbox. Every event type is written by the default backend unless OUTBOX_EVENT_BACKENDS
+# maps it to another one, e.g. OUTBOX_EVENT_BACKENDS=audit_ping=redis_stream
+OUTBOX_DEFAULT_BACKEND = env("OUTBOX_DEFAULT_BACKEND", default="postgres")
+OUTBOX_EVENT_BACKENDS: dict[str, str] = env.dict("OUTBOX_EVENT_BACKENDS", default={})
+OUTBOX_RELAY_INTERVAL = env.float("OUTBOX_RELAY_INTERVAL", default=5.0)
+OUTBOX_REDIS_URL = env("OUTBOX_REDIS_URL", default=CELERY_BROKER_URL)
+OUTBOX_REDIS_STREAM = env("OUTBOX_REDIS_STREAM", default="outbox:event_log")
+OUTBOX_REDIS_GROUP = env("OUTBOX_REDIS_GROUP", default="event_log_relay")
+OUTBOX_REDIS_CLAIM_IDLE_MS = env.int("OUTBOX_REDIS_CLAIM_IDLE_MS", default=60_000)
+OUTBOX_REDIS_BLOCK_MS = env.int("OUTBOX_REDIS_BLOCK_MS", default=1000)
+# Optional per-event-type coalescing of relay batches, mapping event types to keep_last or merge_contexts (for example
+# user_created to keep_last); see the README for the format.
+OUTBOX_COALESCING: dict[str, str] = env.dict("OUTBOX_COALESCING", default={})
+OUTBOX_COALESCING_WINDOW = env.float("OUTBOX_COALESCING_WINDOW", default=10.0)
+# While the ClickHouse circuit is open the relay encodes pending Postgres outbox rows into a memory-mapped file of up to
+# OUTBOX_SPILL_MAX_BYTES (0 disables it) in OUTBOX_SPILL_DIR, and replays it in inserts of up to
+# OUTBOX_SPILL_REPLAY_ROWS rows once ClickHouse is back.
+OUTBOX_SPILL_MAX_BYTES = env.int("OUTBOX_SPILL_MAX_BYTES", default=64 * 1024 * 1024)
+OUTBOX_SPILL_DIR = env("OUTBOX_SPILL_DIR", default=tempfile.gettempdir())
+OUTBOX_SPILL_REPLAY_ROWS = env.int("OUTBOX_SPILL_REPLAY_ROWS", default=100_000)
+
+CELERY_BEAT_SCHEDULE = {
+    "relay-outbox-events": {"task": "outbox.tasks.relay_outbox_events", "schedule": OUTBOX_RELAY_INTERVAL},
+}
+
 LOG_FORMATTER = env("LOG_FORMATTER", default="console")
 LOG_LEVEL = env("LOG_LEVEL", default="INFO")
+# High-volume mode: drops lines below LOG_LEVEL before any processor runs, samples the per-batch messages in
+# LOG_SAMPLING (message=keep one in N) and renders on a background thread.
+LOG_HIGH_VOLUME = env.bool("LOG_HIGH_VOLUME", default=False)
+LOG_SAMPLING: dict[str, int] = env.dict("LOG_SAMPLING", cast={"value": int}, default={
+    "Inserting events into ClickHouse": 100,
+    "Attempting batch insert": 100,
+    "Batch inserted successfully": 100,
+    "Event added to outbox": 100,
+    "Outbox events relayed": 10,
+})
+LOG_QUEUE_SIZE = env.int("LOG_QUEUE_SIZE", default=10_000)
+
+# Opt-in profiling of use cases, event log inserts and the outbox relay (see core.profiling).
+PROFILING_ENABLED = env.bool("PROFILING_ENABLED", default=False)
+# Share of calls profiled, 0..1.
+PROFILING_SAMPLE_RATE = env.float("PROFILING_SAMPLE_RATE", default=0.01)
+# "cprofile" (pstats files) or "stack" (wall-clock stack sampling, collapsed stacks files).
+PROFILING_MODE = env("PROFILING_MODE", default="cprofile")
+PROFILING_STACK_INTERVAL = env.float("PROFILING_STACK_INTERVAL", default=0.005)
+PROFILING_DIR = env("PROFILING_DIR", default=str(BASE_DIR / "profiles"))
+PROFILING_TRACEMALLOC_FRAMES = env.int("PROFILING_TRACEMALLOC_FRAMES", default=25)
+# Also write a `profile_summary` event per profiled call to the event log.
+PROFILING_CLICKHOUSE_SUMMARY = env.bool("PROFILING_CLICKHOUSE_SUMMARY", default=False)
 
 LOGGING = {
     "version": 1,
@@ -126,6 +251,10 @@ LOGGING = {
     },
     "handlers": {
         "default": {"level": LOG_LEVEL, "class": "logging.StreamHandler", "formatter": LOG_FORMATTER},
+    } if not LOG_HIGH_VOLUME else {
+        "default": {
+            "()": BackgroundLogHandler, "maxsize": LOG_QUEUE_SIZE, "level": LOG_LEVEL, "formatter": LOG_FORMATTER,
+        },
     },
     "loggers": {
         "app": {"handlers": ["default"], "level": LOG_LEVEL, "propagate": True},
@@ -136,8 +265,9 @@ LOGGING = {
 
 structlog.configure(
     processors=[
+        *([LogSampler(LOG_SAMPLING)] if LOG_HIGH_VOLUME else []),
         structlog.contextvars.merge_contextvars,
-        structlog.stdlib.filter_by_level,
+        *([] if LOG_HIGH_VOLUME else [structlog.stdlib.filter_by_level]),
         structlog.stdlib.add_logger_name,
         structlog.stdlib.add_log_level,
         structlog.stdlib.PositionalArgumentsFormatter(),
@@ -147,6 +277,7 @@ structlog.configure(
         structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
     ],
     logger_factory=structlog.stdlib.LoggerFactory(),
+    wrapper_class=structlog.make_filtering_bound_logger(logging.getLevelName(LOG_LEVEL)) if LOG_HIGH_VOLUME else None,
     cache_logger_on_first_use=True,
 )
 
@@ -156,12 +287,17 @@ SENTRY_SETTINGS = {
 }
 
 if SENTRY_SETTINGS.get("dsn") and not DEBUG:
+    # Imported only when enabled: the SDK and its integrations are a noticeable part of every process's start.
+    import sentry_sdk
+    from sentry_sdk.integrations.celery import CeleryIntegration
+    from sentry_sdk.integrations.django import DjangoIntegration
+
     sentry_sdk.init(
         dsn=SENTRY_SETTINGS["dsn"],
         environment=SENTRY_SETTINGS["environment"],
         integrations=[
-            sentry_sdk.DjangoIntegration(),
-            sentry_sdk.CeleryIntegration(),
+            DjangoIntegration(),
+            CeleryIntegration(),
         ],
         default_integrations=False,
     )
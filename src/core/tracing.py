@@ -0,0 +1,29 @@
+import uuid
+from collections.abc import Generator
+from contextlib import contextmanager
+
+import structlog
+
+# The trace id lives in structlog's context variables, so every log line of a trace carries it.
+TRACE_ID_KEY = "trace_id"
+
+
+def current_trace_id() -> str | None:
+    return structlog.contextvars.get_contextvars().get(TRACE_ID_KEY)
+
+
+def new_trace_id() -> str:
+    return str(uuid.uuid4())
+
+
+@contextmanager
+def trace(trace_id: str | None = None) -> Generator[str, None, None]:
+    """
+    Runs the block within a trace and yields its id.
+
+    Without an explicit `trace_id` the block joins the current trace, or starts a new one if there is none. The id is
+    stored on outbox events added within the block and travels with them into the event log.
+    """
+    trace_id = trace_id or current_trace_id() or new_trace_id()
+    with structlog.contextvars.bound_contextvars(**{TRACE_ID_KEY: trace_id}):
+        yield trace_id
@@ -0,0 +1,25 @@
+from collections.abc import Generator
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def unit_of_work(savepoint: bool = False, using: str | None = None) -> Generator[None, None, None]:
+    """
+    Transaction of a use case, usable as a context manager or a decorator.
+
+    The outermost unit of work behaves like `transaction.atomic()` and, outside any atomic block, opens the one real
+    transaction. Units of work entered inside it, by the outbox, repositories or nested use cases, join that
+    transaction instead of issuing SAVEPOINT / RELEASE round trips; an error in any of them rolls the whole unit
+    back. Participants that must be able to roll back on their own while the outer unit carries on ask for
+    `savepoint=True`.
+    """
+    connection = transaction.get_connection(using)
+    depth = getattr(connection, "unit_of_work_depth", 0)
+    with transaction.atomic(using=using, savepoint=savepoint or depth == 0):
+        connection.unit_of_work_depth = depth + 1
+        try:
+            yield
+        finally:
+            connection.unit_of_work_depth = depth
@@ -2,9 +2,11 @@ from abc import ABC, abstractmethod
 from typing import Any
 
 import structlog
-from django.db import transaction
 
 from core.base_model import Model
+from core.profiling import profile_call
+from core.tracing import trace
+from core.unit_of_work import unit_of_work
 
 logger = structlog.get_logger(__name__)
 
@@ -24,9 +26,13 @@ class UseCase(ABC):
     """Abstract class defining the interface for all Use Cases."""
 
     def execute(self, request: BaseRequest) -> BaseResponse:
-        """Executes the Use Case."""
+        """Executes the Use Case within a trace, joining the caller's trace if there is one."""
         context_vars = self._get_context_vars(request)
-        with structlog.contextvars.bound_contextvars(**context_vars):
+        with (
+            trace(),
+            profile_call(f"use_case.{self.__class__.__name__}"),
+            structlog.contextvars.bound_contextvars(**context_vars),
+        ):
             logger.info("Executing use case", use_case=self.__class__.__name__, **context_vars)
             try:
                 return self._execute(request)
@@ -34,12 +40,10 @@ class UseCase(ABC):
                 logger.error("Error executing use case", error=str(e), use_case=self.__class__.__name__, **context_vars)
                 return self._error_response(str(e))
 
-    def _get_context_vars(self, request: BaseRequest) -> dict[str, Any]:
-        """Generates context variables for logging."""
-        # Include a unique request ID for tracing
+    def _get_context_vars(self, _request: BaseRequest) -> dict[str, Any]:
+        """Generates context variables for logging; the trace id is bound by `execute`."""
         return {
             "use_case": self.__class__.__name__,
-            "request_id": str(id(request)),  # Use the memory ID or another unique identifier
         }
 
     @abstractmethod
@@ -61,15 +65,15 @@ class UseCaseResponse(Model):
 class TransactionalUseCase(UseCase):
     """Abstract Use Case with transactional execution."""
 
-    @transaction.atomic
+    @unit_of_work()
     def execute(self, request: BaseRequest) -> UseCaseResponse:
         """
         Execute the Use Case within a database transaction.
 
-        Overrides the base execute method to wrap the operation in an atomic block.
+        Overrides the base execute method to wrap the operation in a unit of work.
         """
         context_vars = self._get_context_vars(request)
-        with structlog.contextvars.bound_contextvars(**context_vars):
+        with trace(), structlog.contextvars.bound_contextvars(**context_vars):
             logger.info("Executing transactional use case", use_case=self.__class__.__name__, **context_vars)
             try:
                 return super().execute(request)
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+from core.profiling import install_memory_snapshot_signal  # noqa: E402
+
+install_memory_snapshot_signal()
@@ -0,0 +1,237 @@
+import datetime as dt
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Any
+
+import structlog
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.circuit_breaker import CircuitOpenError
+from core.event_schema import encode_context
+from core.tracing import current_trace_id
+from outbox.models import OutboxEvent
+
+# Every web request and worker imports this module through the transactional outbox, while only the processes using
+# the Redis or ClickHouse backend need their clients; those are imported on first use.
+if TYPE_CHECKING:
+    import redis
+
+    from core.event_log_client import EventLogClient
+
+logger = structlog.get_logger(__name__)
+
+
+class OutboxBackend(ABC):
+    """Storage the transactional outbox hands its events to when the surrounding transaction commits."""
+    name: str
+
+    @classmethod
+    def from_settings(cls) -> "OutboxBackend":
+        return cls()
+
+    @abstractmethod
+    def write(self, events: list[dict[str, Any]]) -> None:
+        """Writes the events; called inside the still-open transaction."""
+
+
+class PostgresOutboxBackend(OutboxBackend):
+    """Stores events as `OutboxEvent` rows in the same transaction as the business data."""
+    name = "postgres"
+
+    def write(self, events: list[dict[str, Any]]) -> None:
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(
+                user_id=event.get("user_id"),
+                event_type=event["event_type"],
+                event_data=event["event_context"],
+                trace_id=event.get("trace_id") or "",
+            )
+            for event in events
+        ])
+        logger.debug("Outbox events written", backend=self.name, count=len(events))
+
+
+class RedisStreamOutboxBackend(OutboxBackend):
+    """
+    Appends events to a Redis stream once the transaction has committed.
+
+    Events are not part of the Postgres transaction: a crash between the commit and the XADD loses them, so this
+    backend is meant for event types that can tolerate that. The relay reads the stream through a consumer group;
+    entries a dead consumer left unacknowledged are taken over with XAUTOCLAIM after `claim_idle_ms`. Reads block
+    for up to `block_ms` waiting for new entries; 0 returns immediately.
+    """
+    name = "redis_stream"
+
+    def __init__(
+        self, client: "redis.Redis", stream: str, group: str, claim_idle_ms: int = 60_000, block_ms: int = 1000,
+    ) -> None:
+        self._redis = client
+        self._stream = stream
+        self._group = group
+        self._claim_idle_ms = claim_idle_ms
+        self._block_ms = block_ms
+        self._group_ready = False
+
+    @classmethod
+    def from_settings(cls) -> "RedisStreamOutboxBackend":
+        import redis
+
+        return cls(
+            client=redis.Redis.from_url(settings.OUTBOX_REDIS_URL, decode_responses=True),
+            stream=settings.OUTBOX_REDIS_STREAM,
+            group=settings.OUTBOX_REDIS_GROUP,
+            claim_idle_ms=settings.OUTBOX_REDIS_CLAIM_IDLE_MS,
+            block_ms=settings.OUTBOX_REDIS_BLOCK_MS,
+        )
+
+    def write(self, events: list[dict[str, Any]]) -> None:
+        created_at = timezone.now()
+        transaction.on_commit(partial(self._publish, [self._encode(event, created_at) for event in events]))
+
+    def claim(self, consumer: str, count: int) -> list[tuple[str, dict[str, str]]]:
+        """Takes over stale entries of dead consumers first, then reads new ones, up to `count` in total."""
+        self._ensure_group()
+        entries = self._redis.xautoclaim(
+            self._stream, self._group, consumer, min_idle_time=self._claim_idle_ms, start_id="0-0", count=count,
+        )[1]
+        if len(entries) < count:
+            response = self._redis.xreadgroup(
+                self._group, consumer, {self._stream: ">"}, count=count - len(entries), block=self._block_ms or None,
+            )
+            for _, stream_entries in response or []:
+                entries.extend(stream_entries)
+        return entries
+
+    def ack(self, entry_ids: list[str]) -> None:
+        """Acknowledges and deletes relayed entries; the stream is never trimmed by length, which could drop events."""
+        if not entry_ids:
+            return
+        pipeline = self._redis.pipeline(transaction=False)
+        pipeline.xack(self._stream, self._group, *entry_ids)
+        pipeline.xdel(self._stream, *entry_ids)
+        pipeline.execute()
+
+    def _publish(self, entries: list[dict[str, str | bytes]]) -> None:
+        pipeline = self._redis.pipeline(transaction=False)
+        for entry in entries:
+            pipeline.xadd(self._stream, entry)
+        pipeline.execute()
+        logger.debug("Outbox events written", backend=self.name, count=len(entries))
+
+    def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        import redis
+
+        try:
+            self._redis.xgroup_create(self._stream, self._group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    @staticmethod
+    def _encode(event: dict[str, Any], created_at: dt.datetime) -> dict[str, str | bytes]:
+        user_id = event.get("user_id")
+        return {
+            "event_type": event["event_type"],
+            "event_date_time": created_at.isoformat(),
+            "event_context": encode_context(event["event_context"]),
+            "user_id": "" if user_id is None else str(user_id),
+            "trace_id": event.get("trace_id") or "",
+        }
+
+
+class ClickHouseOutboxBackend(OutboxBackend):
+    """
+    Inserts events straight into the event log once the transaction has committed, so they skip the relay's delay.
+
+    Meant for event types inserted with a server-buffered insert mode (CLICKHOUSE_INSERT_MODES): every commit is one
+    small INSERT, which ClickHouse buffers and writes as parts at its own flush thresholds. Each thread keeps its
+    ClickHouse connection.
+
+    Delivery is at most once. Events are not part of the Postgres transaction: a crash between the commit and the
+    insert loses them, and so does the `async` insert mode if ClickHouse stops before flushing its buffer. Events
+    that can't be inserted, e.g. while the ClickHouse circuit is open, are written to the Postgres outbox instead,
+    and only reach the event log if the relay (`relay_outbox_events`) runs; without it they stay pending.
+    """
+    name = "clickhouse"
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._fallback = PostgresOutboxBackend()
+
+    def write(self, events: list[dict[str, Any]]) -> None:
+        transaction.on_commit(partial(self._insert, events))
+
+    def _insert(self, events: list[dict[str, Any]]) -> None:
+        from clickhouse_driver.errors import Error as ClickHouseError
+
+        from core.event_log_client import event_log_record_schema
+
+        committed_at = timezone.now()
+        records = [
+            event_log_record_schema.construct(
+                event_type=event["event_type"],
+                event_date_time=committed_at,
+                event_context=encode_context(event["event_context"]),
+                trace_id=event.get("trace_id") or "",
+                user_id=event.get("user_id"),
+            )
+            for event in events
+        ]
+        try:
+            self._client().insert(records)
+        except (CircuitOpenError, ClickHouseError) as e:
+            logger.warning("Event log insert failed, diverting events to the outbox", error=str(e), count=len(events))
+            self._fallback.write(events)
+
+    def _client(self) -> "EventLogClient":
+        from core.event_log_client import EventLogClient, clickhouse_health_probe, create_clickhouse_client
+
+        clickhouse_health_probe.start()
+        if getattr(self._local, "client", None) is None:
+            self._local.client = create_clickhouse_client()
+        return EventLogClient(
+            client=self._local.client,
+            schema=settings.CLICKHOUSE_SCHEMA,
+            table=settings.CLICKHOUSE_EVENT_LOG_TABLE_NAME,
+            environment=settings.ENVIRONMENT,
+        )
+
+
+BACKENDS: dict[str, type[OutboxBackend]] = {
+    PostgresOutboxBackend.name: PostgresOutboxBackend,
+    RedisStreamOutboxBackend.name: RedisStreamOutboxBackend,
+    ClickHouseOutboxBackend.name: ClickHouseOutboxBackend,
+}
+
+
+@lru_cache
+def get_backend_by_name(name: str) -> OutboxBackend:
+    return BACKENDS[name].from_settings()
+
+
+def get_backend(event_type: str) -> OutboxBackend:
+    """Returns the backend configured for the event type."""
+    return get_backend_by_name(settings.OUTBOX_EVENT_BACKENDS.get(event_type, settings.OUTBOX_DEFAULT_BACKEND))
+
+
+def write_events(events: list[dict[str, Any]]) -> None:
+    """
+    Hands every event to the backend of its type, one write per backend.
+
+    Events without a trace id take the current one.
+    """
+    trace_id = current_trace_id()
+    by_backend: dict[OutboxBackend, list[dict[str, Any]]] = defaultdict(list)
+    for event in events:
+        if trace_id and not event.get("trace_id"):
+            event = {**event, "trace_id": trace_id}
+        by_backend[get_backend(event["event_type"])].append(event)
+    for backend, backend_events in by_backend.items():
+        backend.write(backend_events)
@@ -0,0 +1,77 @@
+import datetime as dt
+import json
+from collections import Counter
+from enum import StrEnum
+from typing import Any, NamedTuple
+
+import structlog
+from django.conf import settings
+
+logger = structlog.get_logger(__name__)
+
+# Events collapsed before reaching ClickHouse, per event type, since the process started.
+coalescing_metrics: Counter[str] = Counter()
+
+
+class CoalescingPolicy(StrEnum):
+    # Only the latest event of a user within the window is kept.
+    KEEP_LAST = "keep_last"
+    # Contexts of a user's events within the window are merged into one event, later keys winning.
+    MERGE_CONTEXTS = "merge_contexts"
+
+
+class RelayedEvent(NamedTuple):
+    """An outbox event on its way to the event log; `context` is a dict or already JSON-encoded."""
+    event_type: str
+    user_id: Any
+    created_at: dt.datetime
+    context: dict[str, Any] | str | bytes
+    trace_id: str = ""
+
+
+def coalesce_events(events: list[RelayedEvent]) -> list[RelayedEvent]:
+    """
+    Collapses a relay batch according to OUTBOX_COALESCING.
+
+    Events of a coalesced type are grouped by user; every group is folded into one event per window of
+    OUTBOX_COALESCING_WINDOW seconds, counted from the window's first event. Event types without a policy, and
+    events without a user, pass through unchanged. Only events of the same batch are ever combined.
+    """
+    policies: dict[str, str] = settings.OUTBOX_COALESCING
+    if not policies:
+        return events
+
+    window = dt.timedelta(seconds=settings.OUTBOX_COALESCING_WINDOW)
+    result: list[RelayedEvent] = []
+    # (event_type, user_id) -> (position in result, start of the open window)
+    open_windows: dict[tuple[str, Any], tuple[int, dt.datetime]] = {}
+
+    for event in sorted(events, key=lambda event: event.created_at):
+        policy = policies.get(event.event_type)
+        key = (event.event_type, event.user_id)
+        if policy is None or event.user_id is None:
+            result.append(event)
+            continue
+
+        position, started_at = open_windows.get(key, (None, None))
+        if position is None or event.created_at - started_at > window:
+            open_windows[key] = (len(result), event.created_at)
+            result.append(event)
+            continue
+
+        result[position] = _fold(result[position], event, CoalescingPolicy(policy))
+        coalescing_metrics[event.event_type] += 1
+
+    if saved := len(events) - len(result):
+        logger.info("Outbox events coalesced", received=len(events), saved=saved)
+    return result
+
+
+def _fold(kept: RelayedEvent, event: RelayedEvent, policy: CoalescingPolicy) -> RelayedEvent:
+    if policy == CoalescingPolicy.KEEP_LAST:
+        return event
+    return event._replace(context={**_as_dict(kept.context), **_as_dict(event.context)})
+
+
+def _as_dict(context: dict[str, Any] | str | bytes) -> dict[str, Any]:
+    return json.loads(context) if isinstance(context, str | bytes) else context
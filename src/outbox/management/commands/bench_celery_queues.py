@@ -0,0 +1,83 @@
+import time
+import uuid
+from typing import Any
+from urllib.parse import urlsplit, urlunsplit
+
+import redis
+from celery import Celery, states
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+TASK_NAME = "users.tasks.tasks.log_user_creation"
+
+
+class Command(BaseCommand):
+    help = "Measures Redis round trips and memory per N event-pipeline tasks, with and without stored results."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--events", type=int, default=100_000, help="Number of tasks to publish and drain.")
+        parser.add_argument(
+            "--db", type=int, default=15, help="Scratch Redis database on the broker host. It is flushed between runs.",
+        )
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ARG002, ANN401
+        url = self._scratch_url(settings.CELERY_BROKER_URL, options["db"])
+        redis_client = redis.Redis.from_url(url)
+
+        rows = []
+        for label, store_results in (("before: result backend", True), ("after: ignore_result", False)):
+            redis_client.flushdb()
+            rows.append((label, *self._run(url, redis_client, options["events"], store_results)))
+        redis_client.flushdb()
+
+        self.stdout.write(f"{'profile':<26}{'round trips':>14}{'per event':>11}{'memory, KiB':>14}{'seconds':>10}")
+        for label, calls, used_memory, elapsed in rows:
+            self.stdout.write(
+                f"{label:<26}{calls:>14}{calls / options['events']:>11.2f}{used_memory / 1024:>14.0f}{elapsed:>10.2f}",
+            )
+
+    @staticmethod
+    def _scratch_url(broker_url: str, db: int) -> str:
+        """Points the broker URL at a scratch database so the benchmark never touches real queues."""
+        parts = urlsplit(broker_url)
+        return urlunsplit(parts._replace(path=f"/{db}"))
+
+    @staticmethod
+    def _redis_stats(redis_client: redis.Redis) -> tuple[int, int]:
+        """Returns the total number of commands served and the memory in use."""
+        calls = sum(stat["calls"] for stat in redis_client.info("commandstats").values())
+        return calls, redis_client.info("memory")["used_memory"]
+
+    def _run(self, url: str, redis_client: redis.Redis, events: int, store_results: bool) -> tuple[int, int, float]:
+        """Publishes and drains `events` tasks the way a web process and a worker would."""
+        app = Celery("bench", broker=url, backend=url if store_results else None)
+        app.conf.task_default_queue = settings.CELERY_EVENT_PIPELINE_QUEUE
+        app.conf.result_expires = settings.CELERY_RESULT_EXPIRES
+        app.conf.broker_transport_options = settings.CELERY_BROKER_TRANSPORT_OPTIONS
+
+        calls_before, memory_before = self._redis_stats(redis_client)
+        started = time.perf_counter()
+
+        event_data = {"email": "bench@example.com", "first_name": "Bench", "last_name": "User"}
+        with app.producer_or_acquire() as producer:
+            for _ in range(events):
+                app.send_task(
+                    TASK_NAME,
+                    args=(str(uuid.uuid4()), event_data),
+                    producer=producer,
+                    ignore_result=not store_results,
+                )
+
+        with app.connection_for_read() as connection:
+            queue = connection.SimpleQueue(settings.CELERY_EVENT_PIPELINE_QUEUE)
+            for _ in range(events):
+                message = queue.get(timeout=5)
+                message.ack()
+                if store_results:
+                    app.backend.store_result(message.headers["id"], None, states.SUCCESS)
+            queue.close()
+
+        elapsed = time.perf_counter() - started
+        calls_after, memory_after = self._redis_stats(redis_client)
+        # The two INFO calls of the closing snapshot are not part of the workload.
+        return calls_after - calls_before - 2, max(memory_after - memory_before, 0), elapsed
@@ -0,0 +1,91 @@
+import itertools
+import time
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.backends.signals import connection_created
+
+from outbox.management.commands.bench_outbox_backends import NullEventLogClient
+from outbox.models import OutboxEvent
+from outbox.relay import relay_postgres_events
+from outbox.transactional_outbox import transactional_outbox
+from users.models import User
+from users.use_cases import CreateUser, CreateUserRequest
+
+EVENT_TYPE = "bench_connections"
+
+
+class Command(BaseCommand):
+    help = (
+        "Counts the database connections opened per 1k sign-up requests and per 1k outbox relay tasks, with a "
+        "connection per request or task and with the configured persistent connections."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--requests", type=int, default=1_000)
+        parser.add_argument("--batch-size", type=int, default=100, help="Events written and relayed per task.")
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ARG002, ANN401
+        database = connections[DEFAULT_DB_ALIAS]
+        configured = settings.DATABASES[DEFAULT_DB_ALIAS]["CONN_MAX_AGE"]
+        run_id = uuid.uuid4().hex[:8]
+        emails = (f"bench{n}.{run_id}@example.com" for n in itertools.count())
+        setups = 0
+
+        def count_setup(**kwargs: object) -> None:  # noqa: ARG001
+            nonlocal setups
+            setups += 1
+
+        def sign_up(n: int) -> None:  # noqa: ARG001
+            # What the WSGI and ASGI handlers do around every request.
+            request_started.send(sender=self.__class__)
+            try:
+                CreateUser().execute(CreateUserRequest(email=next(emails)))
+            finally:
+                request_finished.send(sender=self.__class__)
+
+        def relay(n: int) -> None:
+            # What Celery's Django fixup does around every task.
+            close_old_connections()
+            try:
+                with transactional_outbox(event_data=[
+                    {"event_type": EVENT_TYPE, "event_context": {"seq": seq}, "user_id": None}
+                    for seq in range(n * options["batch_size"], (n + 1) * options["batch_size"])
+                ]):
+                    pass
+                relay_postgres_events(NullEventLogClient(), options["batch_size"], event_types=[EVENT_TYPE])
+            finally:
+                close_old_connections()
+
+        self.stdout.write(f"{'workload':<10}{'CONN_MAX_AGE':>14}{'setups/1k':>12}{'ms/unit':>10}")
+        connection_created.connect(count_setup, dispatch_uid="bench_connections")
+        try:
+            for name, unit in (("signup", sign_up), ("relay", relay)):
+                for conn_max_age in (0, configured or 60):
+                    database.close()
+                    database.settings_dict["CONN_MAX_AGE"] = conn_max_age
+                    setups = 0
+                    elapsed = self._run(unit, options["requests"])
+                    self.stdout.write(
+                        f"{name:<10}{conn_max_age:>14}{setups * 1000 / options['requests']:>12.0f}"
+                        f"{elapsed * 1000 / options['requests']:>10.2f}",
+                    )
+        finally:
+            connection_created.disconnect(dispatch_uid="bench_connections")
+            database.settings_dict["CONN_MAX_AGE"] = configured
+            suffix = f".{run_id}@example.com"
+            User.objects.filter(email__endswith=suffix).delete()
+            OutboxEvent.objects.filter(event_type=EVENT_TYPE).delete()
+            OutboxEvent.objects.filter(event_type="user_created", event_data__email__endswith=suffix).delete()
+
+    @staticmethod
+    def _run(unit: Callable[[int], None], count: int) -> float:
+        started = time.perf_counter()
+        for n in range(count):
+            unit(n)
+        return time.perf_counter() - started
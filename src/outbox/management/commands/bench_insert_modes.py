@@ -0,0 +1,128 @@
+import datetime as dt
+import itertools
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from clickhouse_driver import Client
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from core.clickhouse_replicas import parse_endpoint
+from core.event_log_client import EventLogClient, EventLogRecord, InsertMode
+from core.event_schema import encode_context
+
+EVENT_TYPE = "bench_insert"
+BENCH_TABLE = "event_log_insert_modes_bench"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares per-call latency and parts created per minute of small inserts with each insert mode against "
+        "client-side batching of the same events, on a copy of the event log dropped afterwards."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--events", type=int, default=5_000)
+        parser.add_argument("--concurrency", type=int, default=16, help="Threads inserting one event per call.")
+        parser.add_argument("--batch-size", type=int, default=1_000, help="Events per call when batching client-side.")
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ARG002, ANN401
+        # One node, not a ReplicatedClient: the parts are counted in that node's part log.
+        client = _client()
+        table = f"{settings.CLICKHOUSE_SCHEMA}.{BENCH_TABLE}"
+        client.execute(
+            f"CREATE TABLE {table} AS {settings.CLICKHOUSE_SCHEMA}.{settings.CLICKHOUSE_EVENT_LOG_TABLE_NAME}",
+        )
+        try:
+            self.stdout.write(
+                f"{'mode':<24}{'calls':>8}{'call p50 ms':>13}{'call p99 ms':>13}{'parts':>8}{'parts/min':>11}",
+            )
+            for name, mode, per_call in (
+                ("batched, 1 per call", InsertMode.BATCHED, 1),
+                ("async_wait, 1 per call", InsertMode.ASYNC_WAIT, 1),
+                ("async, 1 per call", InsertMode.ASYNC, 1),
+                (f"batched, {options['batch_size']} per call", InsertMode.BATCHED, options["batch_size"]),
+            ):
+                concurrency = options["concurrency"] if per_call == 1 else 1
+                self._run(client, name, mode, per_call, options["events"], concurrency)
+        finally:
+            client.execute(f"DROP TABLE IF EXISTS {table}")
+            client.disconnect()
+
+    def _run(
+        self, client: Client, name: str, mode: InsertMode, per_call: int, events: int, concurrency: int,
+    ) -> None:
+        run_id = uuid.uuid4().hex[:8]
+        latencies: list[float] = []
+        local = threading.local()
+        calls = itertools.count()
+
+        def insert(_: int) -> None:
+            if not hasattr(local, "client"):
+                local.client = EventLogClient(
+                    _client(), schema=settings.CLICKHOUSE_SCHEMA, table=BENCH_TABLE, environment="bench",
+                )
+            while (call := next(calls)) * per_call < events:
+                records = [
+                    EventLogRecord(
+                        event_type=EVENT_TYPE, event_date_time=timezone.now(),
+                        event_context=encode_context({"run": run_id, "seq": seq}),
+                    )
+                    for seq in range(call * per_call, min((call + 1) * per_call, events))
+                ]
+                started = time.perf_counter()
+                local.client.insert(records, batch_size=per_call, mode=mode)
+                latencies.append(time.perf_counter() - started)
+
+        [(since,)] = client.execute("SELECT now64(6)")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(insert, range(concurrency)))
+        if mode == InsertMode.ASYNC:
+            # Fire-and-forget calls return before the server flushes; give it time to flush what it buffered.
+            time.sleep(settings.CLICKHOUSE_ASYNC_INSERT_BUSY_TIMEOUT_MS / 1000 * 2)
+        elapsed = time.perf_counter() - started
+        [(until,)] = client.execute("SELECT now64(6)")
+        parts = self._new_parts(client, since, until)
+
+        percentiles = statistics.quantiles(latencies * (2 if len(latencies) == 1 else 1), n=100)
+        p50, p99 = percentiles[49] * 1000, percentiles[98] * 1000
+        self.stdout.write(
+            f"{name:<24}{len(latencies):>8}{p50:>13.1f}{p99:>13.1f}{parts:>8}{parts / elapsed * 60:>11.0f}",
+        )
+
+    @staticmethod
+    def _new_parts(client: Client, since: dt.datetime, until: dt.datetime) -> int:
+        """Parts inserts wrote into the bench table between two server times; merges log other event types."""
+        client.execute("SYSTEM FLUSH LOGS")
+        [(count,)] = client.execute(
+            """
+            SELECT count() FROM system.part_log
+            WHERE event_type = 'NewPart' AND database = %(database)s AND table = %(table)s
+                AND event_time_microseconds BETWEEN toDateTime64(%(since)s, 6) AND toDateTime64(%(until)s, 6)
+            """,
+            {
+                "database": settings.CLICKHOUSE_SCHEMA, "table": BENCH_TABLE,
+                # The driver drops the microseconds of datetime parameters, so the times are sent as text.
+                "since": since.strftime("%Y-%m-%d %H:%M:%S.%f"), "until": until.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            },
+        )
+        return count
+
+
+def _client() -> Client:
+    host, port = parse_endpoint(settings.CLICKHOUSE_HOSTS[0], settings.CLICKHOUSE_PORT)
+    return Client(
+        host=host,
+        port=port,
+        user=settings.CLICKHOUSE_USER,
+        password=settings.CLICKHOUSE_PASSWORD,
+        database=settings.CLICKHOUSE_SCHEMA,
+        connect_timeout=settings.CLICKHOUSE_CONNECT_TIMEOUT,
+        send_receive_timeout=settings.CLICKHOUSE_SEND_RECEIVE_TIMEOUT,
+    )
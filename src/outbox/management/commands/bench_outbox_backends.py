@@ -0,0 +1,105 @@
+import statistics
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any
+
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from django.utils import timezone
+
+from core.event_log_client import EventLogClient, EventLogRecord
+from outbox.backends import OutboxBackend, PostgresOutboxBackend, RedisStreamOutboxBackend
+from outbox.models import OutboxEvent
+from outbox.relay import relay_postgres_events, relay_redis_stream_events
+
+EVENT_TYPE = "bench_ping"
+
+
+class NullEventLogClient:
+    """Stand-in for EventLogClient that only records how long each event took to reach it."""
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+
+    def insert(self, data: list[EventLogRecord], batch_size: int = 100) -> None:  # noqa: ARG002
+        now = timezone.now()
+        self.latencies.extend((now - event.event_date_time).total_seconds() for event in data)
+
+
+class Command(BaseCommand):
+    help = "Compares write latency, relay throughput and end-to-end latency of the Postgres and Redis outboxes."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--events", type=int, default=20_000)
+        parser.add_argument("--commit-size", type=int, default=1, help="Events written per transaction.")
+        parser.add_argument("--batch-size", type=int, default=settings.CLICKHOUSE_BATCH_SIZE_INITIAL)
+        parser.add_argument(
+            "--clickhouse", action="store_true", help="Relay into ClickHouse instead of a null sink.",
+        )
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ARG002, ANN401
+        stream = f"{settings.OUTBOX_REDIS_STREAM}:bench"
+        redis_client = redis.Redis.from_url(settings.OUTBOX_REDIS_URL, decode_responses=True)
+        redis_backend = RedisStreamOutboxBackend(redis_client, stream, settings.OUTBOX_REDIS_GROUP, block_ms=0)
+        postgres_backend = PostgresOutboxBackend()
+        batch_size = options["batch_size"]
+
+        def drain_postgres(client: EventLogClient) -> int:
+            return relay_postgres_events(client, batch_size, event_types=[EVENT_TYPE])
+
+        def drain_redis(client: EventLogClient) -> int:
+            return relay_redis_stream_events(client, redis_backend, "bench", batch_size)
+
+        self.stdout.write(
+            f"{'backend':<14}{'commit p50 ms':>15}{'commit p99 ms':>15}{'relay ev/s':>12}"
+            f"{'e2e p50 ms':>12}{'e2e p99 ms':>12}",
+        )
+        try:
+            for backend, drain in ((postgres_backend, drain_postgres), (redis_backend, drain_redis)):
+                with self._sink(options["clickhouse"]) as client:
+                    commit_latencies = self._write(backend, options["events"], options["commit_size"])
+                    started = time.perf_counter()
+                    while drain(client):
+                        pass
+                    elapsed = time.perf_counter() - started
+                self._report(backend.name, commit_latencies, options["events"] / elapsed, client)
+        finally:
+            OutboxEvent.objects.filter(event_type=EVENT_TYPE).delete()
+            redis_client.delete(stream)
+
+    @staticmethod
+    @contextmanager
+    def _sink(use_clickhouse: bool) -> Generator[EventLogClient | NullEventLogClient, None, None]:
+        if not use_clickhouse:
+            yield NullEventLogClient()
+            return
+        with EventLogClient.init() as client:
+            yield client
+
+    @staticmethod
+    def _write(backend: OutboxBackend, events: int, commit_size: int) -> list[float]:
+        """Writes the events the way transactional_outbox does and returns the latency of every commit."""
+        latencies = []
+        for start in range(0, events, commit_size):
+            batch = [
+                {"event_type": EVENT_TYPE, "event_context": {"seq": seq}, "user_id": None}
+                for seq in range(start, min(start + commit_size, events))
+            ]
+            started = time.perf_counter()
+            with transaction.atomic():
+                backend.write(batch)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    def _report(
+        self, name: str, commit_latencies: list[float], throughput: float, client: EventLogClient | NullEventLogClient,
+    ) -> None:
+        commit = statistics.quantiles(commit_latencies, n=100)
+        e2e = statistics.quantiles(client.latencies, n=100) if getattr(client, "latencies", None) else None
+        e2e_columns = f"{e2e[49] * 1000:>12.1f}{e2e[98] * 1000:>12.1f}" if e2e else f"{'-':>12}{'-':>12}"
+        self.stdout.write(
+            f"{name:<14}{commit[49] * 1000:>15.2f}{commit[98] * 1000:>15.2f}{throughput:>12.0f}{e2e_columns}",
+        )
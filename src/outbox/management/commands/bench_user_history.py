@@ -0,0 +1,108 @@
+import uuid
+from typing import Any
+
+from clickhouse_driver import Client
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.clickhouse_replicas import parse_endpoint
+from core.event_log_client import EventLogClient
+
+BENCH_TABLE = "event_log_user_history_bench"
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills a copy of the event log with synthetic events of many users and compares the rows and bytes read for "
+        "one user's latest events: by the user ID in the context, by the user_id column without its bloom filter "
+        "index, and with it."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--rows", type=int, default=100_000_000)
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--keep", action="store_true", help="Keep the filled table for another run.")
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ARG002, ANN401
+        # One node, not a ReplicatedClient: the rows and bytes read are taken from the connection's last query.
+        host, port = parse_endpoint(settings.CLICKHOUSE_HOSTS[0], settings.CLICKHOUSE_PORT)
+        client = Client(
+            host=host,
+            port=port,
+            user=settings.CLICKHOUSE_USER,
+            password=settings.CLICKHOUSE_PASSWORD,
+            database=settings.CLICKHOUSE_SCHEMA,
+            connect_timeout=settings.CLICKHOUSE_CONNECT_TIMEOUT,
+            send_receive_timeout=3600,
+        )
+        table = f"{settings.CLICKHOUSE_SCHEMA}.{BENCH_TABLE}"
+        try:
+            [(existing,)] = client.execute(f"EXISTS TABLE {table}")
+            if not existing:
+                self._fill(client, table, options["rows"], options["users"])
+            user_id = uuid.UUID(int=options["users"] // 2)
+            page_size = options["page_size"]
+
+            self.stdout.write(f"{'lookup':<32}{'rows read':>14}{'MB read':>10}{'ms':>8}{'events':>8}")
+            for name, query, params, query_settings in (
+                (
+                    "event_context (before)",
+                    f"SELECT * FROM {table} WHERE JSONExtractString(event_context, 'user_id') = %(user_id)s "  # noqa: S608
+                    f"ORDER BY event_date_time DESC LIMIT {page_size}",
+                    {"user_id": str(user_id)}, {},
+                ),
+                (
+                    "user_id, no skip index",
+                    f"SELECT * FROM {table} WHERE user_id = %(user_id)s "  # noqa: S608
+                    f"ORDER BY event_date_time DESC LIMIT {page_size}",
+                    {"user_id": user_id}, {"use_skip_indexes": 0},
+                ),
+            ):
+                rows = client.execute(query, params, settings=query_settings)
+                self._report(name, client, len(rows))
+
+            event_log = EventLogClient(
+                client, schema=settings.CLICKHOUSE_SCHEMA, table=BENCH_TABLE, environment="bench",
+            )
+            page = event_log.user_events(user_id, limit=page_size)
+            self._report("user_events, first page", client, len(page.events))
+            if page.next_cursor:
+                page = event_log.user_events(user_id, limit=page_size, before=page.next_cursor)
+                self._report("user_events, second page", client, len(page.events))
+        finally:
+            if not options["keep"]:
+                client.execute(f"DROP TABLE IF EXISTS {table}")
+            client.disconnect()
+
+    def _fill(self, client: Client, table: str, rows: int, users: int) -> None:
+        self.stdout.write(f"Filling {table} with {rows} events of {users} users...")
+        client.execute(
+            f"CREATE TABLE {table} AS {settings.CLICKHOUSE_SCHEMA}.{settings.CLICKHOUSE_EVENT_LOG_TABLE_NAME}",
+        )
+        # A user's events are spread over the whole time range, as they are in production.
+        client.execute(f"""
+            INSERT INTO {table} (event_type, event_date_time, environment, event_context, trace_id, user_id)
+            SELECT
+                ['user_created', 'login', 'page_view'][number % 3 + 1],
+                toDateTime64('2025-01-01 00:00:00', 6) + toIntervalMillisecond(number * 100),
+                'bench',
+                concat('{{"user_id": "', toString(user_id), '", "seq": ', toString(number), '}}'),
+                '',
+                user_id
+            FROM (
+                SELECT
+                    number,
+                    -- The same UUIDs as uuid.UUID(int=n) for n below `users`.
+                    toUUID(concat('00000000-0000-0000-0000-', leftPad(hex(cityHash64(number) % {users}), 12, '0')))
+                        AS user_id
+                FROM numbers({rows})
+            )
+        """, settings={"max_insert_threads": 4})
+
+    def _report(self, name: str, client: Client, events: int) -> None:
+        progress = client.last_query.progress
+        self.stdout.write(
+            f"{name:<32}{progress.rows:>14}{progress.bytes / 1e6:>10.1f}{client.last_query.elapsed * 1000:>8.0f}"
+            f"{events:>8}",
+        )
@@ -0,0 +1,71 @@
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+# What each kind of process has imported by the time it can do its first piece of work.
+TARGETS = {
+    "manage": "import django; django.setup()",
+    "worker": (
+        "import django; django.setup(); "
+        "from core.celery import app; app.loader.import_default_modules(); app.finalize()"
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports the cold start of a fresh interpreter: wall time until a manage.py command or a Celery worker is "
+        "ready for its first command or task, and the modules with the largest cumulative import time (-X importtime)."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--target", choices=sorted(TARGETS), default="worker")
+        parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters timed for the wall time.")
+        parser.add_argument("--top", type=int, default=25, help="Modules listed by cumulative import time.")
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ARG002, ANN401
+        code = TARGETS[options["target"]]
+        # The first run warms the bytecode and filesystem caches and isn't counted.
+        wall_times = [self._run(code)[0] for _ in range(options["runs"] + 1)][1:]
+        _, importtime = self._run(code, "-X", "importtime")
+        modules = self._parse(importtime)
+
+        self.stdout.write(
+            f"{options['target']}: {statistics.median(wall_times) * 1000:.0f} ms median wall time over "
+            f"{len(wall_times)} runs, {len(modules)} modules imported",
+        )
+        self.stdout.write(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+        for name, (own, cumulative) in sorted(modules.items(), key=lambda item: -item[1][1])[:options["top"]]:
+            self.stdout.write(f"{cumulative / 1000:>14.1f}{own / 1000:>10.1f}  {name}")
+
+        packages: dict[str, int] = defaultdict(int)
+        for name, (own, _) in modules.items():
+            packages[name.partition(".")[0]] += own
+        self.stdout.write(f"\n{'self ms':>14}  package")
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:options["top"]]:
+            self.stdout.write(f"{own / 1000:>14.1f}  {package}")
+
+    @staticmethod
+    def _run(code: str, *options: str) -> tuple[float, str]:
+        started = time.perf_counter()
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, *options, "-c", code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        return time.perf_counter() - started, result.stderr
+
+    @staticmethod
+    def _parse(importtime: str) -> dict[str, tuple[int, int]]:
+        """Maps every imported module to its own and cumulative import time in microseconds."""
+        modules = {}
+        for line in importtime.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            own, cumulative, name = line.removeprefix("import time:").split("|")
+            modules[name.strip()] = (int(own), int(cumulative))
+        return modules
@@ -2,7 +2,20 @@ from django.db import models
 
 
 class OutboxEvent(models.Model):
-    user_id = models.UUIDField(db_index=True)
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        PROCESSED = 'processed'
+
+    user_id = models.UUIDField(db_index=True, null=True, blank=True)
+    event_type = models.CharField(max_length=255, default='user_created')
     event_data = models.JSONField()
-    status = models.CharField(max_length=50, default='pending')  # pending или processed
+    # Trace of the use case that added the event; it travels with the event into the event log.
+    trace_id = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=50, choices=Status.choices, default=Status.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The relay only ever scans the pending tail in insertion order.
+            models.Index(fields=['id'], condition=models.Q(status='pending'), name='outbox_pending_idx'),
+        ]
@@ -0,0 +1,176 @@
+import datetime as dt
+from collections.abc import Collection
+
+import structlog
+from django.db import models, transaction
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from core.event_log_client import EventLogClient, event_log_record_schema
+from core.event_schema import encode_context
+from core.profiling import profile_call
+from outbox.backends import RedisStreamOutboxBackend
+from outbox.coalescing import RelayedEvent, coalesce_events
+from outbox.models import OutboxEvent
+from outbox.spill import SpilledBatch, SpillSegment
+
+logger = structlog.get_logger(__name__)
+
+
+@profile_call("outbox.relay_postgres")
+def relay_postgres_events(
+    client: EventLogClient, batch_size: int, event_types: Collection[str] | None = None,
+) -> int:
+    """
+    Moves one batch of pending outbox rows, optionally only of the given types, into the event log.
+
+    Returns the size of the batch. Rows are locked with SKIP LOCKED, so several relays can run side by side; if the
+    insert fails the transaction rolls back and the rows stay pending for the next run. Rows collapsed by
+    coalescing are marked processed along with the rest of the batch.
+    """
+    pending = OutboxEvent.objects.filter(status=OutboxEvent.Status.PENDING)
+    if event_types is not None:
+        pending = pending.filter(event_type__in=event_types)
+
+    # The context is read as JSON text and handed to ClickHouse as is, instead of being decoded and re-encoded.
+    pending = pending.defer("event_data").annotate(event_data_json=Cast("event_data", models.TextField()))
+
+    with transaction.atomic():
+        events = list(pending.select_for_update(skip_locked=True).order_by("id")[:batch_size])
+        if not events:
+            return 0
+        claimed_at = timezone.now()
+
+        _insert(client, [_relayed(event) for event in events], claimed_at)
+        OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(status=OutboxEvent.Status.PROCESSED)
+
+    logger.info("Outbox events relayed", backend="postgres", count=len(events))
+    return len(events)
+
+
+@profile_call("outbox.spill_postgres")
+def spill_postgres_events(client: EventLogClient, segment: SpillSegment, batch_size: int) -> int:
+    """
+    Encodes one batch of pending outbox rows the segment doesn't hold yet and keeps it there for replay.
+
+    Meant for while ClickHouse is unavailable. Returns the size of the batch, or 0 once the segment is full. Rows
+    are neither locked nor marked processed: they stay pending, and another relay may still move them, until
+    `replay_spilled_events` inserts them.
+    """
+    pending = (
+        OutboxEvent.objects.filter(status=OutboxEvent.Status.PENDING, id__gt=segment.high_water_id)
+        .defer("event_data").annotate(event_data_json=Cast("event_data", models.TextField()))
+    )
+    events = list(pending.order_by("id")[:batch_size])
+    if not events:
+        return 0
+
+    columns = client.encode_columns(_records([_relayed(event) for event in events], timezone.now()))
+    if not segment.append(SpilledBatch([event.id for event in events], columns)):
+        logger.warning("Outbox spill segment is full", batches=len(segment), capacity=segment.capacity)
+        return 0
+
+    logger.info("Outbox events spilled", backend="postgres", count=len(events))
+    return len(events)
+
+
+@profile_call("outbox.replay_spilled")
+def replay_spilled_events(client: EventLogClient, segment: SpillSegment, max_rows: int) -> int:
+    """
+    Inserts the spilled batches in as few inserts of up to `max_rows` rows as possible and marks their rows processed.
+
+    Returns how many outbox rows were relayed. Each insert first locks its rows with SKIP LOCKED; a batch with a row
+    that is no longer pending, or is locked by another relay, is left out, as that relay writes it instead. If an
+    insert fails the error is raised and the segment is kept for the next run; once every batch is done it is cleared.
+    """
+    relayed = rows = 0
+    group: list[SpilledBatch] = []
+    for batch in segment:
+        if group and rows + len(batch.columns[0]) > max_rows:
+            relayed += _replay(client, group)
+            group, rows = [], 0
+        group.append(batch)
+        rows += len(batch.columns[0])
+    if group:
+        relayed += _replay(client, group)
+    segment.clear()
+
+    logger.info("Spilled outbox events replayed", backend="postgres", count=relayed)
+    return relayed
+
+
+@profile_call("outbox.relay_redis_stream")
+def relay_redis_stream_events(
+    client: EventLogClient, backend: RedisStreamOutboxBackend, consumer: str, batch_size: int,
+) -> int:
+    """
+    Moves one batch of stream entries into the event log and returns its size.
+
+    Entries are acknowledged only after the insert, so a crash leaves them pending for XAUTOCLAIM.
+    """
+    entries = backend.claim(consumer, batch_size)
+    if not entries:
+        return 0
+    claimed_at = timezone.now()
+
+    # XAUTOCLAIM reports entries deleted while pending with empty fields; they are only acknowledged.
+    events = [
+        RelayedEvent(
+            fields["event_type"],
+            fields["user_id"] or None,
+            dt.datetime.fromisoformat(fields["event_date_time"]),
+            fields["event_context"],
+            fields.get("trace_id", ""),
+        )
+        for _, fields in entries if fields
+    ]
+    if events:
+        _insert(client, events, claimed_at)
+    backend.ack([entry_id for entry_id, _ in entries])
+
+    logger.info("Outbox events relayed", backend=backend.name, count=len(events))
+    return len(entries)
+
+
+def _replay(client: EventLogClient, batches: list[SpilledBatch]) -> int:
+    """Inserts spilled batches whose rows are all still pending as one columnar insert, and marks them processed."""
+    with transaction.atomic():
+        ids = [event_id for batch in batches for event_id in batch.ids]
+        locked = set(
+            OutboxEvent.objects.filter(id__in=ids, status=OutboxEvent.Status.PENDING)
+            .select_for_update(skip_locked=True).values_list("id", flat=True),
+        )
+        batches = [batch for batch in batches if locked.issuperset(batch.ids)]
+        if not batches:
+            return 0
+
+        columns = [[value for batch in batches for value in batch.columns[i]] for i in range(len(batches[0].columns))]
+        client.insert_encoded(columns)
+        ids = [event_id for batch in batches for event_id in batch.ids]
+        OutboxEvent.objects.filter(id__in=ids).update(status=OutboxEvent.Status.PROCESSED)
+    return len(ids)
+
+
+def _relayed(event: OutboxEvent) -> RelayedEvent:
+    return RelayedEvent(event.event_type, event.user_id, event.created_at, event.event_data_json, event.trace_id)
+
+
+def _records(events: list[RelayedEvent], claimed_at: dt.datetime) -> list:
+    """Coalesces a batch into event log records."""
+    return [
+        event_log_record_schema.construct(
+            event_type=event.event_type,
+            event_date_time=event.created_at,
+            event_context=encode_context(event.context),
+            trace_id=event.trace_id,
+            claimed_at=claimed_at,
+            user_id=event.user_id,
+        )
+        for event in coalesce_events(events)
+    ]
+
+
+def _insert(client: EventLogClient, events: list[RelayedEvent], claimed_at: dt.datetime) -> None:
+    """Coalesces a batch and inserts it into the event log in one go."""
+    records = _records(events, claimed_at)
+    client.insert(records, batch_size=len(records))
@@ -0,0 +1,101 @@
+import mmap
+import os
+import pickle
+import struct
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+from django.conf import settings
+
+_LENGTH = struct.Struct("<I")
+
+
+class SpilledBatch(NamedTuple):
+    """A relay batch encoded for the event log: the outbox rows it came from and its columns."""
+    ids: list[int]
+    columns: list[list]
+
+
+class SpillSegment:
+    """
+    Bounded, memory-mapped local cache of encoded relay batches, filled while ClickHouse is down.
+
+    Batches are appended as length-prefixed pickles to a file of `capacity` bytes mapped into memory, so a long outage
+    neither grows the heap nor re-reads and re-encodes the same outbox rows on every relay run: `high_water_id` is
+    the last outbox row spilled. The outbox stays the source of truth: spilled rows stay pending until a replay
+    inserts them and marks them processed, and a batch that doesn't fit is simply left to the regular relay. The
+    file belongs to one process and is unlinked as soon as it is mapped, so nothing is left behind once the process
+    exits, however it exits.
+    """
+
+    def __init__(self, path: Path, capacity: int) -> None:
+        self.path = path
+        self.capacity = capacity
+        self.high_water_id = 0
+        self._offsets: list[tuple[int, int]] = []
+        self._end = 0
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w+b") as file:
+            file.truncate(capacity)
+            self._mmap = mmap.mmap(file.fileno(), capacity)
+        # The mapping keeps the file's pages: they can still be written back under memory pressure, unlike an
+        # anonymous mapping's, and the space is freed when the mapping goes away.
+        path.unlink()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    @property
+    def rows(self) -> int:
+        return sum(len(batch.ids) for batch in self)
+
+    def append(self, batch: SpilledBatch) -> bool:
+        """Keeps a batch for replay; returns False, keeping nothing, when the segment has no room left for it."""
+        payload = pickle.dumps(tuple(batch), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            start = self._end
+            end = start + _LENGTH.size + len(payload)
+            if end > self.capacity:
+                return False
+            _LENGTH.pack_into(self._mmap, start, len(payload))
+            self._mmap[start + _LENGTH.size:end] = payload
+            self._offsets.append((start + _LENGTH.size, end))
+            self._end = end
+            self.high_water_id = max(self.high_water_id, batch.ids[-1])
+            return True
+
+    def __iter__(self) -> Iterator[SpilledBatch]:
+        for start, end in list(self._offsets):
+            # The segment is only ever read back by the process that wrote it.
+            yield SpilledBatch(*pickle.loads(self._mmap[start:end]))  # noqa: S301
+
+    def clear(self) -> None:
+        """Forgets every batch; the high-water mark is kept, as rows below it were either replayed or left pending."""
+        with self._lock:
+            self._offsets.clear()
+            self._end = 0
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+_segment: SpillSegment | None = None
+_segment_pid: int | None = None
+_segment_lock = threading.Lock()
+
+
+def get_spill_segment() -> SpillSegment | None:
+    """Returns this process's spill segment, created on first use; None when spilling is disabled."""
+    global _segment, _segment_pid
+    if settings.OUTBOX_SPILL_MAX_BYTES <= 0:
+        return None
+    with _segment_lock:
+        if _segment_pid != os.getpid():
+            # A forked child gets its own file rather than sharing the parent's mapping.
+            path = Path(settings.OUTBOX_SPILL_DIR) / f"outbox-relay-{os.getpid()}.spill"
+            _segment = SpillSegment(path, settings.OUTBOX_SPILL_MAX_BYTES)
+            _segment_pid = os.getpid()
+        return _segment
@@ -0,0 +1,88 @@
+import os
+import socket
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+import structlog
+from celery import shared_task
+from django.conf import settings
+
+from core.adaptive_batch import AdaptiveBatchSizer
+from outbox.backends import RedisStreamOutboxBackend, get_backend_by_name
+
+if TYPE_CHECKING:
+    from core.event_log_client import EventLogClient
+    from outbox.spill import SpillSegment
+
+logger = structlog.get_logger(__name__)
+
+
+def _redis_stream_enabled() -> bool:
+    configured = {settings.OUTBOX_DEFAULT_BACKEND, *settings.OUTBOX_EVENT_BACKENDS.values()}
+    return RedisStreamOutboxBackend.name in configured
+
+
+@shared_task(**settings.CELERY_EVENT_PIPELINE_TASK_OPTIONS)
+def relay_outbox_events() -> None:
+    """Drains every configured outbox backend into ClickHouse, one full batch after another."""
+    # Imported here rather than at the top: every worker imports this module at startup, the relay only runs on the
+    # event pipeline queue.
+    from core.event_log_client import EventLogClient, clickhouse_batch_sizer, clickhouse_breaker
+    from outbox.relay import relay_postgres_events, relay_redis_stream_events, replay_spilled_events
+    from outbox.spill import get_spill_segment
+
+    segment = get_spill_segment()
+    if clickhouse_breaker.is_open:
+        if segment is None:
+            logger.warning("ClickHouse circuit is open, skipping outbox relay")
+            return
+        # Encoding now means the replay is a few large inserts rather than a full relay once ClickHouse is back.
+        with EventLogClient.init() as client:
+            spilled = _spill(client, segment, clickhouse_batch_sizer.maximum)
+        logger.warning("ClickHouse circuit is open, outbox events spilled", spilled=spilled, buffered=len(segment))
+        return
+
+    with EventLogClient.init() as client:
+        relayed = 0
+        if segment is not None and len(segment):
+            relayed += replay_spilled_events(client, segment, settings.OUTBOX_SPILL_REPLAY_ROWS)
+        relayed += _drain(lambda batch_size: relay_postgres_events(client, batch_size), clickhouse_batch_sizer)
+
+        if _redis_stream_enabled():
+            backend = get_backend_by_name(RedisStreamOutboxBackend.name)
+            consumer = f"{socket.gethostname()}-{os.getpid()}"
+            relayed += _drain(
+                lambda batch_size: relay_redis_stream_events(client, backend, consumer, batch_size),
+                clickhouse_batch_sizer,
+            )
+
+    logger.info("Outbox relay finished", relayed=relayed)
+
+
+def _spill(client: "EventLogClient", segment: "SpillSegment", batch_size: int) -> int:
+    """Spills batches until one comes back short or the segment is full."""
+    from outbox.relay import spill_postgres_events
+
+    spilled = 0
+    while count := spill_postgres_events(client, segment, batch_size):
+        spilled += count
+        if count < batch_size:
+            break
+    return spilled
+
+
+def _drain(relay_batch: Callable[[int], int], batch_sizer: AdaptiveBatchSizer) -> int:
+    """
+    Relays batches until one comes back short.
+
+    Each batch claims as many events as the adaptive batch sizer allows, and the relay pauses between batches for
+    as long as the sizer's backoff says, so a struggling ClickHouse slows down the claim rate too.
+    """
+    relayed = 0
+    while True:
+        batch_size = batch_sizer.size
+        count = relay_batch(batch_size)
+        relayed += count
+        if count < batch_size:
+            return relayed
+        batch_sizer.wait()
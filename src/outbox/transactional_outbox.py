@@ -1,27 +1,52 @@
+import uuid
+from typing import Any
+
 import structlog
-from django.db import transaction
+
+from core.unit_of_work import unit_of_work
+from outbox.backends import write_events
 
 logger = structlog.get_logger(__name__)
 
 
 class transactional_outbox:
-    """Context manager for transactional outbox logic."""
-    def __init__(self, event_data=None, transaction_id=None):
-        self.event_data = event_data or []
+    """
+    Context manager for transactional outbox logic.
+
+    Events collected in `event_data` are written on a successful exit, just before the surrounding transaction
+    commits, by the outbox backend configured for their type (see `outbox.backends`). Inside a use case the outbox
+    joins its unit of work; pass `savepoint=True` to be able to roll back the outbox block on its own.
+    """
+    def __init__(
+        self,
+        event_data: list[dict[str, Any]] | None = None,
+        transaction_id: str | None = None,
+        savepoint: bool = False,
+    ) -> None:
+        self.event_data = event_data if event_data is not None else []
         self.transaction_id = transaction_id
+        self.savepoint = savepoint
 
     def __enter__(self):
         logger.debug("Starting transactional outbox", transaction_id=self.transaction_id)
-        self.atomic_transaction = transaction.atomic()
+        self.atomic_transaction = unit_of_work(savepoint=self.savepoint)
         self.atomic_transaction.__enter__()
         return self
 
-    def add_event(self, event_type: str, event_context: dict):
-        """Adds an event to the outbox."""
+    def add_event(
+        self,
+        event_type: str,
+        event_context: dict,
+        user_id: uuid.UUID | int | str | None = None,
+        trace_id: str | None = None,
+    ) -> None:
+        """Adds an event to the outbox; without a `trace_id` it joins the current trace."""
         self.event_data.append({
             "event_type": event_type,
             "event_context": event_context,
             "transaction_id": self.transaction_id,
+            "user_id": user_id,
+            "trace_id": trace_id,
         })
         logger.info("Event added to outbox", event_type=event_type, transaction_id=self.transaction_id)
 
@@ -35,4 +60,13 @@ class transactional_outbox:
             )
         else:
             logger.debug("Committing transactional outbox", transaction_id=self.transaction_id)
-        self.atomic_transaction.__exit__(exc_type, exc_val, exc_tb)
+            try:
+                self._write_events()
+            except Exception as e:
+                self.atomic_transaction.__exit__(type(e), e, e.__traceback__)
+                raise
+        return self.atomic_transaction.__exit__(exc_type, exc_val, exc_tb)
+
+    def _write_events(self) -> None:
+        if self.event_data:
+            write_events(self.event_data)
@@ -0,0 +1,164 @@
+from types import SimpleNamespace
+
+import pytest
+from clickhouse_driver.errors import ErrorCodes, ServerException
+
+from conftest import StandInClickHouse
+from core.adaptive_batch import AdaptiveBatchSizer
+from core.event_log_client import EventLogClient
+from outbox.tasks import _drain
+
+TARGET_LATENCY = 0.5
+RECORD = SimpleNamespace(
+    event_type="user_created", event_date_time=None, event_context="{}", trace_id="", claimed_at=None, user_id=None,
+)
+
+
+class SimulatedClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class InsertLatency:
+    """Prices each insert on the simulated clock: a fixed overhead plus a per-row price."""
+
+    def __init__(self, clock: SimulatedClock, overhead: float = 0.02, per_row: float = 0.0001) -> None:
+        self.clock = clock
+        self.overhead = overhead
+        self.per_row = per_row
+        self.latencies: list[float] = []
+
+    def optimum(self) -> float:
+        return (TARGET_LATENCY - self.overhead) / self.per_row
+
+    def __call__(self, rows: list[tuple]) -> None:
+        latency = self.overhead + self.per_row * len(rows)
+        self.clock.now += latency
+        self.latencies.append(latency)
+
+
+@pytest.fixture
+def f_clock() -> SimulatedClock:
+    return SimulatedClock()
+
+
+@pytest.fixture
+def f_latency(f_clock: SimulatedClock) -> InsertLatency:
+    return InsertLatency(f_clock)
+
+
+@pytest.fixture
+def f_clickhouse(f_make_clickhouse: type[StandInClickHouse], f_latency: InsertLatency) -> StandInClickHouse:
+    return f_make_clickhouse(on_insert=f_latency)
+
+
+@pytest.fixture
+def f_batch_sizer(f_clock: SimulatedClock) -> AdaptiveBatchSizer:
+    return AdaptiveBatchSizer(
+        initial=100, minimum=100, maximum=50_000, target_latency=TARGET_LATENCY, clock=f_clock, sleep=f_clock.sleep,
+    )
+
+
+def _batch_sizes(clickhouse: StandInClickHouse) -> list[int]:
+    return [len(rows) for rows in clickhouse.inserts]
+
+
+def _overload(clickhouse: StandInClickHouse, times: int) -> None:
+    clickhouse.failures = times
+    clickhouse.error = ServerException("Too many parts", code=ErrorCodes.TOO_MANY_PARTS)
+
+
+def _run(client: EventLogClient, sizer: AdaptiveBatchSizer, rounds: int) -> None:
+    """Inserts one full batch per round, the way the outbox relay claims them."""
+    for _ in range(rounds):
+        client.insert([RECORD] * sizer.size)
+
+
+def test_batch_size_converges_to_latency_target(
+    f_event_log_client: EventLogClient,
+    f_clickhouse: StandInClickHouse,
+    f_latency: InsertLatency,
+    f_batch_sizer: AdaptiveBatchSizer,
+) -> None:
+    """Ensure batches grow from the minimum and settle around the largest size that meets the target."""
+    _run(f_event_log_client, f_batch_sizer, rounds=100)
+
+    batch_sizes = _batch_sizes(f_clickhouse)
+    assert batch_sizes[0] == 100
+    assert all(f_latency.optimum() * 0.5 <= size <= f_latency.optimum() * 1.25 for size in batch_sizes[-50:])
+    assert sum(f_latency.latencies[-50:]) / 50 <= TARGET_LATENCY
+
+
+def test_batch_size_shrinks_when_latency_rises(
+    f_event_log_client: EventLogClient,
+    f_clickhouse: StandInClickHouse,
+    f_latency: InsertLatency,
+    f_batch_sizer: AdaptiveBatchSizer,
+) -> None:
+    """Ensure a slower ClickHouse drives the batch size down to the new equilibrium."""
+    _run(f_event_log_client, f_batch_sizer, rounds=100)
+    settled = max(_batch_sizes(f_clickhouse)[-50:])
+
+    f_latency.per_row *= 4
+    _run(f_event_log_client, f_batch_sizer, rounds=100)
+
+    tail = _batch_sizes(f_clickhouse)[-50:]
+    assert max(tail) < settled
+    assert all(size <= f_latency.optimum() * 1.25 for size in tail)
+
+
+def test_small_fast_batches_leave_the_size(
+    f_event_log_client: EventLogClient, f_batch_sizer: AdaptiveBatchSizer,
+) -> None:
+    """Ensure inserts smaller than the batch size don't grow it, however fast they are."""
+    for _ in range(20):
+        f_event_log_client.insert([RECORD])
+
+    assert f_batch_sizer.size == 100
+
+
+def test_too_many_parts_backs_off_and_retries(
+    f_event_log_client: EventLogClient,
+    f_clickhouse: StandInClickHouse,
+    f_batch_sizer: AdaptiveBatchSizer,
+    f_clock: SimulatedClock,
+) -> None:
+    """Ensure "too many parts" is retried after a growing pause without shrinking the batch."""
+    _overload(f_clickhouse, times=2)
+
+    f_event_log_client.insert([RECORD] * 100)
+
+    assert _batch_sizes(f_clickhouse) == [100]
+    assert f_clock.slept == [TARGET_LATENCY, TARGET_LATENCY * 2]
+    assert f_batch_sizer.size >= 100
+
+
+def test_too_many_parts_gives_up_after_retries(
+    f_event_log_client: EventLogClient, f_clickhouse: StandInClickHouse,
+) -> None:
+    """Ensure a persistently overloaded ClickHouse surfaces the error."""
+    _overload(f_clickhouse, times=EventLogClient.overload_retries + 1)
+
+    with pytest.raises(ServerException):
+        f_event_log_client.insert([RECORD] * 100)
+
+
+def test_relay_pauses_between_batches_while_backing_off(
+    f_batch_sizer: AdaptiveBatchSizer, f_clock: SimulatedClock,
+) -> None:
+    """Ensure the relay claim loop sleeps for the sizer's backoff between full batches."""
+    f_batch_sizer.backoff = 2.0
+    claimed = iter([f_batch_sizer.size, f_batch_sizer.size, 5])
+
+    relayed = _drain(lambda _: next(claimed), f_batch_sizer)
+
+    assert relayed == 2 * 100 + 5
+    assert f_clock.slept == [2.0, 2.0]
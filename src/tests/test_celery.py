@@ -0,0 +1,9 @@
+from celery.fixups.django import DjangoFixup
+
+from core.celery import app
+
+
+def test_django_fixup_is_installed() -> None:
+    """Ensure Celery manages the database connections: closing inherited ones in children and stale ones per task."""
+    assert "celery.fixups.django:fixup" in app.fixups
+    assert any(isinstance(fixup, DjangoFixup) for fixup in app._fixups)
@@ -0,0 +1,19 @@
+from django.conf import settings
+
+from core.celery import app
+from users.tasks.tasks import log_user_creation
+
+
+def test_event_pipeline_tasks_use_dedicated_queue() -> None:
+    """Ensure event-pipeline tasks are routed away from the default queue."""
+    route = app.amqp.router.route({}, log_user_creation.name)
+
+    assert route["queue"].name == settings.CELERY_EVENT_PIPELINE_QUEUE
+    assert settings.CELERY_EVENT_PIPELINE_QUEUE != settings.CELERY_TASK_DEFAULT_QUEUE
+
+
+def test_event_pipeline_tasks_skip_result_backend() -> None:
+    """Ensure event-pipeline tasks are fire-and-forget and acknowledged only after completion."""
+    assert log_user_creation.ignore_result is True
+    assert log_user_creation.acks_late is True
+    assert log_user_creation.reject_on_worker_lost is True
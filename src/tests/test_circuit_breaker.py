@@ -0,0 +1,145 @@
+from collections.abc import Generator
+from unittest.mock import MagicMock
+
+import pytest
+from clickhouse_driver.errors import ErrorCodes, NetworkError, ServerException
+
+from conftest import EventLogClientFactory, StandInClickHouse
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState, HealthProbe
+from core.event_log_client import EventLogClient, EventLogRecord, clickhouse_breaker
+from core.log_service import log_user_creation_event
+from outbox.models import OutboxEvent
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def f_clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def f_breaker(f_clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=f_clock)
+
+
+@pytest.fixture
+def f_clickhouse_breaker() -> Generator[CircuitBreaker, None, None]:
+    """Resets the process-wide ClickHouse breaker around the test."""
+    clickhouse_breaker.reset()
+    yield clickhouse_breaker
+    clickhouse_breaker.reset()
+
+
+def test_breaker_opens_after_consecutive_failures(f_breaker: CircuitBreaker) -> None:
+    """Ensure the circuit opens on the threshold and rejects calls while open."""
+    f_breaker.record_failure()
+    assert f_breaker.state == CircuitState.CLOSED
+
+    f_breaker.record_failure()
+
+    assert f_breaker.state == CircuitState.OPEN
+    assert not f_breaker.allow_request()
+    assert f_breaker.metrics["rejected"] == 1
+    assert f_breaker.metrics["transitions_to_open"] == 1
+
+
+def test_breaker_half_open_allows_single_trial(f_breaker: CircuitBreaker, f_clock: FakeClock) -> None:
+    """Ensure one trial call goes through after the reset timeout and its outcome decides the state."""
+    f_breaker.trip()
+    f_clock.now = 10
+
+    assert f_breaker.state == CircuitState.HALF_OPEN
+    assert f_breaker.allow_request()
+    assert not f_breaker.allow_request()
+
+    f_breaker.record_failure()
+    assert f_breaker.state == CircuitState.OPEN
+
+    f_clock.now = 20
+    assert f_breaker.allow_request()
+    f_breaker.record_success()
+    assert f_breaker.state == CircuitState.CLOSED
+
+
+def test_health_probe_drives_breaker(f_breaker: CircuitBreaker) -> None:
+    """Ensure probe results trip and close the breaker."""
+    probe = HealthProbe(f_breaker, check=MagicMock(side_effect=[False, True]), interval=0.01)
+    probe._stopped.wait = MagicMock(side_effect=[False, False, True])
+
+    probe._run()
+
+    assert f_breaker.metrics["transitions_to_open"] == 1
+    assert f_breaker.state == CircuitState.CLOSED
+
+
+def test_insert_fails_fast_when_circuit_open(
+    f_breaker: CircuitBreaker, f_event_log_client: EventLogClient, f_clickhouse: StandInClickHouse,
+) -> None:
+    """Ensure an open circuit rejects inserts without touching ClickHouse."""
+    f_breaker.trip()
+
+    with pytest.raises(CircuitOpenError):
+        f_event_log_client.insert([])
+
+    assert not f_clickhouse.attempts
+
+
+def test_insert_failures_open_circuit(
+    f_breaker: CircuitBreaker, f_event_log_client: EventLogClient, f_clickhouse: StandInClickHouse,
+) -> None:
+    """Ensure failed inserts are counted by the breaker."""
+    f_clickhouse.failures = 2
+    record = EventLogRecord(event_type="user_created", event_date_time="2024-01-01T00:00:00", event_context="{}")
+
+    for _ in range(2):
+        with pytest.raises(NetworkError):
+            f_event_log_client.insert([record])
+
+    assert f_breaker.state == CircuitState.OPEN
+
+
+@pytest.mark.django_db
+def test_log_user_creation_event_diverts_to_outbox_when_circuit_open(f_clickhouse_breaker: CircuitBreaker) -> None:
+    """Ensure events are kept in the outbox instead of failing while ClickHouse is unavailable."""
+    event_data = {"email": "test@example.com", "first_name": "Test", "last_name": "User"}
+    f_clickhouse_breaker.trip()
+
+    log_user_creation_event(user_id=1, event_data=event_data)
+
+    event = OutboxEvent.objects.get()
+    assert event.event_type == "user_created"
+    assert event.event_data == event_data
+    assert event.status == OutboxEvent.Status.PENDING
+
+
+@pytest.mark.parametrize("error", [
+    RuntimeError("Unexpected"),
+    ServerException("Type mismatch", code=ErrorCodes.TYPE_MISMATCH),
+])
+def test_batch_errors_give_back_the_trial_without_opening(
+    f_breaker: CircuitBreaker,
+    f_clock: FakeClock,
+    f_make_clickhouse: type[StandInClickHouse],
+    f_make_event_log_client: EventLogClientFactory,
+    error: Exception,
+) -> None:
+    """Ensure an insert failing through no fault of ClickHouse ends the half-open trial without opening the circuit."""
+    client = f_make_event_log_client(f_make_clickhouse(failures=1, error=error))
+    record = EventLogRecord(event_type="user_created", event_date_time="2024-01-01T00:00:00", event_context="{}")
+    f_breaker.trip()
+    f_clock.now = 10
+
+    with pytest.raises(type(error)):
+        client.insert([record])
+
+    assert f_breaker.state == CircuitState.HALF_OPEN
+    assert f_breaker.metrics["failures"] == 0
+    client.insert([record])
+    assert f_breaker.state == CircuitState.CLOSED
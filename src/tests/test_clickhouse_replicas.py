@@ -0,0 +1,178 @@
+from collections.abc import Callable
+from types import SimpleNamespace
+
+import pytest
+from clickhouse_driver.errors import ErrorCodes, NetworkError, ServerException
+from pytest_django.fixtures import SettingsWrapper
+
+from conftest import EventLogClientFactory, StandInClickHouse
+from core.adaptive_batch import AdaptiveBatchSizer
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from core.clickhouse_replicas import LoadBalancing, Replica, ReplicatedClient
+from core.event_log_client import EVENT_LOG_COLUMNS, EventLogClient, create_clickhouse_client
+
+RECORD = SimpleNamespace(
+    event_type="login", event_date_time=None, event_context="{}", trace_id="", claimed_at=None, user_id=None,
+)
+
+
+class SimulatedClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def f_clock() -> SimulatedClock:
+    return SimulatedClock()
+
+
+@pytest.fixture
+def f_breaker(f_clock: SimulatedClock) -> CircuitBreaker:
+    return CircuitBreaker("clickhouse", failure_threshold=1, reset_timeout=5, clock=f_clock)
+
+
+@pytest.fixture
+def f_batch_sizer() -> AdaptiveBatchSizer:
+    return AdaptiveBatchSizer(initial=1, minimum=1, maximum=1, target_latency=1)
+
+
+def _replicated(
+    nodes: list, clock: SimulatedClock, balancing: LoadBalancing = LoadBalancing.ROUND_ROBIN,
+) -> ReplicatedClient:
+    replicas = []
+    for n, node in enumerate(nodes, start=1):
+        breaker = CircuitBreaker(f"ch{n}", failure_threshold=1, reset_timeout=10, clock=clock)
+        replicas.append((Replica(f"ch{n}", 9000, breaker), node))
+    return ReplicatedClient(replicas, balancing=balancing)
+
+
+def test_inserts_are_spread_round_robin(
+    f_clock: SimulatedClock, f_make_clickhouse: type[StandInClickHouse], f_make_event_log_client: EventLogClientFactory,
+) -> None:
+    """Ensure consecutive batches go to each replica in turn."""
+    nodes = [f_make_clickhouse(), f_make_clickhouse(), f_make_clickhouse()]
+
+    f_make_event_log_client(_replicated(nodes, f_clock)).insert([RECORD] * 6)
+
+    assert [len(node.queries) for node in nodes] == [2, 2, 2]
+
+
+def test_failed_batch_is_retried_on_another_replica_with_its_token(
+    f_clock: SimulatedClock, f_make_clickhouse: type[StandInClickHouse], f_make_event_log_client: EventLogClientFactory,
+) -> None:
+    """Ensure a batch a replica failed is written once elsewhere with the same token, and the replica is ejected."""
+    down, up = f_make_clickhouse(failures=1), f_make_clickhouse()
+    # Replicas not timed yet go first, in their order.
+    event_log = f_make_event_log_client(_replicated([down, up], f_clock, balancing=LoadBalancing.LEAST_LATENCY))
+
+    event_log.insert([RECORD])
+
+    [failed] = down.attempts
+    [written] = up.queries
+    assert failed.settings["insert_deduplication_token"] == written.settings["insert_deduplication_token"]
+
+    event_log.insert([RECORD] * 3)
+    assert len(down.attempts) == 1
+    assert len(up.queries) == 4
+
+    f_clock.now += 10
+    event_log.insert([RECORD] * 2)
+    assert len(down.queries) == 1
+
+
+def test_query_errors_are_not_retried(f_clock: SimulatedClock, f_make_clickhouse: type[StandInClickHouse]) -> None:
+    """Ensure an error about the query itself is raised without trying other replicas or ejecting the first."""
+    error = ServerException("Syntax error", code=ErrorCodes.SYNTAX_ERROR)
+    nodes = [f_make_clickhouse(failures=1, error=error), f_make_clickhouse()]
+    # Replicas not timed yet go first, in their order.
+    client = _replicated(nodes, f_clock, balancing=LoadBalancing.LEAST_LATENCY)
+
+    with pytest.raises(ServerException):
+        client.execute("SELECT nonsense")
+
+    assert not nodes[1].attempts
+    assert not client._replicas[0][0].breaker.is_open
+
+
+def test_every_replica_ejected(f_clock: SimulatedClock, f_make_clickhouse: type[StandInClickHouse]) -> None:
+    """Ensure the last error is raised when every replica fails, and CircuitOpenError once all are ejected."""
+    client = _replicated([f_make_clickhouse(failures=1), f_make_clickhouse(failures=1)], f_clock)
+
+    with pytest.raises(NetworkError):
+        client.execute("SELECT 1")
+    with pytest.raises(CircuitOpenError):
+        client.execute("SELECT 1")
+
+
+@pytest.mark.parametrize("insert", [
+    lambda event_log: event_log.insert([RECORD]),
+    lambda event_log: event_log.insert_encoded([[value] for value in [None] * len(EVENT_LOG_COLUMNS)]),
+])
+def test_every_replica_ejected_fails_the_half_open_trial(
+    f_clock: SimulatedClock,
+    f_breaker: CircuitBreaker,
+    f_make_clickhouse: type[StandInClickHouse],
+    f_make_event_log_client: EventLogClientFactory,
+    insert: Callable[[EventLogClient], None],
+) -> None:
+    """Ensure an insert refused because every replica is ejected ends the ClickHouse breaker's trial as a failure."""
+    client = _replicated([f_make_clickhouse(failures=1), f_make_clickhouse(failures=1)], f_clock)
+    with pytest.raises(NetworkError):
+        client.execute("SELECT 1")
+    f_breaker.trip()
+    event_log = f_make_event_log_client(client)
+
+    f_clock.now += 5
+    with pytest.raises(CircuitOpenError):
+        insert(event_log)
+    assert f_breaker.state == CircuitState.OPEN
+
+    # Both the breaker and the replicas take their next trial once their reset timeouts have passed.
+    f_clock.now += 5
+    insert(event_log)
+    assert f_breaker.state == CircuitState.CLOSED
+
+
+def test_unexpected_error_gives_back_the_replica_trial(
+    f_clock: SimulatedClock, f_make_clickhouse: type[StandInClickHouse],
+) -> None:
+    """Ensure a half-open replica's trial failing with an error other than a ClickHouse one leaves it trying again."""
+    node = f_make_clickhouse(failures=2)
+    client = _replicated([node], f_clock)
+    with pytest.raises(NetworkError):
+        client.execute("SELECT 1")
+
+    f_clock.now += 10
+    node.error = TypeError("unsupported operand type")
+    with pytest.raises(TypeError):
+        client.execute("SELECT 1")
+
+    assert client.execute("SELECT 1") == []
+    assert not client._replicas[0][0].breaker.is_open
+
+
+def test_least_latency_prefers_the_fastest_replica(
+    f_clock: SimulatedClock, f_make_clickhouse: type[StandInClickHouse],
+) -> None:
+    """Ensure least-latency balancing sends queries to the replica with the lowest recent latency."""
+    nodes = [f_make_clickhouse(), f_make_clickhouse()]
+    client = _replicated(nodes, f_clock, balancing=LoadBalancing.LEAST_LATENCY)
+    client._replicas[0][0].latency, client._replicas[1][0].latency = 0.5, 0.01
+
+    for _ in range(3):
+        client.execute("SELECT 1")
+
+    assert [len(node.queries) for node in nodes] == [0, 3]
+
+
+def test_several_hosts_make_a_replicated_client(settings: SettingsWrapper) -> None:
+    """Ensure CLICKHOUSE_HOSTS with more than one endpoint creates a client per replica."""
+    settings.CLICKHOUSE_HOSTS = ["ch1", "ch2:9440"]
+
+    client = create_clickhouse_client()
+
+    assert isinstance(client, ReplicatedClient)
+    assert [replica.name for replica, _ in client._replicas] == [f"ch1:{settings.CLICKHOUSE_PORT}", "ch2:9440"]
@@ -0,0 +1,60 @@
+from collections.abc import Generator
+from typing import NoReturn
+
+import pytest
+from pytest_django.fixtures import SettingsWrapper
+
+from core import db_router
+from core.db_router import PrimaryReplicaRouter, unpin_primary
+from users.models import User
+
+RouterParts = tuple[PrimaryReplicaRouter, list[float]]
+
+
+@pytest.fixture
+def f_router(settings: SettingsWrapper, monkeypatch: pytest.MonkeyPatch) -> Generator[RouterParts, None, None]:
+    settings.DATABASE_REPLICA_MAX_LAG = 5
+    settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL = 60
+    lags = [0.0]
+    monkeypatch.setattr(PrimaryReplicaRouter, "_replica_lag", staticmethod(lambda: lags[0]))
+    unpin_primary()
+    yield PrimaryReplicaRouter(), lags
+    unpin_primary()
+
+
+def test_reads_follow_writes_to_the_primary(f_router: RouterParts) -> None:
+    """Ensure reads go to the replica until the request writes, and again once the next request starts."""
+    router, _ = f_router
+
+    assert router.db_for_read(User) == "replica"
+    assert router.db_for_write(User) == "default"
+    assert router.db_for_read(User) == "default"
+
+    unpin_primary()
+    assert router.db_for_read(User) == "replica"
+
+
+def test_lagging_replica_falls_back_to_the_primary(f_router: RouterParts, settings: SettingsWrapper) -> None:
+    """Ensure reads go to the primary while the replica lags, rechecking the lag once per interval."""
+    router, lags = f_router
+    lags[0] = 30.0
+    assert router.db_for_read(User) == "default"
+
+    lags[0] = 0.0
+    assert router.db_for_read(User) == "default"
+    settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL = 0
+    assert router.db_for_read(User) == "replica"
+
+
+def test_unreachable_replica_counts_as_lagging(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure a failing lag check sends reads to the primary."""
+    class BrokenReplica:
+        vendor = "postgresql"
+
+        def cursor(self) -> NoReturn:
+            raise db_router.DatabaseError("connection refused")
+
+    monkeypatch.setattr(db_router, "connections", {"replica": BrokenReplica()})
+    unpin_primary()
+
+    assert PrimaryReplicaRouter().db_for_read(User) == "default"
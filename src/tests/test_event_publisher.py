@@ -0,0 +1,105 @@
+import json
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import StandInClickHouse
+from core.circuit_breaker import CircuitBreaker
+from core.event_log_client import EVENT_LOG_COLUMNS
+from core.event_publisher import EventPublisher, OverflowPolicy
+
+
+def _contexts(clickhouse: StandInClickHouse) -> list[dict]:
+    assert all(query.columnar for query in clickhouse.queries)
+    contexts = EVENT_LOG_COLUMNS.index("event_context")
+    return [json.loads(context) for columns in clickhouse.inserts for context in columns[contexts]]
+
+
+@pytest.fixture(autouse=True)
+def f_metrics(monkeypatch: pytest.MonkeyPatch) -> Counter:
+    metrics = Counter()
+    monkeypatch.setattr("core.event_publisher.publisher_metrics", metrics)
+    monkeypatch.setattr("core.event_publisher.clickhouse_health_probe", SimpleNamespace(start=lambda: None))
+    return metrics
+
+
+def _publisher(clickhouse: StandInClickHouse, breaker: CircuitBreaker, **options: object) -> EventPublisher:
+    return EventPublisher(connect=lambda: clickhouse, breaker=breaker, **{"flush_interval": 60, **options})
+
+
+@pytest.mark.parametrize("options", [{"batch_size": 3}, {"batch_size": 100, "flush_interval": 0.05}])
+def test_buffer_is_flushed_on_size_or_time(
+    f_clickhouse: StandInClickHouse, f_breaker: CircuitBreaker, f_metrics: Counter, options: dict[str, float],
+) -> None:
+    """Ensure a full batch is sent right away and a partial one once the flush interval has passed."""
+    publisher = _publisher(f_clickhouse, f_breaker, **options)
+    for n in range(3):
+        assert publisher.publish("page_view", {"n": n})
+
+    assert f_clickhouse.inserted.wait(5)
+    [columns] = f_clickhouse.inserts
+    assert columns[0] == ["page_view"] * 3
+    assert _contexts(f_clickhouse) == [{"n": 0}, {"n": 1}, {"n": 2}]
+    publisher.close()
+    assert f_metrics == {"published": 3, "flushed": 3}
+
+
+@pytest.mark.parametrize(("overflow", "kept"), [
+    (OverflowPolicy.DROP_NEWEST, [0, 1]),
+    (OverflowPolicy.DROP_OLDEST, [3, 4]),
+    (OverflowPolicy.BLOCK, [0, 1]),
+])
+def test_overflow_policy(
+    monkeypatch: pytest.MonkeyPatch,
+    f_clickhouse: StandInClickHouse,
+    f_breaker: CircuitBreaker,
+    f_metrics: Counter,
+    overflow: OverflowPolicy,
+    kept: list[int],
+) -> None:
+    """Ensure a full buffer drops the new or the oldest events, or blocks for no longer than the timeout."""
+    # Without the flusher thread nothing makes room, so the buffer stays full.
+    monkeypatch.setattr(EventPublisher, "_start", lambda _: None)
+    publisher = _publisher(f_clickhouse, f_breaker, capacity=2, overflow=overflow, block_timeout=0.01)
+
+    started = time.monotonic()
+    published = [publisher.publish("page_view", {"n": n}) for n in range(5)]
+    publisher._flush()
+
+    assert time.monotonic() - started < 1
+    assert published.count(True) == (5 if overflow == OverflowPolicy.DROP_OLDEST else 2)
+    assert _contexts(f_clickhouse) == [{"n": n} for n in kept]
+    assert f_metrics["dropped"] == 3
+
+
+def test_close_flushes_the_buffer(
+    f_clickhouse: StandInClickHouse, f_breaker: CircuitBreaker, f_metrics: Counter,
+) -> None:
+    """Ensure closing sends what is buffered, and events published afterwards are dropped."""
+    publisher = _publisher(f_clickhouse, f_breaker)
+    publisher.publish("login", {"email": "first@example.com"})
+    publisher.publish("login", {"email": "second@example.com"})
+
+    publisher.close()
+
+    assert _contexts(f_clickhouse) == [{"email": "first@example.com"}, {"email": "second@example.com"}]
+    assert not publisher.publish("login", {"email": "third@example.com"})
+    assert f_metrics["dropped"] == 1
+
+
+def test_failed_insert_loses_its_batch_only(
+    f_clickhouse: StandInClickHouse, f_breaker: CircuitBreaker, f_metrics: Counter,
+) -> None:
+    """Ensure a failed insert drops its batch and the flusher keeps sending the ones after it."""
+    f_clickhouse.failures = 1
+    publisher = _publisher(f_clickhouse, f_breaker, batch_size=1)
+
+    publisher.publish("login", {"n": 0})
+    publisher.publish("login", {"n": 1})
+    publisher.close()
+
+    assert f_metrics["failed"] + f_metrics["flushed"] == 2
+    assert f_metrics["failed"] == 1
+    assert len(_contexts(f_clickhouse)) == 1
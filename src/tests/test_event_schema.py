@@ -0,0 +1,43 @@
+import datetime as dt
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from core.event_log_client import EventLogRecord, event_log_record_schema
+from core.event_schema import encode_context
+
+NOW = dt.datetime(2024, 1, 1, tzinfo=dt.UTC)
+
+
+def test_validate_is_strict() -> None:
+    """Ensure untrusted input is not coerced into an event."""
+    with pytest.raises(ValidationError):
+        event_log_record_schema.validate({"event_type": 1, "event_date_time": NOW, "event_context": "{}"})
+
+    record = event_log_record_schema.validate({"event_type": "a", "event_date_time": NOW, "event_context": "{}"})
+    assert isinstance(record, EventLogRecord)
+
+
+def test_construct_skips_validation() -> None:
+    """Ensure trusted events are built as given, without validation."""
+    record = event_log_record_schema.construct(event_type="a", event_date_time=NOW, event_context=b"{}")
+
+    assert record.event_context == b"{}"
+
+
+def test_dump_json_round_trips() -> None:
+    """Ensure the compiled serializer emits bytes the schema reads back."""
+    record = event_log_record_schema.construct(event_type="a", event_date_time=NOW, event_context="{}")
+
+    data = event_log_record_schema.dump_json(record)
+
+    assert isinstance(data, bytes)
+    assert event_log_record_schema.validate_json(data) == record
+
+
+def test_encode_context() -> None:
+    """Ensure dicts are encoded to bytes and encoded contexts pass through untouched."""
+    assert json.loads(encode_context({"n": 1, "at": NOW})) == {"n": 1, "at": "2024-01-01T00:00:00Z"}
+    assert encode_context('{"n": 1}') == '{"n": 1}'
+    assert encode_context(b'{"n": 1}') == b'{"n": 1}'
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+from clickhouse_driver.errors import NetworkError
+from pytest_django.fixtures import SettingsWrapper
+
+from conftest import StandInClickHouse
+from core.adaptive_batch import AdaptiveBatchSizer
+from core.event_log_client import EventLogClient, InsertMode
+from outbox.backends import ClickHouseOutboxBackend
+from outbox.models import OutboxEvent
+from outbox.transactional_outbox import transactional_outbox
+
+
+def _record(event_type: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        event_type=event_type, event_date_time=None, event_context="{}", trace_id="", claimed_at=None, user_id=None,
+    )
+
+
+@pytest.fixture
+def f_batch_sizer() -> AdaptiveBatchSizer:
+    return AdaptiveBatchSizer(initial=2, minimum=2, maximum=2, target_latency=1)
+
+
+def _inserted_types(clickhouse: StandInClickHouse) -> list[tuple[list[str], dict]]:
+    return [([row[0] for row in query.params], query.settings) for query in clickhouse.queries]
+
+
+def test_event_types_are_inserted_with_their_mode(
+    settings: SettingsWrapper, f_event_log_client: EventLogClient, f_clickhouse: StandInClickHouse,
+) -> None:
+    """Ensure batched types go in client-side batches and async types in one server-buffered INSERT each."""
+    settings.CLICKHOUSE_INSERT_MODES = {"signup": "async_wait", "page_view": "async"}
+    records = [_record(event_type) for event_type in ["signup", "audit", "page_view", "audit", "signup", "audit"]]
+
+    f_event_log_client.insert(records)
+
+    by_types = {tuple(types): options for types, options in _inserted_types(f_clickhouse)}
+    assert by_types[("signup", "signup")]["wait_for_async_insert"] == 1
+    assert by_types[("page_view",)]["wait_for_async_insert"] == 0
+    assert by_types[("signup", "signup")]["async_insert"] == by_types[("page_view",)]["async_insert"] == 1
+    assert by_types[("audit", "audit")] == by_types[("audit",)] == {}
+
+
+def test_explicit_mode_overrides_the_event_types(
+    settings: SettingsWrapper, f_event_log_client: EventLogClient, f_clickhouse: StandInClickHouse,
+) -> None:
+    """Ensure a mode passed to insert() applies to every record, with the configured flush thresholds."""
+    settings.CLICKHOUSE_INSERT_MODES = {"signup": "batched"}
+    settings.CLICKHOUSE_ASYNC_INSERT_BUSY_TIMEOUT_MS = 50
+
+    f_event_log_client.insert([_record("signup")] * 3, mode=InsertMode.ASYNC_WAIT)
+
+    [(types, options)] = _inserted_types(f_clickhouse)
+    assert types == ["signup"] * 3
+    assert options["async_insert_busy_timeout_ms"] == 50
+
+
+@pytest.mark.django_db(transaction=True)
+def test_clickhouse_backend_inserts_after_commit_and_falls_back_to_the_outbox(
+    settings: SettingsWrapper, monkeypatch: pytest.MonkeyPatch, f_make_clickhouse: type[StandInClickHouse],
+) -> None:
+    """Ensure events reach the event log once committed, and land in the Postgres outbox when ClickHouse fails."""
+    settings.OUTBOX_EVENT_BACKENDS = {"signup": "clickhouse"}
+    backend = ClickHouseOutboxBackend()
+    monkeypatch.setattr("outbox.backends.get_backend_by_name", lambda _: backend)
+    monkeypatch.setattr("core.event_log_client.clickhouse_health_probe", SimpleNamespace(start=lambda: None))
+    backend._local.client = f_make_clickhouse()
+
+    with transactional_outbox() as outbox:
+        outbox.add_event("signup", {"email": "first@example.com"})
+        assert not backend._local.client.inserts
+
+    assert [row[0] for row in backend._local.client.inserts[0]] == ["signup"]
+    assert not OutboxEvent.objects.exists()
+
+    backend._local.client = f_make_clickhouse(failures=1, error=NetworkError("connection refused"))
+    with transactional_outbox() as outbox:
+        outbox.add_event("signup", {"email": "second@example.com"})
+
+    assert OutboxEvent.objects.get().event_data == {"email": "second@example.com"}
@@ -0,0 +1,124 @@
+import io
+import logging
+import threading
+from collections.abc import Generator
+
+import pytest
+import structlog
+
+from core.log_pipeline import BackgroundLogHandler, LogSampler, logging_metrics
+
+
+class ThreadRecordingFormatter(logging.Formatter):
+    """Formatter that remembers which thread rendered each record and can be held up."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.threads: list[str] = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def format(self, record: logging.LogRecord) -> str:
+        self.release.wait(5)
+        self.threads.append(threading.current_thread().name)
+        return super().format(record)
+
+
+HandlerParts = tuple[BackgroundLogHandler, ThreadRecordingFormatter, io.StringIO]
+
+
+@pytest.fixture(autouse=True)
+def f_metrics() -> None:
+    logging_metrics.clear()
+
+
+@pytest.fixture
+def f_handler() -> Generator[HandlerParts, None, None]:
+    stream = io.StringIO()
+    handler = BackgroundLogHandler(stream, maxsize=2)
+    formatter = ThreadRecordingFormatter()
+    handler.setFormatter(formatter)
+    yield handler, formatter, stream
+    formatter.release.set()
+    handler.close()
+
+
+def _record(message: str) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, None, None)
+
+
+def test_sampler_keeps_one_in_rate_and_counts_the_rest() -> None:
+    """Ensure a listed message is kept once per `rate` lines and the dropped lines are counted."""
+    sampler = LogSampler({"Batch inserted successfully": 10})
+    kept = []
+    for _ in range(25):
+        try:
+            kept.append(sampler(None, "info", {"event": "Batch inserted successfully"}))
+        except structlog.DropEvent:
+            pass
+
+    assert kept == [{"event": "Batch inserted successfully", "sampled": 10}] * 3
+    assert logging_metrics["sampled_out:Batch inserted successfully"] == 22
+
+
+def test_sampler_never_drops_errors_or_unlisted_messages() -> None:
+    """Ensure warnings, errors and messages without a rate always pass."""
+    sampler = LogSampler({"Batch inserted successfully": 10})
+
+    for _ in range(5):
+        assert sampler(None, "error", {"event": "Batch inserted successfully"})
+        assert sampler(None, "info", {"event": "User created successfully"})
+    assert not logging_metrics
+
+
+def test_filtering_logger_drops_lines_before_processors() -> None:
+    """Ensure lines below the level never reach a processor."""
+    seen = []
+    log = structlog.wrap_logger(
+        structlog.ReturnLogger(),
+        processors=[lambda _, __, event_dict: seen.append(event_dict["event"]) or event_dict],
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+    )
+
+    log.debug("dropped")
+    log.info("kept")
+
+    assert seen == ["kept"]
+
+
+def test_background_handler_renders_off_the_calling_thread(f_handler: HandlerParts) -> None:
+    """Ensure records are formatted and written by the listener thread."""
+    handler, formatter, stream = f_handler
+
+    handler.handle(_record("hello"))
+    handler.close()
+
+    assert stream.getvalue() == "hello\n"
+    assert formatter.threads
+    assert threading.current_thread().name not in formatter.threads
+
+
+def test_background_handler_drops_instead_of_blocking_when_full(f_handler: HandlerParts) -> None:
+    """Ensure a stalled writer costs dropped records, not a blocked caller."""
+    handler, formatter, stream = f_handler
+    formatter.release.clear()
+
+    for n in range(10):
+        handler.handle(_record(f"line {n}"))
+
+    assert logging_metrics["queue_full"] >= 10 - 3
+    formatter.release.set()
+
+
+def test_background_handler_closes_with_a_full_queue(f_handler: HandlerParts) -> None:
+    """Ensure closing waits for the writer to make room for the stop signal and drains the queue."""
+    handler, formatter, stream = f_handler
+    formatter.release.clear()
+    for n in range(5):
+        handler.handle(_record(f"line {n}"))
+
+    threading.Timer(0.1, formatter.release.set).start()
+    handler.close()
+
+    assert logging_metrics["queue_full"]
+    assert stream.getvalue().count("\n") == 5 - logging_metrics["queue_full"]
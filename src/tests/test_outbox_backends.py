@@ -0,0 +1,123 @@
+import uuid
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+import redis
+from django.conf import settings
+from django.db import transaction
+from pytest_django.fixtures import SettingsWrapper
+
+from core.event_log_client import EventLogClient
+from outbox.backends import RedisStreamOutboxBackend
+from outbox.models import OutboxEvent
+from outbox.relay import relay_postgres_events, relay_redis_stream_events
+from outbox.transactional_outbox import transactional_outbox
+from users.models import User
+
+
+def _redis_available() -> bool:
+    try:
+        return redis.Redis.from_url(settings.OUTBOX_REDIS_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+@pytest.fixture
+def f_stream_backend() -> Generator[RedisStreamOutboxBackend, None, None]:
+    """Redis stream backend on a throwaway stream."""
+    client = redis.Redis.from_url(settings.OUTBOX_REDIS_URL, decode_responses=True)
+    stream = f"outbox:test:{uuid.uuid4()}"
+    yield RedisStreamOutboxBackend(client, stream, group="test", claim_idle_ms=0, block_ms=0)
+    client.delete(stream)
+
+
+@pytest.mark.django_db
+def test_postgres_backend_writes_outbox_rows_in_transaction() -> None:
+    """Ensure events added to the outbox are stored as pending rows together with the business data."""
+    with transactional_outbox() as outbox:
+        user = User.objects.create(email="test@example.com", first_name="Test", last_name="User")
+        outbox.add_event("user_created", {"email": user.email}, user_id=user.id)
+
+    event = OutboxEvent.objects.get()
+    assert event.event_type == "user_created"
+    assert event.event_data == {"email": "test@example.com"}
+    assert event.status == OutboxEvent.Status.PENDING
+
+
+@pytest.mark.django_db
+def test_postgres_backend_rolls_back_outbox_rows() -> None:
+    """Ensure no outbox row survives a failed transaction."""
+    with pytest.raises(ValueError):
+        with transactional_outbox() as outbox:
+            outbox.add_event("user_created", {"email": "test@example.com"})
+            raise ValueError("Simulating failure")
+
+    assert not OutboxEvent.objects.exists()
+
+
+@pytest.mark.django_db
+def test_backend_is_selected_per_event_type(settings: SettingsWrapper) -> None:
+    """Ensure event types mapped to the Redis stream bypass the Postgres outbox."""
+    settings.OUTBOX_EVENT_BACKENDS = {"audit_ping": "redis_stream"}
+
+    with patch.object(RedisStreamOutboxBackend, "write") as mock_write:
+        with transactional_outbox() as outbox:
+            outbox.add_event("audit_ping", {"path": "/admin/"})
+            outbox.add_event("user_created", {"email": "test@example.com"})
+
+    assert [event["event_type"] for event in mock_write.call_args.args[0]] == ["audit_ping"]
+    assert list(OutboxEvent.objects.values_list("event_type", flat=True)) == ["user_created"]
+
+
+@pytest.mark.django_db
+def test_relay_postgres_events_marks_batch_processed() -> None:
+    """Ensure the relay inserts pending rows in one batch and marks them processed."""
+    OutboxEvent.objects.bulk_create([OutboxEvent(event_type="user_created", event_data={"n": n}) for n in range(3)])
+
+    with patch("core.event_log_client.EventLogClient.insert") as mock_insert, EventLogClient.init() as client:
+        assert relay_postgres_events(client, batch_size=10) == 3
+
+    records = mock_insert.call_args.args[0]
+    assert [record.event_context for record in records] == ['{"n": 0}', '{"n": 1}', '{"n": 2}']
+    assert not OutboxEvent.objects.filter(status=OutboxEvent.Status.PENDING).exists()
+
+
+@pytest.mark.django_db
+def test_relay_postgres_events_keeps_rows_pending_on_failure() -> None:
+    """Ensure a failed insert leaves the batch pending for the next run."""
+    OutboxEvent.objects.create(event_type="user_created", event_data={})
+
+    with patch("core.event_log_client.EventLogClient.insert", side_effect=Exception("Connection error")):
+        with pytest.raises(Exception, match="Connection error"), EventLogClient.init() as client:
+            relay_postgres_events(client, batch_size=10)
+
+    assert OutboxEvent.objects.get().status == OutboxEvent.Status.PENDING
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(not _redis_available(), reason="Redis is not available for testing")
+def test_redis_stream_backend_relays_after_commit(f_stream_backend: RedisStreamOutboxBackend) -> None:
+    """Ensure stream entries appear only after commit and are acknowledged once relayed."""
+    with transaction.atomic():
+        f_stream_backend.write([{"event_type": "audit_ping", "event_context": {"path": "/admin/"}}])
+        assert f_stream_backend._redis.xlen(f_stream_backend._stream) == 0
+
+    with patch("core.event_log_client.EventLogClient.insert") as mock_insert, EventLogClient.init() as client:
+        assert relay_redis_stream_events(client, f_stream_backend, consumer="c1", batch_size=10) == 1
+
+    assert mock_insert.call_args.args[0][0].event_type == "audit_ping"
+    assert f_stream_backend._redis.xlen(f_stream_backend._stream) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(not _redis_available(), reason="Redis is not available for testing")
+def test_redis_stream_backend_reclaims_entries_of_crashed_consumer(f_stream_backend: RedisStreamOutboxBackend) -> None:
+    """Ensure entries read but never acknowledged are taken over by another consumer."""
+    with transaction.atomic():
+        f_stream_backend.write([{"event_type": "audit_ping", "event_context": {}}])
+
+    claimed = f_stream_backend.claim("crashed", count=10)
+    reclaimed = f_stream_backend.claim("survivor", count=10)
+
+    assert [entry_id for entry_id, _ in reclaimed] == [entry_id for entry_id, _ in claimed]
@@ -0,0 +1,77 @@
+import datetime as dt
+import uuid
+from unittest.mock import patch
+
+import pytest
+from pytest_django.fixtures import SettingsWrapper
+
+from core.event_log_client import EventLogClient
+from outbox.coalescing import RelayedEvent, coalesce_events, coalescing_metrics
+from outbox.models import OutboxEvent
+from outbox.relay import relay_postgres_events
+
+USER_ID = uuid.UUID("123e4567-e89b-12d3-a456-426614174000")
+START = dt.datetime(2024, 1, 1, tzinfo=dt.UTC)
+
+
+def _event(event_type: str, seconds: float, context: dict, user_id: uuid.UUID | None = USER_ID) -> RelayedEvent:
+    return RelayedEvent(event_type, user_id, START + dt.timedelta(seconds=seconds), context)
+
+
+@pytest.fixture(autouse=True)
+def f_coalescing(settings: SettingsWrapper) -> None:
+    settings.OUTBOX_COALESCING = {"user_created": "keep_last", "user_updated": "merge_contexts"}
+    settings.OUTBOX_COALESCING_WINDOW = 10
+    coalescing_metrics.clear()
+
+
+def test_keep_last_collapses_duplicates_within_window() -> None:
+    """Ensure retried or superseded events of a user collapse into the latest one."""
+    events = [_event("user_created", 0, {"v": 1}), _event("user_created", 3, {"v": 2})]
+
+    assert coalesce_events(events) == [events[1]]
+    assert coalescing_metrics["user_created"] == 1
+
+
+def test_merge_contexts_combines_edits_within_window() -> None:
+    """Ensure edits merge into one event carrying every key, later values winning."""
+    events = [
+        _event("user_updated", 0, {"first_name": "A", "last_name": "B"}),
+        _event("user_updated", 5, '{"first_name": "C"}'),
+    ]
+
+    [merged] = coalesce_events(events)
+
+    assert merged.context == {"first_name": "C", "last_name": "B"}
+    assert merged.created_at == events[1].created_at
+
+
+def test_events_outside_window_or_policy_pass_through() -> None:
+    """Ensure events of other windows, users, or types without a policy are kept."""
+    events = [
+        _event("user_created", 0, {}),
+        _event("user_created", 11, {}),
+        _event("user_created", 1, {}, user_id=uuid.uuid4()),
+        _event("user_created", 2, {}, user_id=None),
+        _event("audit_ping", 3, {}),
+        _event("audit_ping", 4, {}),
+    ]
+
+    assert len(coalesce_events(events)) == len(events)
+    assert not coalescing_metrics
+
+
+@pytest.mark.django_db
+def test_relay_inserts_coalesced_batch_and_processes_all_rows() -> None:
+    """Ensure collapsed rows never reach ClickHouse but are still marked processed."""
+    OutboxEvent.objects.bulk_create(
+        [OutboxEvent(user_id=USER_ID, event_type="user_created", event_data={"v": n}) for n in range(3)],
+    )
+
+    with patch("core.event_log_client.EventLogClient.insert") as mock_insert, EventLogClient.init() as client:
+        assert relay_postgres_events(client, batch_size=10) == 3
+
+    [record] = mock_insert.call_args.args[0]
+    assert record.event_context == '{"v": 2}'
+    assert coalescing_metrics["user_created"] == 2
+    assert not OutboxEvent.objects.filter(status=OutboxEvent.Status.PENDING).exists()
@@ -0,0 +1,117 @@
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+from django.db import DEFAULT_DB_ALIAS, connections
+from pytest_django.fixtures import DjangoCaptureOnCommitCallbacks, SettingsWrapper
+
+from core.profiling import dump_memory_snapshot, profile_call
+from outbox.models import OutboxEvent
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def f_profiling(settings: SettingsWrapper, tmp_path: Path) -> Path:
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_SAMPLE_RATE = 1.0
+    settings.PROFILING_MODE = "cprofile"
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_CLICKHOUSE_SUMMARY = False
+    return tmp_path
+
+
+def _busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profiling_is_off_unless_enabled(settings: SettingsWrapper, f_profiling: Path) -> None:
+    """Ensure nothing is profiled while disabled or not sampled."""
+    settings.PROFILING_ENABLED = False
+    with profile_call("disabled"):
+        pass
+
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_SAMPLE_RATE = 0
+    with profile_call("not_sampled"):
+        pass
+
+    assert not list(f_profiling.iterdir())
+
+
+def test_cprofile_dumps_pstats_once_for_nested_calls(f_profiling: Path) -> None:
+    """Ensure a profiled call is dumped as pstats and covers the calls nested in it."""
+    with profile_call("outer"), profile_call("inner"):
+        _busy_wait(0.01)
+
+    [path] = f_profiling.iterdir()
+    assert path.name.startswith("outer.")
+    assert "_busy_wait" in {function for _, _, function in pstats.Stats(str(path)).stats}
+
+
+def test_stack_sampling_dumps_collapsed_stacks(settings: SettingsWrapper, f_profiling: Path) -> None:
+    """Ensure wall-clock samples are written as `frame;frame count` lines."""
+    settings.PROFILING_MODE = "stack"
+    settings.PROFILING_STACK_INTERVAL = 0.001
+
+    with profile_call("sampled"):
+        _busy_wait(0.05)
+
+    [path] = f_profiling.iterdir()
+    lines = path.read_text().splitlines()
+    assert any("_busy_wait" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+@pytest.mark.django_db
+def test_summary_counts_queries_and_goes_to_the_event_log(
+    settings: SettingsWrapper, django_capture_on_commit_callbacks: DjangoCaptureOnCommitCallbacks,
+) -> None:
+    """Ensure the SQL issued by a profiled call is counted and the summary is written to the outbox on commit."""
+    settings.PROFILING_CLICKHOUSE_SUMMARY = True
+
+    with django_capture_on_commit_callbacks(execute=True), profile_call("signup"):
+        User.objects.create(email="test@example.com")
+        User.objects.filter(email="test@example.com").exists()
+
+    summary = OutboxEvent.objects.get(event_type="profile_summary").event_data
+    assert summary["name"] == "signup"
+    assert summary["sql_count"] == 2
+
+
+@pytest.mark.django_db
+def test_summary_counts_queries_on_every_alias(
+    settings: SettingsWrapper,
+    monkeypatch: pytest.MonkeyPatch,
+    django_capture_on_commit_callbacks: DjangoCaptureOnCommitCallbacks,
+) -> None:
+    """Ensure reads routed to another alias, such as the replica, are counted along with the default ones."""
+    settings.PROFILING_CLICKHOUSE_SUMMARY = True
+    default = connections[DEFAULT_DB_ALIAS]
+    replica = default.__class__({**default.settings_dict}, alias="replica")
+    monkeypatch.setattr("core.profiling.connections", {DEFAULT_DB_ALIAS: default, "replica": replica})
+
+    with django_capture_on_commit_callbacks(execute=True), profile_call("signup"):
+        User.objects.create(email="test@example.com")
+        with replica.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    replica.close()
+
+    summary = OutboxEvent.objects.get(event_type="profile_summary").event_data
+    assert summary["sql_count"] == 2
+
+
+def test_memory_snapshot_on_demand() -> None:
+    """Ensure a snapshot is only dumped while tracemalloc is tracing, and can be loaded back."""
+    assert dump_memory_snapshot() is None
+
+    tracemalloc.start()
+    try:
+        path = dump_memory_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    assert tracemalloc.Snapshot.load(str(path)).traces
@@ -0,0 +1,144 @@
+import uuid
+from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from clickhouse_driver.errors import NetworkError
+
+from conftest import StandInClickHouse
+from core.circuit_breaker import CircuitBreaker
+from core.event_log_client import EVENT_LOG_COLUMNS, EventLogClient
+from outbox.models import OutboxEvent
+from outbox.relay import replay_spilled_events, spill_postgres_events
+from outbox.spill import SpilledBatch, SpillSegment
+from outbox.tasks import relay_outbox_events
+
+
+@pytest.fixture
+def f_segment(tmp_path: Path) -> Generator[SpillSegment, None, None]:
+    segment = SpillSegment(tmp_path / "relay.spill", capacity=64 * 1024)
+    yield segment
+    segment.close()
+
+
+def _outbox(count: int) -> list[OutboxEvent]:
+    return [
+        OutboxEvent.objects.create(event_type="login", event_data={"n": n}, user_id=uuid.uuid4()) for n in range(count)
+    ]
+
+
+def _pending() -> int:
+    return OutboxEvent.objects.filter(status=OutboxEvent.Status.PENDING).count()
+
+
+def test_segment_is_bounded(f_segment: SpillSegment) -> None:
+    """Ensure a batch that doesn't fit is refused without touching the batches already kept."""
+    assert f_segment.append(SpilledBatch([1, 2], [["a", "b"]]))
+    assert not f_segment.append(SpilledBatch([3], [["x" * f_segment.capacity]]))
+
+    assert list(f_segment) == [SpilledBatch([1, 2], [["a", "b"]])]
+    assert f_segment.high_water_id == 2
+    # Only the mapping holds the file, so it goes away with the process.
+    assert not f_segment.path.exists()
+
+
+@pytest.mark.django_db
+def test_spill_reads_each_row_once(f_segment: SpillSegment, f_event_log_client: EventLogClient) -> None:
+    """Ensure spilling leaves rows pending and doesn't read rows the segment already holds."""
+    events = _outbox(5)
+
+    assert spill_postgres_events(f_event_log_client, f_segment, batch_size=3) == 3
+    assert spill_postgres_events(f_event_log_client, f_segment, batch_size=3) == 2
+    assert spill_postgres_events(f_event_log_client, f_segment, batch_size=3) == 0
+
+    assert [batch.ids for batch in f_segment] == [[e.id for e in events[:3]], [e.id for e in events[3:]]]
+    assert _pending() == 5
+
+
+@pytest.mark.django_db
+def test_spill_stops_when_the_segment_is_full(tmp_path: Path, f_event_log_client: EventLogClient) -> None:
+    """Ensure rows that don't fit stay pending for the regular relay."""
+    _outbox(3)
+    segment = SpillSegment(tmp_path / "relay.spill", capacity=16)
+
+    assert spill_postgres_events(f_event_log_client, segment, batch_size=3) == 0
+    assert len(segment) == 0
+    assert segment.high_water_id == 0
+    segment.close()
+
+
+@pytest.mark.django_db
+def test_replay_merges_batches_into_large_inserts(
+    f_segment: SpillSegment, f_event_log_client: EventLogClient, f_clickhouse: StandInClickHouse,
+) -> None:
+    """Ensure spilled batches are replayed in as few inserts as `max_rows` allows and their rows marked processed."""
+    events = _outbox(5)
+    for _ in range(5):
+        spill_postgres_events(f_event_log_client, f_segment, batch_size=1)
+
+    assert replay_spilled_events(f_event_log_client, f_segment, max_rows=3) == 5
+
+    assert [len(columns[0]) for columns in f_clickhouse.inserts] == [3, 2]
+    user_ids = EVENT_LOG_COLUMNS.index("user_id")
+    assert [user_id for columns in f_clickhouse.inserts for user_id in columns[user_ids]] == [e.user_id for e in events]
+    assert _pending() == 0
+    assert len(f_segment) == 0
+
+
+@pytest.mark.django_db
+def test_replay_skips_rows_relayed_elsewhere(
+    f_segment: SpillSegment, f_event_log_client: EventLogClient, f_clickhouse: StandInClickHouse,
+) -> None:
+    """Ensure a batch whose rows another relay already moved isn't inserted again."""
+    events = _outbox(2)
+    spill_postgres_events(f_event_log_client, f_segment, batch_size=1)
+    spill_postgres_events(f_event_log_client, f_segment, batch_size=1)
+    OutboxEvent.objects.filter(id=events[0].id).update(status=OutboxEvent.Status.PROCESSED)
+
+    assert replay_spilled_events(f_event_log_client, f_segment, max_rows=10) == 1
+    [columns] = f_clickhouse.inserts
+    assert columns[EVENT_LOG_COLUMNS.index("user_id")] == [events[1].user_id]
+
+
+@pytest.mark.django_db
+def test_failed_replay_keeps_the_segment(
+    f_segment: SpillSegment, f_event_log_client: EventLogClient, f_clickhouse: StandInClickHouse,
+) -> None:
+    """Ensure a replay that fails leaves both the rows pending and the segment for the next run."""
+    _outbox(2)
+    spill_postgres_events(f_event_log_client, f_segment, batch_size=2)
+
+    f_clickhouse.failures = 1
+    with pytest.raises(NetworkError):
+        replay_spilled_events(f_event_log_client, f_segment, max_rows=10)
+
+    assert _pending() == 2
+    assert len(f_segment) == 1
+
+
+@pytest.mark.django_db
+def test_relay_spills_while_the_circuit_is_open_and_replays_after(
+    f_segment: SpillSegment, f_clickhouse: StandInClickHouse,
+) -> None:
+    """Ensure the relay task spills during an outage and replays the segment before relaying new rows."""
+    _outbox(3)
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    with (
+        patch("outbox.spill.get_spill_segment", return_value=f_segment),
+        patch("core.event_log_client.clickhouse_breaker", breaker),
+        patch("core.event_log_client.create_clickhouse_client", return_value=f_clickhouse),
+        patch("core.event_log_client.clickhouse_health_probe"),
+    ):
+        relay_outbox_events()
+        assert f_segment.rows == 3
+        assert not f_clickhouse.inserts
+
+        breaker.record_success()
+        relay_outbox_events()
+
+    [columns] = f_clickhouse.inserts
+    assert len(columns[0]) == 3
+    assert _pending() == 0
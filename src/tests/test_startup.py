@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Modules a worker or management command shouldn't pay for before it does anything that needs them.
+LAZY_MODULES = ("clickhouse_driver", "redis", "sentry_sdk", "outbox.relay")
+
+
+def test_startup_imports_no_heavy_clients() -> None:
+    """Ensure a fresh worker loads its tasks and the admin without importing the ClickHouse, Redis or Sentry clients."""
+    code = (
+        "import sys, django; django.setup(); "
+        "from core.celery import app; app.loader.import_default_modules(); app.finalize(); "
+        f"print(','.join(module for module in {LAZY_MODULES!r} if module in sys.modules))"
+    )
+
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "SENTRY_CONFIG_DSN": ""},
+    )
+
+    assert result.stdout.strip() == ""
@@ -0,0 +1,51 @@
+import datetime as dt
+
+import pytest
+from django.utils import timezone
+
+from users.models import User
+
+LONG_AGO = timezone.now() - dt.timedelta(days=365)
+
+
+@pytest.fixture
+def f_users() -> list[User]:
+    users = User.objects.bulk_create([User(email=f"user{n}@example.com", created_at=LONG_AGO) for n in range(3)])
+    # An explicit updated_at is kept.
+    User.objects.update(updated_at=LONG_AGO)
+    return users
+
+
+@pytest.mark.django_db
+def test_bulk_create_stamps_rows(f_users: list[User]) -> None:
+    """Ensure bulk_create keeps a given created_at, fills a missing one and sets updated_at."""
+    [created] = User.objects.bulk_create([User(email="new@example.com", created_at=None)])
+
+    created.refresh_from_db()
+    assert created.created_at > LONG_AGO and created.updated_at > LONG_AGO
+    assert all(user.created_at == LONG_AGO for user in User.objects.filter(pk__in=[user.pk for user in f_users]))
+
+
+@pytest.mark.django_db
+def test_update_and_bulk_update_stamp_updated_at(f_users: list[User]) -> None:
+    """Ensure set-based updates move updated_at forward and leave created_at alone."""
+    User.objects.filter(pk=f_users[0].pk).update(is_active=False)
+    f_users[1].first_name = "Renamed"
+    User.objects.bulk_update([f_users[1]], ["first_name"])
+
+    first, second, untouched = User.objects.order_by("pk")
+    assert first.updated_at > LONG_AGO and second.updated_at > LONG_AGO
+    assert untouched.updated_at == LONG_AGO
+    assert {first.created_at, second.created_at} == {LONG_AGO}
+
+
+@pytest.mark.django_db
+def test_save_does_not_mutate_update_fields(f_users: list[User]) -> None:
+    """Ensure save() adds updated_at to a copy of the caller's update_fields."""
+    update_fields = ["first_name"]
+    f_users[0].first_name = "Renamed"
+
+    f_users[0].save(update_fields=update_fields)
+
+    assert update_fields == ["first_name"]
+    assert User.objects.get(pk=f_users[0].pk).updated_at > LONG_AGO
@@ -0,0 +1,60 @@
+from collections.abc import Generator
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import structlog
+
+from core.celery import propagate_trace, setup_structlog
+from core.event_log_client import EventLogClient
+from core.tracing import current_trace_id, trace
+from outbox.models import OutboxEvent
+from outbox.relay import relay_postgres_events
+from users.use_cases import CreateUser, CreateUserRequest
+
+
+@pytest.fixture(autouse=True)
+def f_clear_context() -> Generator[None, None, None]:
+    structlog.contextvars.clear_contextvars()
+    yield
+    structlog.contextvars.clear_contextvars()
+
+
+def test_trace_joins_the_current_trace() -> None:
+    """Ensure nested blocks share the outer trace and the trace ends with the block."""
+    with trace() as outer, trace() as inner:
+        assert inner == outer == current_trace_id()
+
+    assert current_trace_id() is None
+
+
+@pytest.mark.django_db
+def test_trace_travels_from_use_case_to_event_log() -> None:
+    """Ensure the use case's trace id is stored on the outbox row and written with the relayed record."""
+    request = CreateUserRequest(email="test@example.com", first_name="Test", last_name="User")
+
+    with trace("signup-trace"):
+        CreateUser().execute(request)
+
+    event = OutboxEvent.objects.get()
+    assert event.trace_id == "signup-trace"
+
+    with patch("core.event_log_client.EventLogClient.insert") as mock_insert, EventLogClient.init() as client:
+        relay_postgres_events(client, batch_size=10)
+
+    [record] = mock_insert.call_args.args[0]
+    assert record.trace_id == "signup-trace"
+    assert record.event_date_time == event.created_at
+    assert record.claimed_at >= event.created_at
+
+
+def test_celery_task_continues_the_publishers_trace() -> None:
+    """Ensure a task runs in the trace it was published from."""
+    headers = {}
+    with trace("publisher-trace"):
+        propagate_trace(headers=headers)
+
+    task = SimpleNamespace(name="outbox.tasks.relay_outbox_events", request=SimpleNamespace(**headers))
+    setup_structlog(sender=task, task_id="task-1")
+
+    assert current_trace_id() == "publisher-trace"
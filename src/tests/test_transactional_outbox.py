@@ -1,4 +1,5 @@
-from unittest.mock import patch
+import json
+from unittest.mock import MagicMock, patch
 
 import pytest
 from celery.exceptions import Retry
@@ -9,6 +10,12 @@ from users.models import User
 from users.tasks.tasks import log_user_creation
 
 
+def _inserted_contexts(mock_insert: MagicMock) -> list[dict]:
+    """Decodes the contexts of the event log records passed to the only insert."""
+    mock_insert.assert_called_once()
+    return [json.loads(record.event_context) for record in mock_insert.call_args.args[0]]
+
+
 @pytest.mark.django_db
 def test_transactional_outbox_success():
     """Ensure that transactional_outbox commits changes on success."""
@@ -57,7 +64,7 @@ def test_log_user_creation_transactional():
         except Retry:
             ...
 
-        mock_insert.assert_called_once_with([event_data])
+        assert _inserted_contexts(mock_insert) == [event_data]
 
         mock_retry.assert_called_once()
 
@@ -74,7 +81,7 @@ def test_log_user_creation_creates_event():
         event = OutboxEvent.objects.get(user_id=user_id)
         assert event.status == "processed"
 
-        mock_insert.assert_called_once_with([event_data])
+        assert _inserted_contexts(mock_insert) == [event_data]
 
 
 @pytest.mark.django_db
@@ -122,4 +129,4 @@ def test_log_user_creation_resumes_failed_event():
         event = OutboxEvent.objects.get(user_id=user_id)
         assert event.status == "processed"
 
-        mock_insert.assert_called_once_with([event_data])
+        assert _inserted_contexts(mock_insert) == [event_data]
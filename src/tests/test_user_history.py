@@ -0,0 +1,71 @@
+import datetime as dt
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from conftest import EventLogClientFactory, StandInClickHouse
+from core.event_log_client import NO_USER_ID, EventLogClient, UserId, event_log_user_id
+from outbox.models import OutboxEvent
+from outbox.relay import relay_postgres_events
+
+USER_ID = uuid.uuid4()
+
+
+def _rows(count: int) -> list[tuple]:
+    newest = dt.datetime(2025, 1, 1, 12, 0, 0, 500_000, tzinfo=dt.UTC)
+    return [
+        ("login", newest - dt.timedelta(seconds=n), f'{{"n": {n}}}', "", newest - dt.timedelta(seconds=n), 1000 + n)
+        for n in range(count)
+    ]
+
+
+def test_user_events_pages_by_cursor(
+    f_make_clickhouse: type[StandInClickHouse], f_make_event_log_client: EventLogClientFactory,
+) -> None:
+    """Ensure a full page hands out the cursor of its last event, which bounds the next page's query."""
+    clickhouse = f_make_clickhouse(rows=_rows(3))
+    client = f_make_event_log_client(clickhouse)
+
+    page = client.user_events(str(USER_ID), limit=2)
+
+    assert [event.event_context for event in page.events] == ['{"n": 0}', '{"n": 1}']
+    assert {event.user_id for event in page.events} == {USER_ID}
+    assert page.next_cursor == (_rows(3)[1][1], 1001)
+    assert clickhouse.queries[0].params == {"user_id": USER_ID, "limit": 3}
+
+    clickhouse.rows = _rows(3)[2:]
+    last_page = client.user_events(USER_ID, limit=2, before=page.next_cursor)
+
+    query, params, *_ = clickhouse.queries[1]
+    assert "(event_date_time, row_key) < (toDateTime64(%(before_time)s, 6), %(before_key)s)" in query
+    assert params["before_time"] == "2025-01-01 11:59:59.500000"
+    assert params["before_key"] == 1001
+    assert len(last_page.events) == 1
+    assert last_page.next_cursor is None
+
+
+@pytest.mark.parametrize(("user_id", "expected"), [
+    (None, NO_USER_ID),
+    ("", NO_USER_ID),
+    (USER_ID, USER_ID),
+    (str(USER_ID), USER_ID),
+    (42, uuid.UUID(int=42)),
+    ("42", uuid.UUID(int=42)),
+])
+def test_event_log_user_id(user_id: UserId | None, expected: uuid.UUID) -> None:
+    """Ensure user IDs from every backend map to the UUID OutboxEvent.user_id would store."""
+    assert event_log_user_id(user_id) == expected
+
+
+@pytest.mark.django_db
+def test_relay_carries_the_outbox_user_id(f_event_log_client: EventLogClient) -> None:
+    """Ensure relayed events keep the user ID of their outbox row."""
+    OutboxEvent.objects.create(event_type="login", event_data={}, user_id=USER_ID)
+    OutboxEvent.objects.create(event_type="page_view", event_data={})
+
+    with patch("core.event_log_client.EventLogClient.insert") as mock_insert:
+        relay_postgres_events(f_event_log_client, batch_size=10)
+
+    records = mock_insert.call_args.args[0]
+    assert [event_log_user_id(record.user_id) for record in records] == [USER_ID, NO_USER_ID]
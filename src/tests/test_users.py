@@ -1,4 +1,11 @@
+from typing import TYPE_CHECKING
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+if TYPE_CHECKING:
+    from users.use_cases import CreateUser
 
 '''
 @pytest.mark.django_db
@@ -29,7 +36,23 @@ def test_user_creation_with_event_logging(f_ch_client, f_use_case):
 
 
 @pytest.fixture
-def f_use_case():
+def f_use_case() -> "CreateUser":
     """Fixture for CreateUser use case."""
     from users.use_cases import CreateUser
     return CreateUser()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_signup_runs_in_one_transaction_without_savepoints(f_use_case: "CreateUser") -> None:
+    """Ensure a signup costs a lookup, the user and outbox inserts and one commit, without savepoints."""
+    from users.use_cases import CreateUserRequest
+
+    request = CreateUserRequest(email="test@example.com", first_name="Test", last_name="User")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = f_use_case.execute(request)
+
+    # SQLite logs the BEGIN that other backends leave implicit.
+    statements = [query["sql"].split()[0] for query in queries.captured_queries if query["sql"] != "BEGIN"]
+    assert response.error == ""
+    assert statements == ["SELECT", "INSERT", "INSERT", "COMMIT"]
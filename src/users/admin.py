@@ -1,17 +1,31 @@
-from django.contrib import admin
+import structlog
+from django.contrib import admin, messages
+from django.db import router
+from django.db.models import QuerySet
+from django.http import HttpRequest
+from django.utils.translation import ngettext
 
-from core.log_service import log_user_creation_event
+from core.admin import KeysetPaginationMixin
+from outbox.transactional_outbox import transactional_outbox
 from users.models import User
 
+logger = structlog.get_logger(__name__)
+
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
-    """Admin panel for User model with optimized display settings."""
+class UserAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    """
+    Admin panel for User model with optimized display settings.
+
+    Sized for millions of users: the default ordering is indexed and keyset-paged, counts are estimated, and the
+    searched fields have trigram indexes (see `users.indexes`).
+    """
     list_display = ('email', 'first_name', 'last_name', 'is_active', 'is_staff')
     search_fields = ('email', 'first_name', 'last_name')
     list_filter = ('is_active', 'is_staff')
     ordering = ('-last_login',)
     readonly_fields = ('last_login', 'password')
+    actions = ('activate_users', 'deactivate_users', 'grant_staff', 'revoke_staff')
 
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -22,15 +36,51 @@ class UserAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
         """
-        Overrides save_model to log user creation events in ClickHouse.
+        Overrides save_model to log user creation events in ClickHouse through the transactional outbox.
+        """
+        with transactional_outbox() as outbox:
+            super().save_model(request, obj, form, change)
+            if not change:
+                outbox.add_event(
+                    "user_created",
+                    {"email": obj.email, "first_name": obj.first_name, "last_name": obj.last_name},
+                    user_id=obj.id,
+                )
+
+    @admin.action(description="Activate selected users")
+    def activate_users(self, request: HttpRequest, queryset: QuerySet[User]) -> None:
+        self._bulk_set(request, queryset, "user_activated", is_active=True)
+
+    @admin.action(description="Deactivate selected users")
+    def deactivate_users(self, request: HttpRequest, queryset: QuerySet[User]) -> None:
+        self._bulk_set(request, queryset, "user_deactivated", is_active=False)
+
+    @admin.action(description="Grant staff status to selected users")
+    def grant_staff(self, request: HttpRequest, queryset: QuerySet[User]) -> None:
+        self._bulk_set(request, queryset, "user_staff_granted", is_staff=True)
+
+    @admin.action(description="Revoke staff status from selected users")
+    def revoke_staff(self, request: HttpRequest, queryset: QuerySet[User]) -> None:
+        self._bulk_set(request, queryset, "user_staff_revoked", is_staff=False)
+
+    def _bulk_set(self, request: HttpRequest, queryset: QuerySet[User], event_type: str, **values: bool) -> None:
+        """
+        Sets `values` on the selected users that don't have them yet, with one UPDATE, and writes their
+        `event_type` events to the outbox with one INSERT, in the same transaction.
         """
-        super().save_model(request, obj, form, change)
-        if not change:
-            log_user_creation_event(
-                user_id=obj.id,
-                event_data={
-                    "email": obj.email,
-                    "first_name": obj.first_name,
-                    "last_name": obj.last_name,
-                },
+        event_data = []
+        with transactional_outbox(event_data=event_data):
+            # Selected on the primary: a lagging replica could still show users as they were before a recent change.
+            changed = list(queryset.using(router.db_for_write(User)).exclude(**values).values_list('id', 'email'))
+            User.objects.filter(id__in=[user_id for user_id, _ in changed]).update(**values)
+            event_data.extend(
+                {"event_type": event_type, "event_context": {"email": email, **values}, "user_id": user_id}
+                for user_id, email in changed
             )
+
+        logger.info("Users updated in bulk", event_type=event_type, count=len(changed))
+        self.message_user(
+            request,
+            ngettext("%d user updated.", "%d users updated.", len(changed)) % len(changed),
+            messages.SUCCESS,
+        )
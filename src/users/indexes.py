@@ -0,0 +1,30 @@
+from django.db import connections
+
+from users.models import User
+
+# Columns the user admin searches with `icontains`, which PostgreSQL runs as `UPPER(column::text) LIKE UPPER(%s)`.
+TRIGRAM_SEARCH_FIELDS = ('email', 'first_name', 'last_name')
+
+
+def create_trigram_search_indexes(using: str = 'default', **kwargs: object) -> None:  # noqa: ARG001
+    """
+    Creates the pg_trgm GIN indexes that let the user admin's substring searches use an index.
+
+    The indexes are on the same `UPPER(column::text)` expression Django's `icontains` filters on, so the planner
+    matches them. They are PostgreSQL-only and can't be declared in `Meta.indexes` without breaking other databases,
+    so they are created after migrations, concurrently when possible so writes to the table are not blocked.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+
+    table = connection.ops.quote_name(User._meta.db_table)
+    concurrently = '' if connection.in_atomic_block else 'CONCURRENTLY '
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in TRIGRAM_SEARCH_FIELDS:
+            column = connection.ops.quote_name(User._meta.get_field(field).column)
+            cursor.execute(
+                f'CREATE INDEX {concurrently}IF NOT EXISTS user_{field}_trgm_idx '
+                f'ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)',
+            )
@@ -0,0 +1,254 @@
+import itertools
+import math
+import random
+import statistics
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connections
+from django.utils import timezone
+
+from core.event_log_client import create_clickhouse_client
+from core.tracing import new_trace_id, trace
+from outbox.models import OutboxEvent
+from outbox.transactional_outbox import transactional_outbox
+from users.models import User
+from users.use_cases import CreateUser, CreateUserRequest
+
+# Weighted by rank (Zipf): a few names and domains account for most users, as in real sign-up data.
+FIRST_NAMES = [
+    "James", "Mary", "Michael", "Anna", "David", "Maria", "John", "Elena", "Alexander", "Olga", "Daniel", "Sofia",
+    "Ivan", "Emma", "Mohammed", "Chloé", "José", "Zoë", "Liam", "Aisha", "Noah", "Yuki", "Mateo", "Ngozi",
+]
+LAST_NAMES = [
+    "Smith", "Ivanov", "Johnson", "Garcia", "Müller", "Brown", "Petrova", "Williams", "Rossi", "Kim", "O'Brien",
+    "Nguyen", "Silva", "Kowalski", "Jones", "Dubois", "Smirnov", "Tanaka", "Lopez-Diaz", "Okafor", "Novak", "Haddad",
+]
+EMAIL_DOMAINS = [
+    "gmail.com", "yahoo.com", "outlook.com", "mail.ru", "hotmail.com", "icloud.com", "yandex.ru", "proton.me",
+    "gmx.de", "example.org",
+]
+EMAIL_PATTERNS = [
+    ("{first}.{last}", 40), ("{first}{last}", 20), ("{f}{last}", 15), ("{first}_{last}", 10), ("{first}", 10),
+    ("{last}.{first}", 5),
+]
+
+
+class SyntheticUsers:
+    """Generates unique sign-up requests whose names, email patterns and domains follow realistic shares."""
+
+    def __init__(self, run_id: str, seed: int | None = None) -> None:
+        self._run_id = run_id
+        self._random = random.Random(seed)  # noqa: S311
+        self._lock = threading.Lock()
+
+    def __call__(self, n: int) -> CreateUserRequest:
+        with self._lock:
+            first, last = self._zipf(FIRST_NAMES), self._zipf(LAST_NAMES)
+            domain = self._zipf(EMAIL_DOMAINS)
+            [pattern] = self._random.choices(
+                [pattern for pattern, _ in EMAIL_PATTERNS], weights=[weight for _, weight in EMAIL_PATTERNS],
+            )
+        local = pattern.format(first=_ascii(first), last=_ascii(last), f=_ascii(first)[:1])
+        # The sequence number and run id keep emails unique across workers and runs.
+        return CreateUserRequest(email=f"{local}{n}.{self._run_id}@{domain}", first_name=first, last_name=last)
+
+    def _zipf(self, values: list[str]) -> str:
+        [value] = self._random.choices(values, weights=[1 / rank for rank in range(1, len(values) + 1)])
+        return value
+
+
+class Command(BaseCommand):
+    help = (
+        "Signs up synthetic users at a target rate or concurrency and measures how long their events take to become "
+        "visible in the ClickHouse event log after the commit."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--rate", type=float, default=0, help="Target sign-ups per second; 0 means unthrottled.")
+        parser.add_argument("--concurrency", type=int, default=4, help="Threads signing users up.")
+        parser.add_argument(
+            "--bulk", type=int, default=0,
+            help="Sign users up in transactions of this many users instead of one CreateUser call per user.",
+        )
+        parser.add_argument("--poll-interval", type=float, default=0.2, help="Seconds between event log polls.")
+        parser.add_argument(
+            "--timeout", type=float, default=60, help="Seconds to wait for events after the last sign-up.",
+        )
+        parser.add_argument("--histogram", default="load_signups.hgrm", help="Latency distribution output file.")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ARG002, ANN401
+        run_id = uuid.uuid4().hex[:8]
+        users = SyntheticUsers(run_id, options["seed"])
+        self._committed: dict[str, float] = {}
+        self._visible: dict[str, float] = {}
+        self._failed = 0
+        self._failed_lock = threading.Lock()
+        self._backlog: list[tuple[float, int]] = []
+
+        started = time.perf_counter()
+        generating = threading.Event()
+        generating.set()
+        poller = threading.Thread(
+            target=self._poll, args=(started, generating, options["poll_interval"], options["timeout"]), daemon=True,
+        )
+        poller.start()
+
+        batch_size = max(options["bulk"], 1)
+        units = math.ceil(options["users"] / batch_size)
+        counter = itertools.count()
+
+        def work() -> None:
+            try:
+                while (unit := next(counter)) < units:
+                    self._pace(started, unit * batch_size, options["rate"])
+                    first = unit * batch_size
+                    requests = [users(n) for n in range(first, min(first + batch_size, options["users"]))]
+                    if options["bulk"]:
+                        self._sign_up_bulk(requests)
+                    else:
+                        self._sign_up(requests[0])
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(options["concurrency"]) as executor:
+            for future in [executor.submit(work) for _ in range(options["concurrency"])]:
+                future.result()
+        generated = time.perf_counter() - started
+        generating.clear()
+        poller.join()
+
+        self._report(generated, Path(options["histogram"]))
+
+    @staticmethod
+    def _pace(started: float, index: int, rate: float) -> None:
+        if rate and (delay := started + index / rate - time.perf_counter()) > 0:
+            time.sleep(delay)
+
+    def _sign_up(self, request: CreateUserRequest) -> None:
+        with trace(new_trace_id()) as trace_id:
+            response = CreateUser().execute(request)
+        if response.error:
+            with self._failed_lock:
+                self._failed += 1
+            return
+        self._committed[trace_id] = time.perf_counter()
+
+    def _sign_up_bulk(self, requests: list[CreateUserRequest]) -> None:
+        """Creates the users and their outbox events in one transaction, one trace per user."""
+        trace_ids = []
+        try:
+            with transactional_outbox() as outbox:
+                created = User.objects.bulk_create([
+                    User(email=request.email, first_name=request.first_name, last_name=request.last_name)
+                    for request in requests
+                ])
+                for user in created:
+                    trace_ids.append(new_trace_id())
+                    outbox.add_event(
+                        "user_created",
+                        {"email": user.email, "first_name": user.first_name, "last_name": user.last_name},
+                        user_id=user.id,
+                        trace_id=trace_ids[-1],
+                    )
+        except Exception:  # noqa: BLE001
+            with self._failed_lock:
+                self._failed += len(requests)
+            return
+        committed_at = time.perf_counter()
+        self._committed.update(dict.fromkeys(trace_ids, committed_at))
+
+    def _poll(self, started: float, generating: threading.Event, interval: float, timeout: float) -> None:
+        """Marks committed events visible once they show up in the event log and samples the outbox backlog."""
+        client = create_clickhouse_client()
+        since = timezone.now()
+        deadline = None
+        try:
+            while True:
+                time.sleep(interval)
+                pending = [trace_id for trace_id in list(self._committed) if trace_id not in self._visible]
+                for start in range(0, len(pending), 5_000):
+                    chunk = pending[start:start + 5_000]
+                    rows = client.execute(
+                        "SELECT trace_id FROM event_log WHERE event_date_time >= %(since)s AND trace_id IN %(ids)s",
+                        {"since": since, "ids": chunk},
+                    )
+                    seen_at = time.perf_counter()
+                    self._visible.update(dict.fromkeys((trace_id for trace_id, in rows), seen_at))
+                self._backlog.append((
+                    time.perf_counter() - started,
+                    OutboxEvent.objects.filter(status=OutboxEvent.Status.PENDING).count(),
+                ))
+
+                if generating.is_set():
+                    continue
+                deadline = deadline or time.perf_counter() + timeout
+                if len(self._visible) >= len(self._committed) or time.perf_counter() >= deadline:
+                    return
+        finally:
+            client.disconnect()
+            connections.close_all()
+
+    def _report(self, generated: float, histogram: Path) -> None:
+        committed = len(self._committed)
+        latencies = sorted(
+            (self._visible[trace_id] - committed_at) * 1000
+            for trace_id, committed_at in self._committed.items() if trace_id in self._visible
+        )
+
+        self.stdout.write(
+            f"sign-ups       {committed} committed, {self._failed} failed in {generated:.1f} s "
+            f"({committed / generated:.0f}/s)",
+        )
+        self.stdout.write(f"visible        {len(latencies)} of {committed}")
+        if latencies:
+            p50, p95, p99 = (_percentile(latencies, p) for p in (0.50, 0.95, 0.99))
+            self.stdout.write(
+                f"latency, ms    p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  max {latencies[-1]:.1f}",
+            )
+            write_percentile_distribution(latencies, histogram)
+            self.stdout.write(f"histogram      {histogram}")
+
+        self.stdout.write("outbox backlog")
+        step = max(len(self._backlog) // 20, 1)
+        for elapsed, pending in self._backlog[::step]:
+            self.stdout.write(f"  {elapsed:>8.1f} s {pending:>10}")
+
+
+def write_percentile_distribution(values: list[float], path: Path, ticks_per_half_distance: int = 5) -> None:
+    """
+    Writes sorted values in HdrHistogram's percentile distribution format (.hgrm).
+
+    Percentiles are reported the way HdrHistogram does: `ticks_per_half_distance` steps between 0% and 50%, as many
+    again between 50% and 75%, and so on towards 100%, so the tail gets as much resolution as the median.
+    """
+    total = len(values)
+    lines = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}", ""]
+    percentile = 0.0
+    while 1 - percentile >= 1 / total:
+        count = max(math.ceil(round(percentile * total, 9)), 1)
+        lines.append(f"{values[count - 1]:>12.3f} {percentile:>14.12f} {count:>10} {1 / (1 - percentile):>14.2f}")
+        half_distance = 2 ** (math.floor(math.log2(1 / (1 - percentile))) + 1)
+        percentile += 1 / (half_distance * ticks_per_half_distance)
+    lines.append(f"{values[-1]:>12.3f} {1:>14.12f} {total:>10}")
+    stdev = statistics.pstdev(values)
+    lines.append(f"#[Mean    = {statistics.fmean(values):>12.3f}, StdDeviation   = {stdev:>12.3f}]")
+    lines.append(f"#[Max     = {values[-1]:>12.3f}, Total count    = {total:>12}]")
+    path.write_text("\n".join(lines) + "\n")
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    return values[max(math.ceil(percentile * len(values)), 1) - 1]
+
+
+def _ascii(name: str) -> str:
+    normalized = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return "".join(char for char in normalized if char.isalnum()).lower()
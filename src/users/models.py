@@ -25,6 +25,8 @@ class User(TimeStampedModel, AbstractBaseUser):
         indexes = [
             models.Index(fields=['is_active'], name='user_is_active_idx'),
             models.Index(fields=['is_staff'], name='user_is_staff_idx'),
+            # The admin's default ordering, with the primary key it's made deterministic with and keyset-paged on.
+            models.Index(fields=['-last_login', '-id'], name='user_last_login_id_idx'),
         ]
 
     def __str__(self) -> str:
@@ -1,15 +1,15 @@
 import structlog
 from celery import shared_task
+from django.conf import settings
 from django.db import transaction
 
-from core.event_log_client import EventLogClient
 from core.log_service import log_user_creation_event
 from outbox.models import OutboxEvent
 
 logger = structlog.get_logger(__name__)
 
 
-@shared_task(max_retries=3, default_retry_delay=10)
+@shared_task(max_retries=3, default_retry_delay=10, **settings.CELERY_EVENT_PIPELINE_TASK_OPTIONS)
 def log_user_creation(user_id, event_data):
     """Task to log user creation events in ClickHouse with transactional outbox."""
     try:
@@ -29,8 +29,7 @@ def log_user_creation(user_id, event_data):
             logger.info("Outbox event created or retrieved", event_id=event.id)
 
             # Логируем событие в ClickHouse
-            with EventLogClient.init() as client:
-                log_user_creation_event(user_id, event_data)
+            log_user_creation_event(user_id, event_data)
 
             event.status = "processed"
             event.save(update_fields=["status"])
@@ -0,0 +1,120 @@
+import datetime as dt
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.admin import CURSOR_VAR, EstimatedCountPaginator, KeysetChangeList
+from outbox.models import OutboxEvent
+from users.models import User
+
+
+@pytest.fixture
+def f_users() -> list[User]:
+    now = timezone.now()
+    # Ties and NULLs in the ordering column are what keyset paging gets wrong first.
+    last_logins = [None, now, now - dt.timedelta(days=1), now - dt.timedelta(days=1), None]
+    return User.objects.bulk_create([
+        User(email=f"user{n}@example.com", last_login=last_logins[n % len(last_logins)]) for n in range(23)
+    ])
+
+
+@pytest.fixture(autouse=True)
+def f_list_per_page(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(site._registry[User], "list_per_page", 5)
+
+
+def _change_list(**params: object) -> KeysetChangeList:
+    request = RequestFactory().get("/admin/users/user/", params)
+    request.user = SimpleNamespace(is_active=True, is_staff=True, has_perm=lambda *_args: True)
+    return site._registry[User].get_changelist_instance(request)
+
+
+def _walk_pages(**params: object) -> list[int]:
+    change_list = _change_list(**params)
+    seen = [user.pk for user in change_list.result_list]
+    while change_list.next_page_url:
+        change_list = _change_list(**QueryDict(change_list.next_page_url.removeprefix("?")).dict())
+        seen += [user.pk for user in change_list.result_list]
+    return seen
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{}, {"o": "1"}, {"o": "-1"}, {"is_active__exact": "1"}])
+def test_keyset_pages_follow_the_change_list_ordering(f_users: list[User], params: dict[str, str]) -> None:
+    """Ensure walking the pages by cursor lists every row once, in the order offset pages do."""
+    change_list = _change_list(**params)
+
+    assert _walk_pages(**params) == list(change_list.queryset.values_list("pk", flat=True))
+    assert change_list.result_count == len(f_users)
+    assert not change_list.paginator.count_is_estimated
+
+
+@pytest.mark.django_db
+def test_cursor_is_dropped_from_other_links(f_users: list[User]) -> None:
+    """Ensure sorting and filtering links restart from the first row rather than carry the cursor over."""
+    change_list = _change_list(**{CURSOR_VAR: f_users[3].pk})
+
+    assert CURSOR_VAR not in change_list.get_query_string({"o": "1"})
+    assert change_list.next_page_url.count(CURSOR_VAR) == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("f_users")
+@pytest.mark.parametrize("cursor", ["abc", "0"])
+def test_invalid_cursor_lists_the_first_page(cursor: str) -> None:
+    """Ensure a cursor that is no row's primary key lists the first page instead of failing."""
+    change_list = _change_list(**{CURSOR_VAR: cursor})
+
+    assert list(change_list.result_list) == list(_change_list().result_list)
+    assert change_list.next_page_url
+
+
+@pytest.mark.django_db
+def test_filtered_count_is_exact_up_to_the_limit(f_users: list[User], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure searched lists are counted exactly rather than estimated, and capped at the exact count limit."""
+    monkeypatch.setattr(EstimatedCountPaginator, "exact_count_limit", 10)
+
+    searched = _change_list(q="user2")
+    assert searched.result_count == len([user for user in f_users if "user2" in user.email])
+    assert not searched.paginator.count_is_estimated
+
+    filtered = _change_list(is_active__exact="1")
+    assert filtered.result_count == 10
+    assert filtered.paginator.count_is_estimated
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_action_is_one_update_and_one_outbox_insert(f_users: list[User], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure a bulk action updates the users that change with one UPDATE and writes their events with one INSERT."""
+    model_admin = site._registry[User]
+    monkeypatch.setattr(model_admin, "message_user", lambda *_args, **_kwargs: None)
+    User.objects.filter(pk__in=[user.pk for user in f_users[:3]]).update(is_active=False)
+
+    with CaptureQueriesContext(connection) as queries:
+        model_admin.deactivate_users(RequestFactory().post("/"), User.objects.all())
+
+    # SQLite logs the BEGIN that other backends leave implicit.
+    statements = [query["sql"].split()[0] for query in queries.captured_queries if query["sql"] != "BEGIN"]
+    assert statements == ["SELECT", "UPDATE", "INSERT", "COMMIT"]
+    assert not User.objects.filter(is_active=True).exists()
+    events = OutboxEvent.objects.filter(event_type="user_deactivated")
+    assert sorted(event.event_data["email"] for event in events) == sorted(user.email for user in f_users[3:])
+    assert {event.event_data["is_active"] for event in events} == {False}
+
+
+@pytest.mark.django_db
+def test_admin_created_user_event_goes_to_the_outbox() -> None:
+    """Ensure saving a new user in the admin writes its event to the outbox rather than to ClickHouse."""
+    model_admin = site._registry[User]
+    user = User(email="admin@example.com", first_name="Ada", last_name="Admin")
+
+    model_admin.save_model(RequestFactory().post("/"), user, form=None, change=False)
+
+    event = OutboxEvent.objects.get(event_type="user_created")
+    assert event.event_data == {"email": "admin@example.com", "first_name": "Ada", "last_name": "Admin"}
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from django.core.validators import validate_email
+
+from users.management.commands.load_signups import SyntheticUsers, write_percentile_distribution
+
+
+def test_synthetic_users_are_unique_and_valid() -> None:
+    """Ensure generated sign-ups have valid, unique emails and realistic names."""
+    users = SyntheticUsers("run1", seed=1)
+
+    requests = [users(n) for n in range(1_000)]
+
+    assert len({request.email for request in requests}) == len(requests)
+    for request in requests:
+        validate_email(request.email)
+    # Zipf weights: the most common first name is far more frequent than the rarest one.
+    first_names = [request.first_name for request in requests]
+    assert first_names.count("James") > 5 * first_names.count("Ngozi")
+
+
+def test_percentile_distribution_is_hgrm(tmp_path: Path) -> None:
+    """Ensure the histogram file has HdrHistogram's layout with percentiles and values rising to the maximum."""
+    path = tmp_path / "latency.hgrm"
+
+    write_percentile_distribution([float(n) for n in range(1, 1_001)], path)
+
+    lines = path.read_text().splitlines()
+    rows = [line.split() for line in lines[2:] if not line.startswith("#")]
+    values, percentiles = [float(row[0]) for row in rows], [float(row[1]) for row in rows]
+    assert lines[0].split() == ["Value", "Percentile", "TotalCount", "1/(1-Percentile)"]
+    assert values == sorted(values) and percentiles == sorted(percentiles)
+    assert (values[-1], percentiles[-1]) == (1000.0, 1.0)
+    assert lines[-1].startswith("#[Max     =     1000.000, Total count    =         1000]")
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import patch
 
 import pytest
@@ -16,5 +17,8 @@ def test_log_user_creation():
 
         log_user_creation(user.id, event_data)
 
-        # Assert that insert was called once with the correct event data
-        mock_insert.assert_called_once_with([event_data])
+        # Assert that insert was called once with an event log record of the event data
+        [record] = mock_insert.call_args.args[0]
+        assert record.event_type == "user_created"
+        assert json.loads(record.event_context) == event_data
+        assert record.user_id == user.id
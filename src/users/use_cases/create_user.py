@@ -4,12 +4,11 @@ from uuid import uuid4
 import structlog
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
-from django.db import transaction
 
 from core.base_model import Model
-from core.log_service import log_user_creation_event
+from core.unit_of_work import unit_of_work
 from core.use_case import BaseRequest, UseCase
-from outbox import transactional_outbox
+from outbox.transactional_outbox import transactional_outbox
 from users.models import User
 
 logger = structlog.get_logger(__name__)
@@ -82,17 +81,19 @@ class CreateUser(UseCase):
         event_data = []
 
         try:
-            with transactional_outbox(event_data=event_data):
+            with transactional_outbox(event_data=event_data, transaction_id=transaction_id) as outbox:
                 user = User.objects.filter(email=request.email).first()
                 if not user:
                     user = User.objects.create(
                         email=request.email, first_name=request.first_name, last_name=request.last_name )
                     logger.info(
                         "User created successfully", transaction_id=transaction_id, user_id=user.id, email=user.email )
-                    log_user_creation_event(
-                        user_id=user.id, event_data={"email": user.email, "first_name": user.first_name,
-                            "last_name": user.last_name } )
-                    return CreateUserResponse(result=user)
+                    outbox.add_event(
+                        "user_created",
+                        {"email": user.email, "first_name": user.first_name, "last_name": user.last_name},
+                        user_id=user.id,
+                    )
+                    return CreateUserResponse(user=user)
 
                 logger.warning(
                     "User already exists", transaction_id=transaction_id, email=request.email )
@@ -112,7 +113,7 @@ class CreateUser(UseCase):
             return validation_error
 
         try:
-            with transaction.atomic():
+            with unit_of_work():
                 return self._create_user(request, transaction_id)
 
         except Exception as e: